@@ -1,12 +1,22 @@
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from accounts.filters import MemberFilterBackend
 from accounts.models import Member
-from django.contrib.auth.hashers import make_password
+from common.exceptions import UnprocessableEntityException
+from common.hashing import make_password
+from common.revocation import get_revocation_index
+from common.serializer import CompiledReadSerializer, TimedSerializerMixin
 
 
-class MemberSerializer(serializers.ModelSerializer):
+class MemberSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Member
         fields = "__all__"
+        # Uniqueness is enforced by the database (case-insensitively); the
+        # views turn the IntegrityError into a 422 instead of querying first.
+        extra_kwargs = {"email": {"validators": []}}
 
     def create(self, validated_data):
         password = validated_data.pop("password")
@@ -18,22 +28,107 @@ class MemberSerializer(serializers.ModelSerializer):
         return member
 
 
-class MemberUpdateSerializer(serializers.ModelSerializer):
+# Read path for list/detail/login: MemberSerializer's output without the
+# password hash, built straight from values() rows.
+MemberReadSerializer = CompiledReadSerializer(MemberSerializer, exclude=("password",))
+
+
+class MemberUpdateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Member
         fields = [
             "firstname",
             "lastname",
             "fullname",
+            "email",
         ]
+        extra_kwargs = {"email": {"validators": []}}
+
+    def validate_email(self, value):
+        # Other members' names may be edited, but an email is a login.
+        request = self.context.get("request")
+        user = getattr(request, "user", None)
+        if value.lower() != self.instance.email.lower() and (
+            user is None or user.pk != self.instance.pk
+        ):
+            raise UnprocessableEntityException(
+                {
+                    "title": "User Update",
+                    "message": "Only the member can change their own email!",
+                },
+                code=403,
+            )
+        return value
 
     def update(self, instance, validated_data):
         for key, value in validated_data.items():
             setattr(instance, key, value)
-        instance.save()
+        instance.save(update_fields=[*validated_data, "updated_at"])
         return instance
 
 
+class MemberBulkActionSerializer(serializers.Serializer):
+    """Targets are either `ids` or a `filter` of the user-list filters."""
+
+    action = serializers.ChoiceField(
+        choices=["block", "unblock", "activate", "deactivate", "delete"]
+    )
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False
+    )
+    filter = serializers.DictField(required=False, allow_empty=False)
+
+    def is_blank(self, item):
+        if isinstance(item, list):
+            return not item or any(map(self.is_blank, item))
+        return item is None or not str(item).strip()
+
+    def validate_filter(self, value):
+        unknown = sorted(set(value) - set(MemberFilterBackend.filter_fields))
+        if unknown:
+            raise serializers.ValidationError(
+                "Unknown filter(s): " + ", ".join(unknown)
+            )
+        # The filter backend skips empty values, so an empty filter would
+        # target every member.
+        blank = sorted(name for name, item in value.items() if self.is_blank(item))
+        if blank:
+            raise serializers.ValidationError("Empty filter(s): " + ", ".join(blank))
+        # Same string form as query parameters; lists become comma separated.
+        params = {
+            name: ",".join(map(str, item)) if isinstance(item, list) else str(item)
+            for name, item in value.items()
+        }
+        if not MemberFilterBackend().active_filters(params):
+            raise serializers.ValidationError("Give at least one filter value.")
+        return params
+
+    def validate(self, attrs):
+        if ("ids" in attrs) == ("filter" in attrs):
+            raise serializers.ValidationError("Give either ids or filter.")
+        return attrs
+
+
+class MemberIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
+
+
 class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField()
+
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+
+class RevocationCheckedRefreshSerializer(TokenRefreshSerializer):
+    """Refuses refresh tokens of blocked or deleted members (see common.revocation)."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        if get_revocation_index().is_revoked(refresh.payload):
+            raise TokenError(_("Token is revoked"))
+        return super().validate(attrs)
@@ -8,17 +8,45 @@ from drf_spectacular.utils import (
 )
 from accounts.api.serializers.accounts import (
     MemberSerializer,
+    MemberBulkActionSerializer,
+    MemberIdsSerializer,
+    MemberReadSerializer,
     MemberUpdateSerializer,
     LoginSerializer,
+    LogoutSerializer,
+    RevocationCheckedRefreshSerializer,
 )
-from common.pagination import CustomPagination
+from common.pagination import CustomPagination, PaginationModeMixin
+from common.conditional import ConditionalGetMixin
+from common.fieldsets import SPARSE_FIELDSET_PARAMETERS, SparseFieldsetMixin
+from common.instrumentation import timed
+from common.query_budget import query_budget
+from common.renderers import StreamingJSONRenderer
+from common.revocation import get_revocation_index
+from common.routers import mark_read_only
 from common.serializer import OperationError, OperationSuccess
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from common.exceptions import UnprocessableEntityException
+from common.counts import get_tracked_count, invalidate_count
+from common.authentication import get_user_cache
+from common.hashing import make_passwords
+from common.parsers import NDJSONParser
+from accounts.exports import EXPORT_FORMATS, iter_export
+from accounts.filters import MemberFilterBackend
+from accounts.models import is_email_conflict
 
 
 from rest_framework.response import Response
 from rest_framework import viewsets
+from rest_framework.parsers import JSONParser
+from django.conf import settings
+from django.utils import timezone
+from django.http import StreamingHttpResponse
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
+from django.db.models.functions import Lower
 from accounts.models import Member
 import datetime
 import json
@@ -34,6 +62,19 @@ class IsAuthenticated(BasePermission):
         return bool(request.user and request.user.is_authenticated)
 
 
+class IsModerator(IsAuthenticated):
+    """
+    Allows access only to members whose role is one of the view's
+    `get_moderator_roles()`.
+    """
+
+    def has_permission(self, request, view):
+        return super().has_permission(request, view) and (
+            request.user.role in view.get_moderator_roles()
+        )
+
+
+@query_budget(1)
 @extend_schema_view(
     post=extend_schema(
         description="Creating user details",
@@ -62,7 +103,16 @@ class UserCreateView(generics.CreateAPIView):
                 {"title": "User create", "message": "Email is required"},
                 status=422,
             )
-        if Member.objects.filter(email=data["email"]).exists():
+        serializer = self.get_serializer(None, request.data)
+        serializer.is_valid(raise_exception=True)
+        # No existence check first: the insert itself fails on a taken email.
+        # The savepoint keeps an enclosing transaction usable after that.
+        try:
+            with transaction.atomic():
+                dat = serializer.create(serializer.validated_data)
+        except IntegrityError as exc:
+            if not is_email_conflict(exc):
+                raise
             return Response(
                 {
                     "title": "User Create",
@@ -70,9 +120,6 @@ class UserCreateView(generics.CreateAPIView):
                 },
                 status=422,
             )
-        serializer = self.get_serializer(None, request.data)
-        serializer.is_valid(raise_exception=True)
-        dat = serializer.create(serializer.validated_data)
         dat = self.get_serializer(dat).data
         return Response(
             {
@@ -83,10 +130,164 @@ class UserCreateView(generics.CreateAPIView):
         )
 
 
+@query_budget(None, allow_repeats=True)
+@extend_schema_view(
+    post=extend_schema(
+        description="Create many users at once from a JSON array or an NDJSON "
+        "(application/x-ndjson) body. Every row gets its own status.",
+        summary="Bulk user create",
+        request=MemberSerializer(many=True),
+        responses={
+            200: OpenApiResponse(
+                response=OperationSuccess,
+                description="Per-row results of the bulk create!",
+            ),
+            422: OpenApiResponse(
+                response=OperationError,
+                description="Json Data Error, occurs when invalid data is sent!",
+            ),
+        },
+        tags=["User Api"],
+    ),
+)
+class UserBulkCreateView(generics.CreateAPIView):
+    serializer_class = MemberSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def get_options(self):
+        return {
+            "BATCH_SIZE": 500,
+            "MAX_ROWS": 100,
+            **getattr(settings, "MEMBER_BULK_CREATE", {}),
+        }
+
+    def create(self, request, *args, **kwargs):
+        rows = request.data
+        options = self.get_options()
+        if not isinstance(rows, list):
+            return Response(
+                {
+                    "title": "User Bulk Create",
+                    "message": "Expected a JSON array or NDJSON body",
+                },
+                status=422,
+            )
+        if len(rows) > options["MAX_ROWS"]:
+            return Response(
+                {
+                    "title": "User Bulk Create",
+                    "message": f"At most {options['MAX_ROWS']} users per request",
+                },
+                status=422,
+            )
+        batch_size = options["BATCH_SIZE"]
+
+        results = [None] * len(rows)
+        valid = []
+        emails = set()
+        for index, row in enumerate(rows):
+            serializer = self.get_serializer(data=row)
+            if not serializer.is_valid():
+                results[index] = self.failed(index, serializer.errors)
+                continue
+            email = serializer.validated_data["email"].lower()
+            if email in emails:
+                results[index] = self.failed(index, "Duplicate email in request!")
+                continue
+            emails.add(email)
+            valid.append((index, serializer.validated_data))
+
+        existing = set()
+        emails = list(emails)
+        for start in range(0, len(emails), batch_size):
+            existing.update(
+                Member.objects.annotate(email_lower=Lower("email"))
+                .filter(email_lower__in=emails[start : start + batch_size])
+                .values_list("email_lower", flat=True)
+            )
+
+        pending = []
+        for index, data in valid:
+            if data["email"].lower() in existing:
+                results[index] = self.failed(
+                    index, "User with this Email already exists !"
+                )
+            else:
+                pending.append((index, data))
+
+        hashed = make_passwords([data.pop("password") for _, data in pending])
+        members = [
+            Member(password=password, **data)
+            for (_, data), password in zip(pending, hashed)
+        ]
+        indexes = [index for index, _ in pending]
+        for start in range(0, len(members), batch_size):
+            self.insert_batch(
+                indexes[start : start + batch_size],
+                members[start : start + batch_size],
+                results,
+            )
+        if members:
+            # bulk_create does not send post_save, so drop the cached total.
+            invalidate_count(Member)
+
+        created = sum(1 for result in results if result["status"] == "created")
+        return Response(
+            {
+                "title": "User Bulk Create",
+                "message": f"{created} of {len(rows)} users created",
+                "data": {
+                    "created": created,
+                    "failed": len(rows) - created,
+                    "results": results,
+                },
+            }
+        )
+
+    def insert_batch(self, indexes, members, results):
+        try:
+            with transaction.atomic():
+                Member.objects.bulk_create(members)
+        except IntegrityError:
+            # An email was taken after the existence check; retry the batch
+            # row by row so only the conflicting rows fail.
+            for index, member in zip(indexes, members):
+                member.pk = None
+                try:
+                    with transaction.atomic():
+                        member.save(force_insert=True)
+                except IntegrityError as exc:
+                    if not is_email_conflict(exc):
+                        raise
+                    results[index] = self.failed(
+                        index, "User with this Email already exists !"
+                    )
+                else:
+                    results[index] = self.created(index, member)
+            return
+        for index, member in zip(indexes, members):
+            results[index] = self.created(index, member)
+
+    def created(self, index, member):
+        return {"index": index, "status": "created", "id": member.pk}
+
+    def failed(self, index, errors):
+        return {"index": index, "status": "failed", "errors": errors}
+
+
+# Cold caches: user, tracked total, list version, page count and page.
+@query_budget(5)
 @extend_schema_view(
     get=extend_schema(
-        description="My User List Api",
+        description="My User List Api. Pass `paginate=cursor` (or a `cursor`) "
+        "for keyset paging ordered by `order_by=id|date`; add `count=true` "
+        "to include the total. Use `fields`/`exclude` to pick columns. Filter "
+        "by `role`, `is_blocked`, `is_active`, `date_from`/`date_to` and "
+        "`email`/`fullname` prefix. `limit` is capped (10000 by default) and "
+        "large pages are streamed.",
         summary="List User Details",
+        parameters=SPARSE_FIELDSET_PARAMETERS,
         # request=UserSerializer,
         responses={
             200: OpenApiResponse(
@@ -101,18 +302,35 @@ class UserCreateView(generics.CreateAPIView):
         tags=["User Api"],
     ),
 )
-class UserListView(generics.ListAPIView):
+class UserListView(
+    ConditionalGetMixin,
+    SparseFieldsetMixin,
+    PaginationModeMixin,
+    generics.ListAPIView,
+):
     queryset = Member.objects.all()
     serializer_class = MemberSerializer
+    read_serializer = MemberReadSerializer
     pagination_class = CustomPagination
+    filter_backends = [MemberFilterBackend]
     permission_classes = [IsAuthenticated]
+    # Keyset cursors are built from these.
+    sparse_extra_columns = ("id", "date")
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
-        page = self.paginate_queryset(queryset)
+        not_modified = self.get_not_modified_response(
+            request, etag=self.make_etag(request, *self.get_list_version(queryset))
+        )
+        if not_modified is not None:
+            return not_modified
+        rows = queryset.values(*self.get_read_columns())
+        reader = self.get_read_serializer()
+        page = self.paginate_queryset(rows)
+        if page is not None and self.paginator.streaming:
+            return self.get_streaming_response(map(reader.to_dict, page))
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            resp = self.get_paginated_response(serializer.data)
+            resp = self.get_paginated_response(reader.to_dicts(page))
             return Response(
                 {
                     "title": "User List",
@@ -120,20 +338,103 @@ class UserListView(generics.ListAPIView):
                     "data": resp.data,
                 }
             )
-        serializer = self.get_serializer(queryset, many=True)
         return Response(
             {
                 "title": "User List",
                 "message": "List fetched successfully",
-                "data": serializer.data,
+                "data": reader.to_dicts(rows),
             }
         )
 
+    def get_list_version(self, queryset):
+        """
+        One query that changes whenever the listing can. With a tracked total
+        (PAGINATION_COUNT_CACHE), any insert or update moves the table's
+        latest `updated_at` (an index lookup) and any delete changes the
+        total, validating every page of every filter without counting.
+        Otherwise the filtered rows are counted along with their latest
+        `updated_at` in a single aggregate: rows entering or leaving the
+        filter change the count or the latest value, like edits inside it.
+        """
+        total = get_tracked_count(Member)
+        if total is not None:
+            latest = self.get_queryset().aggregate(latest=Max("updated_at"))
+            return total, latest["latest"]
+        version = queryset.order_by().aggregate(
+            total=Count("pk"), latest=Max("updated_at")
+        )
+        return version["total"], version["latest"]
+
+    def get_streaming_response(self, results):
+        body = {
+            "title": "User List",
+            "message": "List fetched successfully",
+            "data": self.paginator.get_paginated_data(results),
+        }
+        return StreamingHttpResponse(
+            StreamingJSONRenderer().iter_render(body),
+            content_type=StreamingJSONRenderer.media_type,
+        )
+
+
+@query_budget(2)
+@extend_schema_view(
+    get=extend_schema(
+        description="Streams every user (never the password hash) as NDJSON "
+        "or CSV. Rows are read from the database in chunks so memory stays "
+        "flat regardless of table size. That holds under WSGI; under ASGI "
+        "Django buffers this route's response, so use `async/user-export/`.",
+        summary="Export Users",
+        parameters=[
+            OpenApiParameter(
+                "output",
+                OpenApiTypes.STR,
+                enum=sorted(EXPORT_FORMATS),
+                description="Export format, `ndjson` by default.",
+            ),
+        ],
+        responses={
+            200: OpenApiResponse(description="Streamed export file"),
+            401: OpenApiResponse(
+                response=OperationError,
+                description="Fetched error!",
+            ),
+        },
+        tags=["User Api"],
+    ),
+)
+class UserExportView(generics.GenericAPIView):
+    queryset = Member.objects.all()
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get("output", "ndjson")
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {
+                    "title": "User Export",
+                    "message": "Output must be one of: "
+                    + ", ".join(sorted(EXPORT_FORMATS)),
+                },
+                status=422,
+            )
+        response = StreamingHttpResponse(
+            iter_export(export_format, self.get_queryset()),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="members.{export_format}"'
+        return response
+
 
+@query_budget(2)
 @extend_schema_view(
     get=extend_schema(
-        description="My User Fetching Api",
+        description="My User Fetching Api. Use `fields`/`exclude` to pick columns.",
         summary="Fetch User Details",
+        parameters=SPARSE_FIELDSET_PARAMETERS,
         responses={
             200: OpenApiResponse(
                 response=OperationSuccess,
@@ -147,17 +448,152 @@ class UserListView(generics.ListAPIView):
         tags=["User Api"],
     ),
 )
-class UserDetailView(generics.RetrieveAPIView):
+class UserDetailView(
+    ConditionalGetMixin, SparseFieldsetMixin, generics.RetrieveAPIView
+):
     queryset = Member.objects.all()
     permission_classes = [IsAuthenticated]
     serializer_class = MemberSerializer
+    read_serializer = MemberReadSerializer
+    # The ETag is built from it.
+    sparse_extra_columns = ("updated_at",)
 
     def get(self, request, *args, **kwargs):
         instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        not_modified = self.get_not_modified_response(
+            request,
+            etag=self.make_etag(request, instance.pk, instance.updated_at),
+            last_modified=instance.updated_at,
+        )
+        if not_modified is not None:
+            return not_modified
+        data = self.get_read_serializer().from_instance(instance)
+        return Response(data, status=status.HTTP_200_OK)
 
 
+@query_budget(2)
+@extend_schema_view(
+    get=extend_schema(
+        description="Fetch many users in one request: `?ids=1,2,3`. Results "
+        "keep the requested order; unknown ids are listed in `missing`. Use "
+        "`fields`/`exclude` to pick columns.",
+        summary="Fetch Many User Details",
+        operation_id="accounts_user_detail_batch_retrieve",
+        parameters=[
+            OpenApiParameter(
+                "ids",
+                OpenApiTypes.STR,
+                required=True,
+                description="Comma separated user ids.",
+            ),
+            *SPARSE_FIELDSET_PARAMETERS,
+        ],
+        responses={
+            200: OpenApiResponse(
+                response=OperationSuccess,
+                description="Success Response when users are retrived successfully!",
+            ),
+            422: OpenApiResponse(
+                response=OperationError,
+                description="Invalid or too many ids!",
+            ),
+        },
+        tags=["User Api"],
+    ),
+    post=extend_schema(
+        description="Same as the GET form, with the ids in the body for "
+        "batches too long for a URL. Reads only.",
+        summary="Fetch Many User Details",
+        operation_id="accounts_user_detail_batch_create",
+        request=MemberIdsSerializer,
+        parameters=SPARSE_FIELDSET_PARAMETERS,
+        responses={
+            200: OpenApiResponse(
+                response=OperationSuccess,
+                description="Success Response when users are retrived successfully!",
+            ),
+            422: OpenApiResponse(
+                response=OperationError,
+                description="Invalid or too many ids!",
+            ),
+        },
+        tags=["User Api"],
+    ),
+)
+class UserBatchDetailView(
+    ConditionalGetMixin, SparseFieldsetMixin, generics.GenericAPIView
+):
+    queryset = Member.objects.all()
+    permission_classes = [IsAuthenticated]
+    serializer_class = MemberSerializer
+    read_serializer = MemberReadSerializer
+    pagination_class = None
+    # Rows are matched back to the requested ids, and the ETag is built
+    # from their updated_at.
+    sparse_extra_columns = ("id", "updated_at")
+
+    def get_options(self):
+        return {"MAX_IDS": 100, **getattr(settings, "MEMBER_BATCH_DETAIL", {})}
+
+    def invalid(self, message):
+        return UnprocessableEntityException(
+            {"title": "User Detail", "message": message}, code=422
+        )
+
+    def get(self, request, *args, **kwargs):
+        raw = request.query_params.get("ids")
+        if not raw:
+            raise self.invalid("ids is required")
+        try:
+            ids = [int(pk) for pk in raw.split(",") if pk.strip()]
+        except ValueError:
+            raise self.invalid("ids must be comma separated integers")
+        return self.batch(request, ids)
+
+    def post(self, request, *args, **kwargs):
+        mark_read_only()
+        serializer = MemberIdsSerializer(data=request.data)
+        if not serializer.is_valid():
+            raise self.invalid("ids must be a non-empty list of integers")
+        return self.batch(request, serializer.validated_data["ids"])
+
+    def batch(self, request, ids):
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            raise self.invalid("ids is required")
+        max_ids = self.get_options()["MAX_IDS"]
+        if len(ids) > max_ids:
+            raise self.invalid(f"At most {max_ids} ids per request")
+
+        rows = {
+            row["id"]: row
+            for row in self.get_queryset()
+            .filter(pk__in=ids)
+            .values(*self.get_read_columns())
+        }
+        found = [rows[pk] for pk in ids if pk in rows]
+        if request.method == "GET":
+            not_modified = self.get_not_modified_response(
+                request,
+                etag=self.make_etag(
+                    request, *((row["id"], row["updated_at"]) for row in found)
+                ),
+            )
+            if not_modified is not None:
+                return not_modified
+        return Response(
+            {
+                "title": "User Detail",
+                "message": f"{len(found)} of {len(ids)} users fetched",
+                "data": {
+                    "results": self.get_read_serializer().to_dicts(found),
+                    "missing": [pk for pk in ids if pk not in rows],
+                },
+            }
+        )
+
+
+@query_budget(5)
 @extend_schema_view(
     delete=extend_schema(
         description="My User Delete Api",
@@ -191,9 +627,152 @@ class UserDeleteView(generics.DestroyAPIView):
         )
 
     def perform_destroy(self, instance):
-        instance.delete()
+        pk = instance.pk
+        with transaction.atomic():
+            instance.delete()
+            get_revocation_index().revoke_users([pk])
+
+
+@query_budget(None, allow_repeats=True)
+@extend_schema_view(
+    post=extend_schema(
+        description="Block, unblock, activate, deactivate or delete many users "
+        "at once. Target them by `ids` or by a `filter` taking the user-list "
+        'filters, e.g. `{"role": "st", "is_blocked": false}`. The '
+        "caller is never blocked, deactivated or deleted. Only members with "
+        "a MEMBER_BULK_ACTION `MODERATOR_ROLES` role may call it.",
+        summary="Bulk user action",
+        request=MemberBulkActionSerializer,
+        responses={
+            200: OpenApiResponse(
+                response=OperationSuccess,
+                description="Matched and affected counts of the bulk action!",
+            ),
+            403: OpenApiResponse(
+                response=OperationError,
+                description="The caller is not a moderator!",
+            ),
+            422: OpenApiResponse(
+                response=OperationError,
+                description="Json Data Error, occurs when invalid data is sent!",
+            ),
+        },
+        tags=["User Api"],
+    ),
+)
+class UserBulkActionView(generics.GenericAPIView):
+    serializer_class = MemberBulkActionSerializer
+    permission_classes = [IsModerator]
+    # Column values each action sets; None deletes.
+    actions = {
+        "block": {"is_blocked": True},
+        "unblock": {"is_blocked": False},
+        "activate": {"is_active": True},
+        "deactivate": {"is_active": False},
+        "delete": None,
+    }
+    self_excluded_actions = ("block", "deactivate", "delete")
+    # Tokens already issued to these members stop working.
+    revoking_actions = ("block", "deactivate", "delete")
+
+    def get_options(self):
+        return {
+            "CHUNK_SIZE": 500,
+            "MAX_ROWS": 10000,
+            "MODERATOR_ROLES": ["ad"],
+            **getattr(settings, "MEMBER_BULK_ACTION", {}),
+        }
+
+    def get_moderator_roles(self):
+        return self.get_options()["MODERATOR_ROLES"]
+
+    def chunked(self, pks, size):
+        for start in range(0, len(pks), size):
+            yield pks[start : start + size]
+
+    def too_many(self, max_rows):
+        return Response(
+            {
+                "title": "User Bulk Action",
+                "message": f"At most {max_rows} users per request",
+            },
+            status=422,
+        )
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        action = data["action"]
+        options = self.get_options()
+        chunk_size, max_rows = options["CHUNK_SIZE"], options["MAX_ROWS"]
+
+        with transaction.atomic():
+            missing = None
+            if "ids" in data:
+                requested = list(dict.fromkeys(data["ids"]))
+                if len(requested) > max_rows:
+                    return self.too_many(max_rows)
+                found = []
+                for chunk in self.chunked(requested, chunk_size):
+                    found += Member.objects.filter(pk__in=chunk).values_list(
+                        "pk", flat=True
+                    )
+                missing = sorted(set(requested) - set(found))
+            else:
+                queryset = MemberFilterBackend().filter_params(
+                    Member.objects.order_by("pk"), data["filter"]
+                )
+                found = list(queryset.values_list("pk", flat=True)[: max_rows + 1])
+                if len(found) > max_rows:
+                    return self.too_many(max_rows)
+
+            changes = self.actions[action]
+            # Moderators cannot lock themselves out with a broad filter.
+            skipped = []
+            if action in self.self_excluded_actions and request.user.pk in found:
+                found.remove(request.user.pk)
+                skipped.append(request.user.pk)
+            now = timezone.now()
+            affected = 0
+            for chunk in self.chunked(found, chunk_size):
+                targets = Member.objects.filter(pk__in=chunk)
+                if changes is None:
+                    affected += targets.delete()[1].get(Member._meta.label, 0)
+                else:
+                    # update() skips auto_now, so set updated_at (and with it
+                    # the list/detail ETags) by hand, only on changed rows.
+                    affected += targets.exclude(**changes).update(
+                        **changes, updated_at=now
+                    )
+            if action in self.revoking_actions:
+                get_revocation_index().revoke_users(found, batch_size=chunk_size)
+            self.invalidate(found, deleted=changes is None)
+
+        result = {"action": action, "matched": len(found), "affected": affected}
+        if missing is not None:
+            result["missing"] = missing
+        if skipped:
+            result["skipped"] = skipped
+        return Response(
+            {
+                "title": "User Bulk Action",
+                "message": f"{affected} of {len(found)} users {action.rstrip('e')}ed",
+                "data": result,
+            }
+        )
+
+    def invalidate(self, pks, deleted):
+        # update() sends no signals: drop the cached users now and again
+        # once the transaction commits, as UserCache.on_change does.
+        user_cache = get_user_cache()
+        user_cache.invalidate_many(pks)
+        transaction.on_commit(lambda: user_cache.invalidate_many(pks))
+        if deleted:
+            transaction.on_commit(lambda: invalidate_count(Member))
 
 
+@query_budget(3)
 @extend_schema_view(
     patch=extend_schema(
         description="User Update Api",
@@ -225,25 +804,25 @@ class UserUpdateView(generics.UpdateAPIView):
         partial = kwargs.pop("partial", True)
         instance = self.get_object()
         data = request.data
-
-        if "email" in data:
-            if data["email"] != "":
-                if (
-                    Member.objects.filter(email=data["email"]).first()
-                    != self.request.user
-                    and data["email"]
-                ):
-                    return Response(
-                        {
-                            "title": "User Update",
-                            "message": "Email already linked with another user!",
-                        },
-                        status=422,
-                    )
-
-        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        if data.get("email") == "":
+            # A blank email has always meant "leave it unchanged".
+            data = {key: value for key, value in data.items() if key != "email"}
+        serializer = self.get_serializer(instance, data=data, partial=partial)
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
+        # A taken email fails the UPDATE itself; no lookup beforehand.
+        try:
+            with transaction.atomic():
+                self.perform_update(serializer)
+        except IntegrityError as exc:
+            if not is_email_conflict(exc):
+                raise
+            return Response(
+                {
+                    "title": "User Update",
+                    "message": "Email already linked with another user!",
+                },
+                status=422,
+            )
         updated_data = self.get_serializer(instance).data
         return Response(
             {
@@ -254,6 +833,7 @@ class UserUpdateView(generics.UpdateAPIView):
         )
 
 
+@query_budget(2)
 @extend_schema_view(
     post=extend_schema(
         description="User Login Api",
@@ -277,7 +857,7 @@ class EmailLoginView(generics.CreateAPIView):
 
     def create(self, request, *args, **kwargs):
         data = request.data
-        user = Member.objects.filter(email=data.get("email"))
+        user = Member.objects.with_email(data.get("email"))
         if user.exists():
             user: Member = user.first()
             if user.is_blocked:
@@ -289,18 +869,20 @@ class EmailLoginView(generics.CreateAPIView):
                     status=401,
                 )
             if user.check_password(data.get("password")):
-                refresh = RefreshToken.for_user(user)
-                refresh.set_exp(lifetime=datetime.timedelta(days=14))
-                access = refresh.access_token
-                access.set_exp(lifetime=datetime.timedelta(days=1))
+                with timed("jwt"):
+                    refresh = RefreshToken.for_user(user)
+                    refresh.set_exp(lifetime=datetime.timedelta(days=14))
+                    access = refresh.access_token
+                    access.set_exp(lifetime=datetime.timedelta(days=1))
+                    access, refresh = f"{access}", f"{refresh}"
                 return Response(
                     {
                         "title": "Login",
                         "message": "Logged in successfully !",
                         "data": {
-                            **MemberSerializer(user, many=False).data,
-                            "access": f"{access}",
-                            "refresh": f"{refresh}",
+                            **MemberReadSerializer.from_instance(user),
+                            "access": access,
+                            "refresh": refresh,
                         },
                     },
                     status=200,
@@ -323,6 +905,7 @@ class EmailLoginView(generics.CreateAPIView):
             )
 
 
+@query_budget(0)
 @extend_schema_view(
     post=extend_schema(
         description="User Refresh Api",
@@ -341,11 +924,14 @@ class EmailLoginView(generics.CreateAPIView):
     ),
 )
 class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = RevocationCheckedRefreshSerializer
+
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
 
         try:
-            serializer.is_valid(raise_exception=True)
+            with timed("jwt"):
+                serializer.is_valid(raise_exception=True)
         except TokenError as e:
             raise UnprocessableEntityException(
                 {
@@ -363,3 +949,54 @@ class CustomTokenRefreshView(TokenRefreshView):
             },
             status=200,
         )
+
+
+# Cold caches: user, then one revocation row per token.
+@query_budget(3)
+@extend_schema_view(
+    post=extend_schema(
+        description="Revokes the refresh token, and the access token the "
+        "request is authenticated with, until they expire.",
+        summary="Logout Api",
+        request=LogoutSerializer,
+        responses={
+            200: OpenApiResponse(
+                response=OperationSuccess,
+                description="Success Response when user is logged out successfully!",
+            ),
+            422: OpenApiResponse(
+                response=OperationError,
+                description="Json Data Error, occurs when invalid data is sent!",
+            ),
+        },
+        tags=["Login Apis"],
+    ),
+)
+class UserLogoutView(generics.GenericAPIView):
+    serializer_class = LogoutSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            refresh = RefreshToken(serializer.validated_data["refresh"])
+        except TokenError as e:
+            raise UnprocessableEntityException(
+                {
+                    "title": "Logout",
+                    "message": e.args[0],
+                },
+                code=422,
+            )
+
+        index = get_revocation_index()
+        for token in (refresh, request.auth):
+            if token is not None and not index.is_revoked(token.payload):
+                index.revoke_token(token)
+        return Response(
+            {
+                "title": "Logout",
+                "message": "Logged out successfully!",
+            },
+            status=200,
+        )
@@ -0,0 +1,316 @@
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+from rest_framework import exceptions
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+from accounts.api.serializers.accounts import (
+    MemberSerializer,
+    MemberReadSerializer,
+    MemberUpdateSerializer,
+    RevocationCheckedRefreshSerializer,
+)
+from accounts.exports import EXPORT_FORMATS, aiter_export
+from accounts.models import Member, is_email_conflict
+from common.async_views import AsyncAPIView
+from common.counts import CountProvider
+from common.hashing import amake_password
+from common.instrumentation import timed
+from common.pagination import (
+    CustomPagination,
+    get_max_page_size,
+    get_stream_chunk_size,
+)
+from common.renderers import StreamingJSONRenderer
+from common.query_budget import query_budget
+from common.revocation import get_revocation_index
+import datetime
+import math
+
+
+class AsyncMemberMixin:
+    async def get_object(self, pk):
+        try:
+            return await Member.objects.aget(pk=pk)
+        except Member.DoesNotExist:
+            raise exceptions.NotFound()
+
+
+@query_budget(1)
+class AsyncUserCreateView(AsyncAPIView):
+    permission_required = False
+
+    async def post(self, request, *args, **kwargs):
+        data = request.data
+        if "email" not in data:
+            return self.respond(
+                {"title": "User create", "message": "Email is required"},
+                status=422,
+            )
+        serializer = MemberSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        validated_data = dict(serializer.validated_data)
+        password = await amake_password(validated_data.pop("password"))
+        try:
+            member = await Member.objects.acreate(password=password, **validated_data)
+        except IntegrityError as exc:
+            if not is_email_conflict(exc):
+                raise
+            return self.respond(
+                {
+                    "title": "User Create",
+                    "message": "User with this Email already exists !",
+                },
+                status=422,
+            )
+        return self.respond(
+            {
+                "title": "User Create",
+                "message": "User Created Successfully!",
+                "data": MemberSerializer(member).data,
+            }
+        )
+
+
+@query_budget(3)
+class AsyncUserListView(AsyncAPIView):
+    pagination_class = CustomPagination
+    count_provider = CountProvider()
+
+    def get_page_params(self, request):
+        paginator = self.pagination_class
+        try:
+            page = int(request.GET.get(paginator.page_query_param, 1))
+            limit = int(
+                request.GET.get(paginator.page_size_query_param, paginator.page_size)
+            )
+        except ValueError:
+            raise exceptions.NotFound("Invalid page.")
+        if page < 1:
+            raise exceptions.NotFound("Invalid page.")
+        if limit < 1:
+            limit = paginator.page_size
+        return page, min(limit, get_max_page_size())
+
+    async def get(self, request, *args, **kwargs):
+        page, limit = self.get_page_params(request)
+        queryset = Member.objects.order_by("id")
+        count, count_exact = await sync_to_async(self.count_provider.count)(queryset)
+        num_pages = max(1, math.ceil(count / limit))
+        if page > num_pages:
+            raise exceptions.NotFound("Invalid page.")
+        offset = (page - 1) * limit
+        rows = queryset.values(*MemberReadSerializer.columns)[offset : offset + limit]
+        streaming = self.pagination_class().should_stream(limit)
+        if streaming:
+            # Read after the view returns, when the request's replica pinning
+            # no longer applies, so pick the database now.
+            rows = rows.using(rows.db).aiterator(chunk_size=get_stream_chunk_size())
+            results = self.iter_results(rows)
+        else:
+            results = MemberReadSerializer.to_dicts([row async for row in rows])
+
+        url = request.build_absolute_uri()
+        page_param = self.pagination_class.page_query_param
+        next_link = None
+        if page < num_pages:
+            next_link = replace_query_param(url, page_param, page + 1)
+        previous_link = None
+        if page == 2:
+            previous_link = remove_query_param(url, page_param)
+        elif page > 2:
+            previous_link = replace_query_param(url, page_param, page - 1)
+
+        body = {
+            "title": "User List",
+            "message": "List fetched successfully",
+            "data": {
+                "count": count,
+                "count_exact": count_exact,
+                "next": next_link,
+                "previous": previous_link,
+                "results": results,
+            },
+        }
+        if streaming:
+            return StreamingHttpResponse(
+                StreamingJSONRenderer().aiter_render(body),
+                content_type=StreamingJSONRenderer.media_type,
+            )
+        return self.respond(body)
+
+    async def iter_results(self, rows):
+        async for row in rows:
+            yield MemberReadSerializer.to_dict(row)
+
+
+@query_budget(2)
+class AsyncUserExportView(AsyncAPIView):
+    """
+    Export over an async generator: under ASGI, StreamingHttpResponse sends
+    it chunk by chunk, where the sync route's iterator is read into memory
+    first.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        export_format = request.GET.get("output", "ndjson")
+        if export_format not in EXPORT_FORMATS:
+            return self.respond(
+                {
+                    "title": "User Export",
+                    "message": "Output must be one of: "
+                    + ", ".join(sorted(EXPORT_FORMATS)),
+                },
+                status=422,
+            )
+        response = StreamingHttpResponse(
+            aiter_export(export_format, Member.objects.all()),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="members.{export_format}"'
+        return response
+
+
+@query_budget(2)
+class AsyncUserDetailView(AsyncMemberMixin, AsyncAPIView):
+    async def get(self, request, pk, *args, **kwargs):
+        instance = await self.get_object(pk)
+        return self.respond(MemberReadSerializer.from_instance(instance))
+
+
+@query_budget(5)
+class AsyncUserDeleteView(AsyncMemberMixin, AsyncAPIView):
+    def perform_destroy(self, instance):
+        pk = instance.pk
+        with transaction.atomic():
+            instance.delete()
+            get_revocation_index().revoke_users([pk])
+
+    async def delete(self, request, pk, *args, **kwargs):
+        instance = await self.get_object(pk)
+        await sync_to_async(self.perform_destroy)(instance)
+        return self.respond(
+            {
+                "title": "User Delete",
+                "message": "User deleted successfully",
+            }
+        )
+
+
+@query_budget(3)
+class AsyncUserUpdateView(AsyncMemberMixin, AsyncAPIView):
+    http_method_names = [
+        "patch",
+    ]
+
+    async def patch(self, request, pk, *args, **kwargs):
+        instance = await self.get_object(pk)
+        data = request.data
+        if data.get("email") == "":
+            data = {key: value for key, value in data.items() if key != "email"}
+
+        serializer = MemberUpdateSerializer(
+            instance, data=data, partial=True, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        fields = list(serializer.validated_data)
+        for key, value in serializer.validated_data.items():
+            setattr(instance, key, value)
+        try:
+            await instance.asave(update_fields=[*fields, "updated_at"])
+        except IntegrityError as exc:
+            if not is_email_conflict(exc):
+                raise
+            return self.respond(
+                {
+                    "title": "User Update",
+                    "message": "Email already linked with another user!",
+                },
+                status=422,
+            )
+        return self.respond(
+            {
+                "title": "User Updated",
+                "message": "User Updated Successfully!",
+                "data": MemberUpdateSerializer(instance).data,
+            }
+        )
+
+
+@query_budget(2)
+class AsyncEmailLoginView(AsyncAPIView):
+    permission_required = False
+
+    async def post(self, request, *args, **kwargs):
+        data = request.data
+        user = await Member.objects.with_email(data.get("email")).afirst()
+        if user is None:
+            return self.respond(
+                {
+                    "title": "Login",
+                    "message": "Email does not exist!",
+                },
+                status=422,
+            )
+        if user.is_blocked:
+            return self.respond(
+                {
+                    "title": "Login",
+                    "message": "Account Blocked !",
+                },
+                status=401,
+            )
+        if not await user.acheck_password(data.get("password")):
+            return self.respond(
+                {
+                    "title": "Login",
+                    "message": "Password incorrect !",
+                },
+                status=422,
+            )
+        with timed("jwt"):
+            refresh = RefreshToken.for_user(user)
+            refresh.set_exp(lifetime=datetime.timedelta(days=14))
+            access = refresh.access_token
+            access.set_exp(lifetime=datetime.timedelta(days=1))
+            access, refresh = f"{access}", f"{refresh}"
+        return self.respond(
+            {
+                "title": "Login",
+                "message": "Logged in successfully !",
+                "data": {
+                    **MemberReadSerializer.from_instance(user),
+                    "access": access,
+                    "refresh": refresh,
+                },
+            }
+        )
+
+
+@query_budget(0)
+class AsyncTokenRefreshView(AsyncAPIView):
+    permission_required = False
+
+    async def post(self, request, *args, **kwargs):
+        serializer = RevocationCheckedRefreshSerializer(data=request.data)
+        try:
+            with timed("jwt"):
+                serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            return self.respond(
+                {
+                    "title": "Login Refresh",
+                    "message": e.args[0],
+                },
+                status=422,
+            )
+        return self.respond(
+            {
+                "title": "Login Refresh",
+                "message": "Login Refreshed Successfully!",
+                "data": serializer.validated_data,
+            }
+        )
@@ -2,5 +2,15 @@ from django.apps import AppConfig
 
 
 class AccountsConfig(AppConfig):
-    default_auto_field = 'django.db.models.BigAutoField'
-    name = 'accounts'
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "accounts"
+
+    def ready(self):
+        from common.authentication import get_user_cache
+        from common.counts import track_count
+        from common.revocation import get_revocation_index
+
+        member = self.get_model("Member")
+        track_count(member)
+        get_user_cache().connect(member)
+        get_revocation_index().connect(self.get_model("TokenRevocation"))
@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from accounts.models import Member
+import csv
+import json
+
+
+# Every concrete Member column except the password hash.
+EXPORT_FIELDS = [
+    field.attname
+    for field in Member._meta.concrete_fields
+    if field.attname != "password"
+]
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def get_chunk_size():
+    return getattr(settings, "MEMBER_EXPORT_CHUNK_SIZE", 2000)
+
+
+def get_rows(queryset=None):
+    if queryset is None:
+        queryset = Member.objects.all()
+    return queryset.order_by("id")
+
+
+def iter_rows(queryset=None, chunk_size=None):
+    """
+    Yield member rows as tuples in `EXPORT_FIELDS` order. `iterator()` uses
+    a server-side cursor on PostgreSQL, so only one chunk is held at a time.
+    """
+    return (
+        get_rows(queryset)
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=chunk_size or get_chunk_size())
+    )
+
+
+async def aiter_rows(queryset=None, chunk_size=None):
+    """
+    `iter_rows` for async callers. Django 4.2's `aiterator()` opens the
+    cursor of a values_list() queryset on the event loop, which raises
+    SynchronousOnlyOperation, so this reads values() dicts instead.
+    """
+    rows = get_rows(queryset).values(*EXPORT_FIELDS)
+    async for row in rows.aiterator(chunk_size=chunk_size or get_chunk_size()):
+        yield tuple(row.values())
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def get_formatter(export_format):
+    """The header line (or None) and the row formatter of `export_format`."""
+    if export_format == "csv":
+        writer = csv.writer(Echo())
+        return writer.writerow(EXPORT_FIELDS), writer.writerow
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    return None, lambda row: encoder.encode(dict(zip(EXPORT_FIELDS, row))) + "\n"
+
+
+def iter_export(export_format, queryset=None, chunk_size=None):
+    header, format_row = get_formatter(export_format)
+    if header is not None:
+        yield header
+    for row in iter_rows(queryset, chunk_size):
+        yield format_row(row)
+
+
+async def aiter_export(export_format, queryset=None, chunk_size=None):
+    """
+    `iter_export` as an async generator. Under ASGI a StreamingHttpResponse
+    reads a sync iterator into memory before sending it; this one is sent
+    chunk by chunk.
+    """
+    header, format_row = get_formatter(export_format)
+    if header is not None:
+        yield header
+    async for row in aiter_rows(queryset, chunk_size):
+        yield format_row(row)
@@ -0,0 +1,125 @@
+from django.db.models.functions import Lower
+from django.utils.dateparse import parse_date
+from rest_framework.filters import BaseFilterBackend
+from common.exceptions import UnprocessableEntityException
+
+
+BOOLEAN_VALUES = {
+    "true": True,
+    "1": True,
+    "false": False,
+    "0": False,
+}
+
+
+class MemberFilterBackend(BaseFilterBackend):
+    """
+    Query parameter filters for the member list. Every filter maps onto an
+    index declared in `Member.Meta`:
+
+    - `role` (comma separated) and `is_blocked`: (role, is_blocked)
+    - `date_from` / `date_to` (inclusive): (date, id)
+    - `email` / `fullname`: case-insensitive prefix on LOWER(column)
+
+    Prefix searches compare against the LOWER() expression the index is
+    built on rather than using `istartswith`, which PostgreSQL compiles to
+    UPPER(...) and would not match it.
+    """
+
+    prefix_fields = ("email", "fullname")
+    filter_fields = (
+        "role",
+        "is_blocked",
+        "is_active",
+        "date_from",
+        "date_to",
+        *prefix_fields,
+    )
+
+    def invalid(self, message):
+        return UnprocessableEntityException(
+            {"title": "User filter", "message": message},
+            code=422,
+        )
+
+    def parse_boolean(self, name, value):
+        try:
+            return BOOLEAN_VALUES[value.lower()]
+        except KeyError:
+            raise self.invalid(f"{name} must be true or false")
+
+    def parse_date(self, name, value):
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise self.invalid(f"{name} must be a date (YYYY-MM-DD)")
+        return parsed
+
+    def filter_queryset(self, request, queryset, view):
+        return self.filter_params(queryset, request.query_params)
+
+    def get_roles(self, params):
+        return [role for role in params.get("role", "").split(",") if role]
+
+    def active_filters(self, params):
+        """Names of the filters in `params` that `filter_params` applies."""
+        return [
+            name
+            for name in self.filter_fields
+            if (self.get_roles(params) if name == "role" else params.get(name))
+        ]
+
+    def filter_params(self, queryset, params):
+        """Apply the filters in `params`, any mapping of name to string."""
+        roles = self.get_roles(params)
+        if len(roles) == 1:
+            queryset = queryset.filter(role=roles[0])
+        elif roles:
+            queryset = queryset.filter(role__in=roles)
+
+        for name in ("is_blocked", "is_active"):
+            if params.get(name):
+                value = self.parse_boolean(name, params[name])
+                queryset = queryset.filter(**{name: value})
+
+        date_from = params.get("date_from")
+        if date_from:
+            date_from = self.parse_date("date_from", date_from)
+            queryset = queryset.filter(date__gte=date_from)
+        date_to = params.get("date_to")
+        if date_to:
+            date_to = self.parse_date("date_to", date_to)
+            queryset = queryset.filter(date__lte=date_to)
+
+        for name in self.prefix_fields:
+            value = params.get(name)
+            if value:
+                alias = f"{name}_lower"
+                queryset = queryset.alias(**{alias: Lower(name)}).filter(
+                    **{f"{alias}__startswith": value.lower()}
+                )
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        def parameter(name, description, schema=None):
+            return {
+                "name": name,
+                "required": False,
+                "in": "query",
+                "description": description,
+                "schema": schema or {"type": "string"},
+            }
+
+        boolean = {"type": "boolean"}
+        date = {"type": "string", "format": "date"}
+        return [
+            parameter("role", "Comma separated roles, e.g. `st,te`."),
+            parameter("is_blocked", "Blocked (`true`) or unblocked users.", boolean),
+            parameter("is_active", "Active (`true`) or inactive users.", boolean),
+            parameter("date_from", "Earliest `date` (inclusive).", date),
+            parameter("date_to", "Latest `date` (inclusive).", date),
+            parameter("email", "Case-insensitive email prefix."),
+            parameter("fullname", "Case-insensitive full name prefix."),
+        ]
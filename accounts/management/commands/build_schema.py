@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+from common.schema import schema_store
+
+
+class Command(BaseCommand):
+    help = "Generate the OpenAPI schema (JSON, YAML and gzip) into SCHEMA_CACHE_DIR."
+
+    def handle(self, *args, **options):
+        if schema_store.get_directory() is None:
+            raise CommandError("SCHEMA_CACHE_DIR is not set.")
+        documents = schema_store.rebuild()
+        for path in schema_store.write(documents):
+            self.stdout.write(f"Wrote {path}")
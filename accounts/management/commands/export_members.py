@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from accounts.exports import EXPORT_FORMATS, get_chunk_size, iter_export
+
+
+class Command(BaseCommand):
+    help = "Stream every member (without password hashes) as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            dest="export_format",
+            choices=sorted(EXPORT_FORMATS),
+            default="ndjson",
+        )
+        parser.add_argument(
+            "--output",
+            "-o",
+            help="File to write to. Defaults to stdout.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=get_chunk_size())
+
+    def handle(self, *args, **options):
+        rows = iter_export(options["export_format"], chunk_size=options["chunk_size"])
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as out:
+                out.writelines(rows)
+        else:
+            for row in rows:
+                self.stdout.write(row, ending="")
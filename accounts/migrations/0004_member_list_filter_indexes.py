@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-18 18:14
+
+import common.db.indexes
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_member_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['role', 'is_blocked'], name='member_role_blocked_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['date', 'id'], name='member_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(common.db.indexes.PatternOps(django.db.models.functions.text.Lower('email')), name='member_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(common.db.indexes.PatternOps(django.db.models.functions.text.Lower('fullname')), name='member_fullname_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-18 18:19
+
+import common.db.indexes
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_member_list_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='member',
+            constraint=models.UniqueConstraint(common.db.indexes.PatternOps(django.db.models.functions.text.Lower('email')), name='member_email_lower_uniq'),
+        ),
+        migrations.RemoveIndex(
+            model_name='member',
+            name='member_email_lower_idx',
+        ),
+        migrations.AlterField(
+            model_name='member',
+            name='email',
+            field=models.EmailField(max_length=255),
+        ),
+    ]
@@ -1,9 +1,20 @@
 from django.db import models
-from django.contrib.auth.hashers import check_password
+from django.db.models.functions import Lower
+from common.db.indexes import PatternOps
+from common.hashing import acheck_password, check_password
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 
 
 class UserManager(BaseUserManager):
+    def with_email(self, email):
+        """Members with this email in any case, found via member_email_lower_uniq."""
+        if not isinstance(email, str):
+            return self.none()
+        return self.alias(email_lower=Lower("email")).filter(email_lower=email.lower())
+
+    def get_by_natural_key(self, username):
+        return self.with_email(username).get()
+
     def create_user(self, email, password=None):
         user = self.model(email=self.normalize_email(email))
         # user.is_buyer = True
@@ -23,17 +34,70 @@ class UserManager(BaseUserManager):
         return user
 
 
+EMAIL_CONSTRAINT = "member_email_lower_uniq"
+
+
+def is_email_conflict(error):
+    """Whether an IntegrityError was raised by member_email_lower_uniq."""
+    # psycopg2 and psycopg report the violated constraint by name; other
+    # backends (SQLite: "UNIQUE constraint failed: index '...'") only name
+    # it in the message.
+    diag = getattr(error.__cause__, "diag", None)
+    constraint = getattr(diag, "constraint_name", None)
+    if constraint is not None:
+        return constraint == EMAIL_CONSTRAINT
+    return EMAIL_CONSTRAINT in str(error)
+
+
 class Member(AbstractBaseUser):
     firstname = models.CharField(max_length=255)
     lastname = models.CharField(max_length=255)
     fullname = models.CharField(max_length=255)
-    email = models.EmailField(unique=True, max_length=255)
+    # Unique regardless of case through member_email_lower_uniq below.
+    email = models.EmailField(max_length=255)
     password = models.CharField(max_length=255)
     date = models.DateField()
     role = models.CharField(max_length=2)
     is_active = models.BooleanField(default=True)
     is_blocked = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     USERNAME_FIELD = "email"
 
+    objects = UserManager()
+
+    class Meta:
+        # Back the list filters in accounts.filters. On PostgreSQL the LOWER()
+        # indexes use text_pattern_ops so LIKE 'prefix%' can use them under
+        # any collation (equality lookups can use them too).
+        indexes = [
+            models.Index(fields=["role", "is_blocked"], name="member_role_blocked_idx"),
+            models.Index(fields=["date", "id"], name="member_date_id_idx"),
+            models.Index(
+                PatternOps(Lower("fullname")), name="member_fullname_lower_idx"
+            ),
+        ]
+        constraints = [
+            # Emails are unique regardless of case; write paths rely on this
+            # constraint instead of checking first (see is_email_conflict).
+            models.UniqueConstraint(PatternOps(Lower("email")), name=EMAIL_CONSTRAINT),
+        ]
+
     def check_password(self, raw_password):
         return check_password(raw_password, self.password)
+
+    async def acheck_password(self, raw_password):
+        return await acheck_password(raw_password, self.password)
+
+
+class TokenRevocation(models.Model):
+    """
+    A revoked member (every token issued for `user_id` before `revoked_at`)
+    or a single token (`jti`), mirrored in memory by
+    common.revocation.RevocationIndex. Once `expires_at` has passed every
+    token the row covers has expired, so it can be pruned.
+    """
+
+    user_id = models.BigIntegerField(null=True, blank=True)
+    jti = models.CharField(max_length=255, null=True, blank=True)
+    revoked_at = models.DateTimeField(db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
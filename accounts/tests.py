@@ -1,3 +1,2107 @@
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.utils import timezone
+from django.http import HttpResponse
+from django.test import (
+    Client,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from rest_framework import routers
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from accounts.api.viewsets.accounts import (
+    EmailLoginView,
+    UserBatchDetailView,
+    UserBulkActionView,
+    UserCreateView,
+    UserDetailView,
+    UserListView,
+)
+from accounts.api.serializers.accounts import MemberReadSerializer, MemberSerializer
+from accounts.exports import EXPORT_FIELDS, iter_export
+from accounts.filters import MemberFilterBackend
+from accounts.models import Member, TokenRevocation, is_email_conflict
+from common.admission import AdmissionController, get_admission_controller
+from common.authentication import (
+    CachedJWTAuthentication,
+    TokenCache,
+    UserCache,
+    get_token_cache,
+    get_user_cache,
+)
+from common.counts import CountProvider
+from common.db.pool import (
+    ConnectionPool,
+    PoolTimeout,
+    get_pool,
+    pool_metrics,
+    pools,
+)
+from common.exceptions import ServiceUnavailableException
+from common.hashing import PasswordHasherPool, get_hasher_pool
+from common.instrumentation import Histogram
+from common.revocation import (
+    BloomFilter,
+    RevocationIndex,
+    get_cutoff,
+    get_revocation_index,
+)
+from common.query_budget import (
+    QueryBudgetExceeded,
+    assert_query_budget,
+    capture_queries,
+    iter_route_budgets,
+    query_budget,
+)
+from common.routers import (
+    PrimaryReplicaRouter,
+    ReplicaHealth,
+    ReplicaPinningMiddleware,
+    RoutingState,
+    current_routing,
+    mark_read_only,
+)
+from common.schema import SchemaStore, schema_store
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import datetime
+import gzip
+import io
+import json
+import tempfile
+import threading
+import time
+import types
+import unittest
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+
+PASSWORD = "test-password-1"
+ACCOUNTS = "/api/v1/accounts/"
+
+
+def create_member(email, **fields):
+    member = Member(
+        email=email,
+        firstname=fields.pop("firstname", "Test"),
+        lastname=fields.pop("lastname", "Member"),
+        fullname=fields.pop("fullname", "Test Member"),
+        date=fields.pop("date", datetime.date(2020, 1, 1)),
+        role=fields.pop("role", "st"),
+        is_blocked=fields.pop("is_blocked", False),
+        **fields,
+    )
+    member.set_password(PASSWORD)
+    member.save()
+    return member
+
+
+def member_payload(email, **fields):
+    return {
+        "firstname": "New",
+        "lastname": "Member",
+        "fullname": "New Member",
+        "email": email,
+        "password": PASSWORD,
+        "date": "2020-01-01",
+        "role": "st",
+        **fields,
+    }
+
+
+# Hash in-process with a fast hasher, and let every test log in as often as
+# it likes; PasswordHasherPoolTests and AdmissionControlTests cover those.
+MEMBER_API_SETTINGS = {
+    "PASSWORD_HASHERS": ["django.contrib.auth.hashers.MD5PasswordHasher"],
+    "PASSWORD_HASHING": {"ENABLED": False},
+    "ADMISSION_CONTROL": {**settings.ADMISSION_CONTROL, "RATE_LIMITS": {}},
+}
+
+
+class MemberAPIMixin:
+    client_class = APIClient
+
+    def setUp(self):
+        super().setUp()
+        get_user_cache().clear()
+        get_token_cache().clear()
+        # A fresh revocation index: SQLite reuses the ids of members a
+        # previous test revoked.
+        self.enterContext(
+            override_settings(
+                TOKEN_REVOCATION=getattr(settings, "TOKEN_REVOCATION", {})
+            )
+        )
+        self.member = create_member("member@example.com")
+
+    def authenticate(self, member=None):
+        token = RefreshToken.for_user(member or self.member).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def make_moderator(self):
+        """Let self.member call user-bulk-action/."""
+        self.member.role = "ad"
+        self.member.save()
+
+
+@override_settings(**MEMBER_API_SETTINGS)
+class MemberAPITestCase(MemberAPIMixin, TestCase):
+    pass
+
+
+@override_settings(**MEMBER_API_SETTINGS)
+class MemberAPITransactionTestCase(MemberAPIMixin, TransactionTestCase):
+    pass
+
+
+class PasswordHasherPoolTests(SimpleTestCase):
+    def test_hashes_in_worker_processes(self):
+        pool = PasswordHasherPool({"WORKERS": 1, "TIMEOUT": 30})
+        try:
+            encoded = pool.make_password("secret-1")
+            self.assertTrue(pool.check_password("secret-1", encoded))
+            self.assertFalse(pool.check_password("secret-2", encoded))
+            self.assertEqual(pool.metrics()["submitted"], 3)
+        finally:
+            pool.reset()
+
+    def test_workers_are_not_forked(self):
+        pool = PasswordHasherPool()
+        self.assertNotEqual(pool.mp_context.get_start_method(), "fork")
+
+    def test_rejects_beyond_max_pending(self):
+        pool = PasswordHasherPool({"MAX_PENDING": 0})
+        with self.assertRaises(ServiceUnavailableException) as raised:
+            pool.make_password("secret-1")
+        self.assertEqual(raised.exception.wait, 1)
+        self.assertEqual(pool.metrics()["rejected"], 1)
+
+    @override_settings(
+        PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"]
+    )
+    def test_batches_are_hashed_in_bounded_chunks(self):
+        pool = PasswordHasherPool(
+            {"MAX_PENDING": 3, "BATCH_CHUNK_SIZE": 2, "BATCH_MAX_PENDING": 2}
+        )
+        # Same process, so the MD5 hasher above applies.
+        pool._executor = ThreadPoolExecutor(1)
+        self.addCleanup(pool.reset)
+        queued = []
+        submit = pool.submit
+
+        def recording_submit(fn, *args):
+            future = submit(fn, *args)
+            queued.append(pool.metrics()["in_flight"])
+            return future
+
+        pool.submit = recording_submit
+        passwords = [f"secret-{n}" for n in range(7)]
+        encoded = pool.make_passwords(passwords)
+        self.assertEqual(len(encoded), 7)
+        for password, hashed in zip(passwords, encoded):
+            self.assertTrue(check_password(password, hashed))
+        self.assertEqual(len(queued), 4)
+        # One of the three pending slots is always left for logins.
+        self.assertLessEqual(max(queued), 2)
+        self.assertEqual(pool.metrics()["completed"], 4)
+
+    def test_disabled_pool_hashes_inline(self):
+        pool = PasswordHasherPool({"ENABLED": False})
+        encoded = pool.make_password("secret-1")
+        self.assertTrue(pool.check_password("secret-1", encoded))
+        self.assertEqual(pool.metrics()["submitted"], 0)
+
+
+class PasswordHashingSettingsTests(MemberAPITestCase):
+    def test_setting_change_replaces_the_pool(self):
+        self.assertFalse(get_hasher_pool().enabled)
+        response = self.client.post(
+            ACCOUNTS + "user-login/",
+            {"email": "member@example.com", "password": PASSWORD},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_hasher_pool().metrics()["submitted"], 0)
+
+
+class AdmissionControlTests(MemberAPITestCase):
+    def login(self, **extra):
+        return self.client.post(
+            ACCOUNTS + "user-login/",
+            {"email": "member@example.com", "password": PASSWORD},
+            format="json",
+            **extra,
+        )
+
+    @override_settings(
+        ADMISSION_CONTROL={
+            "RATE_LIMITS": {
+                "login": {"ROUTES": [r"/user-login/$"], "RATE": 0.5, "BURST": 2}
+            }
+        }
+    )
+    def test_rate_limit_answers_429_with_retry_after(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.login().status_code, 200)
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "2")
+        self.assertEqual(response.json()["title"], "Admission control")
+        # Buckets are per client.
+        self.assertEqual(self.login(REMOTE_ADDR="10.0.0.2").status_code, 200)
+        metrics = get_admission_controller().metrics()
+        self.assertEqual(metrics["rate_login_limited_total"], 1)
+        self.assertEqual(metrics["rate_login_allowed_total"], 3)
+
+    @override_settings(
+        ADMISSION_CONTROL={
+            "RATE_LIMITS": {
+                "login": {"ROUTES": [r"/user-login/$"], "RATE": 0.5, "BURST": 1}
+            },
+            "CLIENT_IP_HEADER": "X-Forwarded-For",
+        }
+    )
+    def test_client_is_the_address_the_proxy_added(self):
+        forwarded = "HTTP_X_FORWARDED_FOR"
+        self.assertEqual(
+            self.login(**{forwarded: "1.1.1.1, 10.0.0.1"}).status_code, 200
+        )
+        # A client cannot get a fresh bucket by prepending addresses.
+        response = self.login(**{forwarded: "2.2.2.2, 10.0.0.1"})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.login(**{forwarded: "10.0.0.2"}).status_code, 200)
+
+    @override_settings(
+        ADMISSION_CONTROL={
+            "CLASSES": {"read": {"ROUTES": [r"/user-detail/"], "LIMIT": 0}},
+            "RETRY_AFTER": 3,
+        }
+    )
+    def test_full_route_class_answers_503(self):
+        # Routes outside the class are not limited.
+        self.assertEqual(self.login().status_code, 200)
+        self.authenticate()
+        response = self.client.get(ACCOUNTS + f"user-detail/{self.member.pk}")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "3")
+        metrics = get_admission_controller().metrics()
+        self.assertEqual(metrics["class_read_rejected_total"], 1)
+
+    @override_settings(
+        ADMISSION_CONTROL={
+            "CLASSES": {
+                "hashing": {
+                    "ROUTES": [r"/user-login/$"],
+                    "LIMIT": 1,
+                    "QUEUE": 4,
+                    "TIMEOUT": 5.0,
+                },
+                "read": {"ROUTES": [r"/user-detail/"], "LIMIT": 4},
+            }
+        }
+    )
+    def test_sync_requests_do_not_queue_behind_hashing(self):
+        _, _, hashing = get_admission_controller().classes[0]
+        self.assertTrue(hashing.acquire())
+        try:
+            started = time.monotonic()
+            self.assertEqual(self.login().status_code, 503)
+            self.assertLess(time.monotonic() - started, 1.0)
+            self.authenticate()
+            response = self.client.get(ACCOUNTS + f"user-detail/{self.member.pk}")
+            self.assertEqual(response.status_code, 200)
+        finally:
+            hashing.release()
+        metrics = get_admission_controller().metrics()
+        self.assertEqual(metrics["class_hashing_queued_total"], 0)
+        self.assertEqual(metrics["class_read_admitted_total"], 1)
+
+    def test_rate_must_be_positive(self):
+        for rate, burst in ((0, 10), (1, 0)):
+            with self.assertRaises(ImproperlyConfigured):
+                AdmissionController(
+                    {
+                        "RATE_LIMITS": {
+                            "login": {"ROUTES": ["/"], "RATE": rate, "BURST": burst}
+                        }
+                    }
+                )
+
+
+class MemberFilterTests(MemberAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = create_member(
+            "Alice.Smith@example.com",
+            fullname="Alice Smith",
+            role="te",
+            date=datetime.date(2021, 3, 1),
+        )
+        self.bob = create_member(
+            "bob@example.com",
+            fullname="Bob Jones",
+            role="te",
+            is_blocked=True,
+            date=datetime.date(2021, 6, 1),
+        )
+        self.carol = create_member(
+            "carol@example.org",
+            fullname="Carol Alison",
+            role="ad",
+            date=datetime.date(2022, 1, 1),
+        )
+        self.authenticate()
+
+    def list_ids(self, query):
+        response = self.client.get(ACCOUNTS + "user-list/?limit=100&" + query)
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(row["id"] for row in response.json()["data"]["results"])
+
+    def test_role_and_blocked(self):
+        self.assertEqual(self.list_ids("role=te"), [self.alice.pk, self.bob.pk])
+        self.assertEqual(self.list_ids("role=te&is_blocked=false"), [self.alice.pk])
+        self.assertEqual(
+            self.list_ids("role=te,ad&is_blocked=0"), [self.alice.pk, self.carol.pk]
+        )
+
+    def test_date_range_is_inclusive(self):
+        self.assertEqual(
+            self.list_ids("date_from=2021-03-01&date_to=2021-06-01"),
+            [self.alice.pk, self.bob.pk],
+        )
+        self.assertEqual(self.list_ids("date_from=2021-06-02"), [self.carol.pk])
+
+    def test_prefixes_ignore_case(self):
+        self.assertEqual(self.list_ids("email=alice."), [self.alice.pk])
+        self.assertEqual(self.list_ids("email=CAROL@"), [self.carol.pk])
+        # A prefix, not a substring match.
+        self.assertEqual(self.list_ids("fullname=ali"), [self.alice.pk])
+        self.assertEqual(self.list_ids("email=example"), [])
+
+    def test_invalid_values_are_422(self):
+        for query in ("is_blocked=maybe", "date_from=2021-13-01", "date_to=soon"):
+            response = self.client.get(ACCOUNTS + "user-list/?" + query)
+            self.assertEqual(response.status_code, 422, query)
+            self.assertEqual(response.json()["title"], "User filter")
+
+    def query_plan(self, params):
+        queryset = MemberFilterBackend().filter_params(Member.objects.all(), params)
+        if connection.vendor == "postgresql":
+            # Tiny test tables are cheaper to scan; ask which index would do.
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def test_filters_use_their_indexes(self):
+        plan = self.query_plan({"role": "te", "is_blocked": "false"})
+        self.assertIn("member_role_blocked_idx", plan)
+        plan = self.query_plan({"date_from": "2021-01-01", "date_to": "2021-12-31"})
+        self.assertIn("member_date_id_idx", plan)
+
+    @unittest.skipUnless(
+        connection.vendor == "postgresql", "LIKE uses LOWER() indexes on PostgreSQL"
+    )
+    def test_prefixes_use_their_indexes(self):
+        self.assertIn("member_fullname_lower_idx", self.query_plan({"fullname": "ali"}))
+        self.assertIn("member_email_lower_uniq", self.query_plan({"email": "ali"}))
+
+
+class EmailUniquenessTests(MemberAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = create_member("other@example.com")
+
+    def test_create_conflict_ignores_case(self):
+        response = self.client.post(
+            ACCOUNTS + "user-create/",
+            member_payload("MEMBER@Example.com"),
+            format="json",
+        )
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(
+            response.json()["message"], "User with this Email already exists !"
+        )
+        self.assertEqual(Member.objects.count(), 2)
+
+    def test_update_conflict_ignores_case(self):
+        self.authenticate(self.other)
+        response = self.client.patch(
+            ACCOUNTS + f"user-update/{self.other.pk}/",
+            {"email": "Member@Example.COM"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(
+            response.json()["message"], "Email already linked with another user!"
+        )
+
+    def test_login_ignores_case(self):
+        for url in ("user-login/", "async/user-login/"):
+            response = self.client.post(
+                ACCOUNTS + url,
+                {"email": "Member@EXAMPLE.com", "password": PASSWORD},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(response.json()["data"]["id"], self.member.pk)
+        self.assertEqual(
+            Member.objects.get_by_natural_key("MEMBER@example.com"), self.member
+        )
+
+    def test_only_the_member_changes_their_email(self):
+        self.authenticate()
+        for url in ("user-update/", "async/user-update/"):
+            response = self.client.patch(
+                ACCOUNTS + f"{url}{self.other.pk}/",
+                {"email": "taken-over@example.com"},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 403, url)
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.email, "other@example.com")
+
+        response = self.client.patch(
+            ACCOUNTS + f"user-update/{self.member.pk}/",
+            {"email": "renamed@example.com"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.member.refresh_from_db()
+        self.assertEqual(self.member.email, "renamed@example.com")
+
+    def postgres_error(self, constraint):
+        # What Django raises for a psycopg2 UniqueViolation: the driver's
+        # error, with its diagnostics, is the __cause__.
+        cause = Exception(
+            f'duplicate key value violates unique constraint "{constraint}"\n'
+            "DETAIL:  Key (lower(email::text))=(a@example.com) already exists."
+        )
+        cause.diag = types.SimpleNamespace(constraint_name=constraint)
+        error = IntegrityError(*cause.args)
+        error.__cause__ = cause
+        return error
+
+    def test_conflicts_are_told_by_constraint_name(self):
+        self.assertTrue(
+            is_email_conflict(self.postgres_error("member_email_lower_uniq"))
+        )
+        # Other constraints are not email conflicts, whatever the message says.
+        self.assertFalse(is_email_conflict(self.postgres_error("accounts_member_pkey")))
+        self.assertTrue(
+            is_email_conflict(
+                IntegrityError(
+                    "UNIQUE constraint failed: index 'member_email_lower_uniq'"
+                )
+            )
+        )
+        self.assertFalse(
+            is_email_conflict(IntegrityError("NOT NULL constraint failed: email"))
+        )
+
+
+# Both requests must be in flight at once, whatever the hashing LIMIT is.
+@override_settings(ADMISSION_CONTROL={**settings.ADMISSION_CONTROL, "ENABLED": False})
+class EmailRaceTests(MemberAPITransactionTestCase):
+    """Concurrent writes of one email: the constraint lets exactly one win."""
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("in-memory SQLite fails concurrent writers outright")
+
+    def race(self, *requests):
+        """
+        Run each request in its own thread and connection, holding every
+        write to accounts_member until all of them have reached theirs.
+        """
+        barrier = threading.Barrier(len(requests), timeout=10)
+        results = [None] * len(requests)
+
+        def hold(execute, sql, params, many, context):
+            if sql.startswith(('INSERT INTO "accounts_member"', 'UPDATE "accounts_')):
+                barrier.wait()
+            return execute(sql, params, many, context)
+
+        def run(index, request):
+            try:
+                with connection.execute_wrapper(hold):
+                    results[index] = request()
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=run, args=(index, request))
+            for index, request in enumerate(requests)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(response.status_code for response in results)
+
+    def create(self, email):
+        return lambda: APIClient().post(
+            ACCOUNTS + "user-create/", member_payload(email), format="json"
+        )
+
+    def test_concurrent_creates(self):
+        statuses = self.race(
+            self.create("racer@example.com"), self.create("Racer@Example.com")
+        )
+        self.assertEqual(statuses, [200, 422])
+        self.assertEqual(Member.objects.with_email("racer@example.com").count(), 1)
+
+    def test_concurrent_updates(self):
+        members = [
+            create_member("first@example.com"),
+            create_member("second@example.com"),
+        ]
+
+        def update(member, email):
+            def request():
+                client = APIClient()
+                token = RefreshToken.for_user(member).access_token
+                client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+                return client.patch(
+                    ACCOUNTS + f"user-update/{member.pk}/",
+                    {"email": email},
+                    format="json",
+                )
+
+            return request
+
+        statuses = self.race(
+            update(members[0], "wanted@example.com"),
+            update(members[1], "WANTED@example.com"),
+        )
+        self.assertEqual(statuses, [200, 422])
+        self.assertEqual(Member.objects.with_email("wanted@example.com").count(), 1)
+
+
+class CursorPaginationTests(MemberAPITestCase):
+    def setUp(self):
+        super().setUp()
+        for number, day in enumerate([3, 1, 3, 2]):
+            create_member(
+                f"cursor{number}@example.com", date=datetime.date(2021, 1, day)
+            )
+        self.authenticate()
+
+    def walk(self, url):
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()["data"]
+            ids += [row["id"] for row in data["results"]]
+            pages.append(data)
+            url = data["next"]
+        return ids, pages
+
+    def test_walks_every_member_once_in_key_order(self):
+        ids, pages = self.walk(ACCOUNTS + "user-list/?paginate=cursor&limit=2")
+        self.assertEqual(
+            ids, list(Member.objects.order_by("id").values_list("id", flat=True))
+        )
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]["previous"])
+        self.assertNotIn("count", pages[0])
+
+        previous = self.client.get(pages[-1]["previous"]).json()["data"]
+        self.assertEqual(previous["results"], pages[1]["results"])
+
+    def test_date_ordering_breaks_ties_by_id(self):
+        ids, _ = self.walk(
+            ACCOUNTS + "user-list/?paginate=cursor&order_by=date&limit=2"
+        )
+        self.assertEqual(
+            ids,
+            list(Member.objects.order_by("date", "id").values_list("id", flat=True)),
+        )
+
+    def test_pages_seek_instead_of_offset(self):
+        first = self.client.get(ACCOUNTS + "user-list/?paginate=cursor&limit=2")
+        with capture_queries() as log:
+            response = self.client.get(first.json()["data"]["next"])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([sql for sql in log.statements if "OFFSET" in sql])
+
+    def test_count_is_opt_in(self):
+        response = self.client.get(ACCOUNTS + "user-list/?paginate=cursor&count=true")
+        self.assertEqual(response.json()["data"]["count"], 5)
+
+    def test_invalid_cursors_are_404(self):
+        date_page = self.client.get(
+            ACCOUNTS + "user-list/?paginate=cursor&order_by=date&limit=2"
+        )
+        next_url = date_page.json()["data"]["next"]
+        cursor = parse_qs(urlsplit(next_url).query)["cursor"][0]
+        response = self.client.get(
+            ACCOUNTS + "user-list/", {"cursor": cursor, "order_by": "date"}
+        )
+        self.assertEqual(response.status_code, 200)
+        for value in ["not-base64!", "eyJrIjogMX0=", cursor]:
+            response = self.client.get(
+                ACCOUNTS + "user-list/", {"cursor": value, "order_by": "id"}
+            )
+            self.assertEqual(response.status_code, 404, value)
+
+
+COUNT_CACHES = {
+    **settings.CACHES,
+    "counts": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+
+
+@override_settings(CACHES=COUNT_CACHES, PAGINATION_COUNT_CACHE="counts")
+class TrackedCountTests(MemberAPITestCase):
+    def setUp(self):
+        super().setUp()
+        caches["counts"].clear()
+        self.provider = CountProvider()
+
+    def test_unfiltered_total_is_counted_once(self):
+        self.assertEqual(self.provider.count(Member.objects.all()), (1, True))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.provider.count(Member.objects.all()), (1, True))
+
+    def test_signals_adjust_the_total(self):
+        self.provider.count(Member.objects.all())
+        with self.captureOnCommitCallbacks(execute=True):
+            create_member("other@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            create_member("third@example.com")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.provider.count(Member.objects.all()), (2, True))
+
+    def test_bulk_writes_invalidate_the_total(self):
+        self.provider.count(Member.objects.all())
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                ACCOUNTS + "user-bulk-create/",
+                [member_payload(f"bulk{n}@example.com") for n in range(3)],
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.provider.count(Member.objects.all()), (4, True))
+
+    def test_filtered_querysets_are_counted(self):
+        self.provider.count(Member.objects.all())
+        with self.assertNumQueries(1):
+            count = self.provider.count(Member.objects.filter(role="te"))
+        self.assertEqual(count, (0, True))
+
+    @override_settings(PAGINATION_COUNT_CACHE=None)
+    def test_counts_without_a_shared_cache(self):
+        create_member("other@example.com")
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                count = self.provider.count(Member.objects.all())
+            self.assertEqual(count, (2, True))
+
+
+class BulkCreateTests(MemberAPITestCase):
+    url = ACCOUNTS + "user-bulk-create/"
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate()
+
+    def test_reports_every_row(self):
+        rows = [
+            member_payload("one@example.com"),
+            member_payload("not-an-email"),
+            member_payload("ONE@example.com"),
+            member_payload("Member@example.com"),
+            member_payload("two@example.com"),
+        ]
+        response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual((data["created"], data["failed"]), (2, 3))
+        statuses = [row["status"] for row in data["results"]]
+        self.assertEqual(statuses, ["created", "failed", "failed", "failed", "created"])
+        self.assertIn("email", data["results"][1]["errors"])
+        self.assertEqual(data["results"][2]["errors"], "Duplicate email in request!")
+        self.assertEqual(
+            data["results"][3]["errors"], "User with this Email already exists !"
+        )
+        member = Member.objects.get(pk=data["results"][4]["id"])
+        self.assertEqual(member.email, "two@example.com")
+        self.assertTrue(member.check_password(PASSWORD))
+
+    @override_settings(MEMBER_BULK_CREATE={"BATCH_SIZE": 2, "MAX_ROWS": 10})
+    def test_inserts_in_batches(self):
+        rows = [member_payload(f"batch{n}@example.com") for n in range(5)]
+        with capture_queries() as log:
+            response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.json()["data"]["created"], 5)
+        inserts = [sql for sql in log.statements if sql.startswith("INSERT")]
+        self.assertEqual(len(inserts), 3)
+
+    def test_accepts_ndjson(self):
+        body = "\n".join(
+            json.dumps(member_payload(f"line{n}@example.com")) for n in range(2)
+        )
+        response = self.client.post(
+            self.url, body + "\n\n", content_type="application/x-ndjson"
+        )
+        self.assertEqual(response.json()["data"]["created"], 2)
+        self.assertTrue(Member.objects.filter(email="line1@example.com").exists())
+
+    @override_settings(MEMBER_BULK_CREATE={"MAX_ROWS": 1})
+    def test_rejects_oversized_and_non_list_bodies(self):
+        for body in [member_payload("a@example.com"), [member_payload("b@x.io")] * 2]:
+            response = self.client.post(self.url, body, format="json")
+            self.assertEqual(response.status_code, 422)
+        self.assertEqual(Member.objects.count(), 1)
+
+
+class ExportTests(MemberAPITestCase):
+    url = ACCOUNTS + "user-export/"
+
+    def setUp(self):
+        super().setUp()
+        self.other = create_member("other@example.com", role="te")
+        self.authenticate()
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson_streams_every_member_without_passwords(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row["id"] for row in rows], [self.member.pk, self.other.pk])
+        self.assertEqual(rows[1]["role"], "te")
+        self.assertEqual(rows[1]["date"], "2020-01-01")
+        self.assertNotIn("password", rows[0])
+
+    def test_csv_has_a_header_row(self):
+        response = self.client.get(self.url, {"output": "csv"})
+        self.assertIn('filename="members.csv"', response["Content-Disposition"])
+        rows = list(csv.reader(io.StringIO(self.read(response))))
+        self.assertEqual(rows[0], EXPORT_FIELDS)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[2][EXPORT_FIELDS.index("email")], "other@example.com")
+
+    def test_chunks_share_one_cursor(self):
+        with capture_queries() as log:
+            lines = list(iter_export("ndjson", chunk_size=1))
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(len(log), 1)
+
+    def test_unknown_format_is_422(self):
+        response = self.client.get(self.url, {"output": "xml"})
+        self.assertEqual(response.status_code, 422)
+
+    def test_management_command_writes_the_same_rows(self):
+        out = io.StringIO()
+        call_command("export_members", format="csv", stdout=out)
+        response = self.client.get(self.url, {"output": "csv"})
+        self.assertEqual(out.getvalue(), self.read(response))
+
+    async def test_async_route_streams_an_async_iterator(self):
+        token = RefreshToken.for_user(self.member).access_token
+        response = await self.async_client.get(
+            ACCOUNTS + "async/user-export/",
+            {"output": "csv"},
+            headers={"authorization": f"Bearer {token}"},
+        )
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        rows = list(csv.reader(io.StringIO(body.decode())))
+        self.assertEqual(rows[0], EXPORT_FIELDS)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[2][EXPORT_FIELDS.index("email")], "other@example.com")
+
+    async def test_async_route_rejects_unknown_formats(self):
+        token = RefreshToken.for_user(self.member).access_token
+        response = await self.async_client.get(
+            ACCOUNTS + "async/user-export/",
+            {"output": "xml"},
+            headers={"authorization": f"Bearer {token}"},
+        )
+        self.assertEqual(response.status_code, 422)
+
+
+SHARED_CACHES = {
+    **settings.CACHES,
+    "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+
+
+class UserCacheTests(MemberAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.authenticate()
+        self.url = ACCOUNTS + f"user-detail/{self.member.pk}"
+
+    def member_queries(self):
+        with capture_queries() as log:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [sql for sql in log.statements if 'FROM "accounts_member"' in sql]
+
+    def test_repeat_requests_skip_the_user_query(self):
+        self.assertEqual(len(self.member_queries()), 2)
+        self.assertEqual(len(self.member_queries()), 1)
+
+    def test_saving_the_member_drops_the_cached_user(self):
+        self.client.get(self.url)
+        self.member.is_blocked = True
+        self.member.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["code"], "user_blocked")
+
+    def test_deleting_the_member_drops_the_cached_user(self):
+        other = create_member("other@example.com")
+        self.authenticate(other)
+        self.client.get(self.url)
+        other.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_entries_expire_and_are_evicted(self):
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return self.member
+
+        cache = UserCache({"TTL": 0})
+        cache.get(1, loader)
+        cache.get(1, loader)
+        self.assertEqual(len(loads), 2)
+
+        cache = UserCache({"MAX_SIZE": 1})
+        cache.get(1, loader)
+        cache.get(2, loader)
+        cache.get(1, loader)
+        self.assertEqual(len(loads), 5)
+        self.assertEqual(cache.metrics()["size"], 1)
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_local_entries_live_at_most_the_sync_interval(self):
+        interval = settings.TOKEN_REVOCATION["SYNC_INTERVAL"]
+        self.assertEqual(UserCache({"TTL": 300}).ttl, interval)
+        self.assertEqual(UserCache({"TTL": 300, "BACKEND": "shared"}).ttl, 300)
+
+    def test_revocations_from_other_processes_drop_cached_users(self):
+        authentication = CachedJWTAuthentication()
+        token = {"user_id": self.member.pk}
+        authentication.get_user(token)
+        # Blocked by another process: no signal reaches this one's cache.
+        Member.objects.filter(pk=self.member.pk).update(is_blocked=True)
+        self.assertFalse(authentication.get_user(token).is_blocked)
+
+        # Its revocation arrives with the next index sync.
+        get_revocation_index().add(users=[(self.member.pk, time.time() + 1)])
+        with self.assertRaises(AuthenticationFailed) as caught:
+            authentication.get_user(token)
+        self.assertEqual(caught.exception.detail["code"], "user_blocked")
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_invalidation_reaches_other_processes(self):
+        caches["shared"].clear()
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return self.member
+
+        # One cache per worker process, both backed by the shared alias.
+        first = UserCache({"BACKEND": "shared"})
+        second = UserCache({"BACKEND": "shared"})
+        first.get(self.member.pk, loader)
+        self.assertEqual(second.get(self.member.pk, loader).pk, self.member.pk)
+        self.assertEqual(len(loads), 1)
+
+        first.invalidate(self.member.pk)
+        second.get(self.member.pk, loader)
+        self.assertEqual(len(loads), 2)
+
+
+class SchemaViewTests(TestCase):
+    url = "/api/v1/doc/schema/"
+
+    def test_serves_the_schema_with_an_etag(self):
+        response = self.client.get(self.url, {"format": "json"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            "/api/v1/accounts/user-list/", json.loads(response.content)["paths"]
+        )
+        self.assertEqual(response["ETag"], schema_store.get("json").etag)
+
+        response = self.client.get(
+            self.url, {"format": "json"}, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_gzip_body_has_its_own_etag(self):
+        plain = self.client.get(self.url)
+        gzipped = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(gzipped["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(gzipped.content), plain.content)
+        self.assertNotEqual(gzipped["ETag"], plain["ETag"])
+        self.assertIn("Accept-Encoding", gzipped["Vary"])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=plain["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_build_schema_writes_files_served_outside_debug(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(SCHEMA_CACHE_DIR=directory, DEBUG=False):
+                call_command("build_schema", stdout=io.StringIO())
+                store = SchemaStore()
+                store.generate = None  # Must not walk the views again.
+                self.assertEqual(store.get("yaml").etag, schema_store.get("yaml").etag)
+            with override_settings(SCHEMA_CACHE_DIR=directory, DEBUG=True):
+                self.assertIsNone(SchemaStore().load())
+
+
+class ConditionalGetTests(MemberAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = create_member("other@example.com", role="te")
+        self.authenticate()
+
+    def test_detail_answers_304_until_the_member_changes(self):
+        url = ACCOUNTS + f"user-detail/{self.other.pk}"
+        response = self.client.get(url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        self.other.fullname = "Renamed Member"
+        self.other.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["fullname"], "Renamed Member")
+
+    def test_list_without_a_shared_count_cache_answers_304_in_one_query(self):
+        url = ACCOUNTS + "user-list/?role=te"
+        etag = self.client.get(url)["ETag"]
+        with capture_queries() as log:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(log), 1)
+        self.assertIn("COUNT(", log.statements[0])
+        self.assertIn("MAX(", log.statements[0])
+
+        # Leaving the filter changes the count, even with an old updated_at.
+        Member.objects.filter(pk=self.other.pk).update(role="st")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["results"], [])
+
+
+@override_settings(CACHES=COUNT_CACHES, PAGINATION_COUNT_CACHE="counts")
+class ListConditionalGetTests(MemberAPITestCase):
+    url = ACCOUNTS + "user-list/?role=te"
+
+    def setUp(self):
+        caches["counts"].clear()
+        super().setUp()
+        self.other = create_member("other@example.com", role="te")
+        self.authenticate()
+        self.etag = self.client.get(self.url)["ETag"]
+
+    def get(self):
+        return self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag)
+
+    def test_304_without_counting(self):
+        with capture_queries() as log:
+            self.assertEqual(self.get().status_code, 304)
+        self.assertFalse([sql for sql in log.statements if "COUNT(" in sql])
+        other_page = self.client.get(ACCOUNTS + "user-list/?role=st")
+        self.assertNotEqual(other_page["ETag"], self.etag)
+
+    def test_inserts_change_the_etag(self):
+        create_member("third@example.com", role="te")
+        self.assertEqual(self.get().status_code, 200)
+
+    def test_updates_out_of_the_filter_change_the_etag(self):
+        Member.objects.filter(pk=self.other.pk).update(
+            role="st", updated_at=timezone.now()
+        )
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["results"], [])
+
+    def test_deletes_change_the_etag(self):
+        create_member("third@example.com", role="te", updated_at=timezone.now())
+        self.etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.delete()
+        self.assertEqual(self.get().status_code, 200)
+
+
+class AsyncViewTests(MemberAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = create_member("other@example.com", role="te")
+
+    def both(self, path):
+        sync = self.client.get(ACCOUNTS + path)
+        asynchronous = self.client.get(ACCOUNTS + "async/" + path)
+        self.assertEqual((sync.status_code, asynchronous.status_code), (200, 200))
+        return sync.json(), asynchronous.json()
+
+    def test_reads_match_the_sync_views(self):
+        self.authenticate()
+        sync, asynchronous = self.both(f"user-detail/{self.other.pk}")
+        self.assertEqual(asynchronous, sync)
+
+        sync, asynchronous = self.both("user-list/?limit=1&page=2")
+        for key in ("count", "count_exact", "results"):
+            self.assertEqual(asynchronous["data"][key], sync["data"][key])
+        self.assertIn("async/user-list/?limit=1", asynchronous["data"]["previous"])
+
+    def test_create_update_and_delete(self):
+        response = self.client.post(
+            ACCOUNTS + "async/user-create/",
+            member_payload("async@example.com"),
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        created = Member.objects.get(email="async@example.com")
+        self.assertTrue(created.check_password(PASSWORD))
+
+        self.authenticate()
+        response = self.client.patch(
+            ACCOUNTS + f"async/user-update/{self.other.pk}/",
+            {"fullname": "Async Renamed"},
+            format="json",
+        )
+        self.assertEqual(response.json()["data"]["fullname"], "Async Renamed")
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.fullname, "Async Renamed")
+
+        response = self.client.delete(ACCOUNTS + f"async/user-delete/{created.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Member.objects.filter(pk=created.pk).exists())
+        response = self.client.delete(ACCOUNTS + f"async/user-delete/{created.pk}/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_refresh_issues_a_working_access_token(self):
+        refresh = str(RefreshToken.for_user(self.other))
+        response = self.client.post(
+            ACCOUNTS + "async/refresh/", {"refresh": refresh}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {response.json()['data']['access']}"
+        )
+        response = self.client.get(ACCOUNTS + f"async/user-detail/{self.other.pk}")
+        self.assertEqual(response.status_code, 200)
+
+    def test_requires_authentication(self):
+        response = self.client.get(ACCOUNTS + f"async/user-detail/{self.member.pk}")
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("Bearer", response["WWW-Authenticate"])
+
+
+class InstrumentationTests(MemberAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.authenticate()
+        self.url = ACCOUNTS + f"user-detail/{self.member.pk}"
+
+    def server_timing(self, response):
+        return dict(
+            entry.split(";", 1) for entry in response["Server-Timing"].split(", ")
+        )
+
+    def test_server_timing_reports_sql_and_total(self):
+        with capture_queries() as log:
+            response = self.client.get(self.url)
+        timing = self.server_timing(response)
+        self.assertIn(f'desc="{len(log)} queries"', timing["sql"])
+        self.assertIn("total", timing)
+
+        response = self.client.post(
+            ACCOUNTS + "user-login/",
+            {"email": self.member.email, "password": PASSWORD},
+            format="json",
+        )
+        self.assertIn("jwt", self.server_timing(response))
+
+    async def test_async_routes_report_their_queries(self):
+        token = RefreshToken.for_user(self.member).access_token
+        response = await self.async_client.get(
+            ACCOUNTS + "async/" + f"user-detail/{self.member.pk}",
+            headers={"authorization": f"Bearer {token}"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('desc="0 queries"', self.server_timing(response)["sql"])
+        self.assertEqual(connection.execute_wrappers, [])
+
+    @override_settings(SERVER_TIMING_HEADER=False)
+    def test_server_timing_can_be_turned_off(self):
+        self.assertNotIn("Server-Timing", self.client.get(self.url))
+
+    def test_metrics_count_requests_per_route(self):
+        route = 'route="/api/v1/accounts/user-detail/<int:pk>"'
+
+        def requests_total():
+            body = self.client.get("/metrics/").content.decode()
+            for line in body.splitlines():
+                if line.startswith("eduzeit_requests_total{") and route in line:
+                    if 'status="200"' in line:
+                        return int(line.rsplit(" ", 1)[1])
+            return 0
+
+        before = requests_total()
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.assertEqual(requests_total(), before + 2)
+        body = self.client.get("/metrics/").content.decode()
+        self.assertIn("eduzeit_auth_user_cache_hits", body)
+        self.assertIn("eduzeit_request_duration_seconds_bucket{", body)
+
+    @override_settings(METRICS_TOKEN="metrics-secret")
+    def test_metrics_token(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get("/metrics/").status_code, 403)
+        response = self.client.get(
+            "/metrics/", HTTP_AUTHORIZATION="Bearer metrics-secret"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram((1, 5))
+        for value in (0, 3, 9):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 2])
+        self.assertEqual((histogram.count, histogram.sum), (3, 12))
+
+
+class InstrumentationConnectionTests(MemberAPITransactionTestCase):
+    def test_no_wrapper_outlives_the_request(self):
+        # A connection opened during the request, inside another
+        # execute_wrapper() block, must not shift that block's wrapper.
+        self.authenticate()
+        connection.close()
+        with capture_queries() as log:
+            response = self.client.get(ACCOUNTS + f"user-detail/{self.member.pk}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(connection.execute_wrappers, [])
+        seen = len(log)
+        Member.objects.count()
+        self.assertEqual(len(log), seen)
+
+
+class QueryBudgetTests(MemberAPITestCase):
+    """Each route stays within the budget it declares, with cold caches."""
+
+    def setUp(self):
+        super().setUp()
+        self.others = [
+            create_member(f"budget{n}@example.com", role="te") for n in range(12)
+        ]
+        self.make_moderator()
+        # RevocationSyncMiddleware's periodic query is outside every budget.
+        get_revocation_index().sync()
+
+    def test_list(self):
+        self.authenticate()
+        for query in ("", "?role=te&limit=3", "?paginate=cursor&count=true"):
+            get_user_cache().clear()
+            with assert_query_budget(UserListView, query):
+                response = self.client.get(ACCOUNTS + "user-list/" + query)
+            self.assertEqual(response.status_code, 200)
+
+    @override_settings(CACHES=COUNT_CACHES, PAGINATION_COUNT_CACHE="counts")
+    def test_list_with_a_tracked_count(self):
+        caches["counts"].clear()
+        self.authenticate()
+        with assert_query_budget(UserListView):
+            self.client.get(ACCOUNTS + "user-list/")
+
+    def test_detail(self):
+        self.authenticate()
+        with assert_query_budget(UserDetailView):
+            response = self.client.get(ACCOUNTS + f"user-detail/{self.member.pk}")
+        self.assertEqual(response.status_code, 200)
+
+    def test_batch_detail(self):
+        self.authenticate()
+        ids = ",".join(str(member.pk) for member in self.others)
+        with assert_query_budget(UserBatchDetailView):
+            response = self.client.get(ACCOUNTS + "user-detail/", {"ids": ids})
+        self.assertEqual(len(response.json()["data"]["results"]), 12)
+        get_user_cache().clear()
+        with assert_query_budget(UserBatchDetailView, "POST"):
+            response = self.client.post(
+                ACCOUNTS + "user-detail/",
+                {"ids": [member.pk for member in self.others]},
+                format="json",
+            )
+        self.assertEqual(len(response.json()["data"]["results"]), 12)
+
+    def test_login(self):
+        with assert_query_budget(EmailLoginView):
+            response = self.client.post(
+                ACCOUNTS + "user-login/",
+                {"email": self.member.email, "password": PASSWORD},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_create(self):
+        with assert_query_budget(UserCreateView):
+            response = self.client.post(
+                ACCOUNTS + "user-create/",
+                member_payload("budget-new@example.com"),
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_bulk_action_queries_do_not_grow_with_the_rows(self):
+        # The view is unbudgeted (its queries grow per CHUNK_SIZE chunk), but
+        # within one chunk the count must not depend on the number of rows.
+        self.authenticate()
+        counts = []
+        for members in (self.others[:2], self.others[2:]):
+            get_user_cache().clear()
+            with assert_query_budget(UserBulkActionView) as log:
+                response = self.client.post(
+                    ACCOUNTS + "user-bulk-action/",
+                    {"action": "block", "ids": [member.pk for member in members]},
+                    format="json",
+                )
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(log))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_repeated_queries_are_reported(self):
+        @query_budget(10)
+        def view():
+            for member in self.others[:3]:
+                Member.objects.get(pk=member.pk)
+
+        with self.assertRaisesMessage(QueryBudgetExceeded, "probable N+1: 3x"):
+            with assert_query_budget(view):
+                view()
+
+    def test_every_accounts_route_declares_a_budget(self):
+        undeclared = []
+        for route, view, _ in iter_route_budgets():
+            view_class = getattr(view, "cls", None) or getattr(view, "view_class", None)
+            if not route.startswith(ACCOUNTS[1:]) or issubclass(
+                view_class, routers.APIRootView
+            ):
+                continue
+            if not hasattr(view_class, "query_budget"):
+                undeclared.append(route)
+        self.assertEqual(undeclared, [])
+
+
+class SparseFieldsetTests(MemberAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.authenticate()
+        # Keep the authentication query out of the captured SQL.
+        get_user_cache().get(self.member.pk, lambda: self.member)
+
+    def page_query(self, log):
+        return next(
+            sql
+            for sql in log.statements
+            if 'FROM "accounts_member"' in sql and "LIMIT" in sql and "COUNT" not in sql
+        )
+
+    def test_list_selects_only_the_requested_columns(self):
+        with capture_queries() as log:
+            response = self.client.get(ACCOUNTS + "user-list/?fields=id,fullname")
+        self.assertEqual(
+            list(response.json()["data"]["results"][0]), ["id", "fullname"]
+        )
+        sql = self.page_query(log)
+        self.assertIn('"fullname"', sql)
+        self.assertNotIn('"email"', sql)
+
+    def test_exclude(self):
+        response = self.client.get(ACCOUNTS + "user-list/?exclude=email,last_login")
+        row = response.json()["data"]["results"][0]
+        self.assertNotIn("email", row)
+        self.assertNotIn("last_login", row)
+        self.assertIn("fullname", row)
+
+    def test_detail_defers_the_other_columns(self):
+        url = ACCOUNTS + f"user-detail/{self.member.pk}"
+        with capture_queries() as log:
+            response = self.client.get(url, {"fields": "email"})
+        self.assertEqual(response.json(), {"email": "member@example.com"})
+        self.assertNotIn('"fullname"', self.page_query(log))
+        self.assertIn("ETag", response)
+
+    def test_password_and_unknown_fields_are_422(self):
+        for query in ("fields=password", "fields=id,nope", "exclude=password"):
+            response = self.client.get(ACCOUNTS + "user-list/?" + query)
+            self.assertEqual(response.status_code, 422, query)
+            self.assertEqual(response.json()["title"], "Field selection")
+
+
+@override_settings(**MEMBER_API_SETTINGS)
+class CompiledReadSerializerTests(TestCase):
+    def setUp(self):
+        self.members = [
+            create_member("plain@example.com"),
+            create_member(
+                "logged-in@example.com",
+                last_login=datetime.datetime(
+                    2021, 5, 4, 3, 2, 1, 500, tzinfo=datetime.timezone.utc
+                ),
+                is_blocked=True,
+                role="te",
+            ),
+        ]
+
+    def test_matches_the_model_serializer(self):
+        expected = [
+            {
+                name: value
+                for name, value in MemberSerializer(member).data.items()
+                if name != "password"
+            }
+            for member in self.members
+        ]
+        rows = Member.objects.order_by("id").values(*MemberReadSerializer.columns)
+        self.assertEqual(MemberReadSerializer.to_dicts(rows), expected)
+        self.assertEqual(
+            [MemberReadSerializer.from_instance(member) for member in self.members],
+            expected,
+        )
+        self.assertEqual(
+            list(expected[0]), [name for name, _, _ in MemberReadSerializer.plan]
+        )
+        self.assertIsNone(expected[0]["last_login"])
+        self.assertTrue(expected[1]["last_login"].endswith("Z"))
+
+    def test_select_narrows_and_is_reused(self):
+        selected = MemberReadSerializer.select(["fullname", "id"])
+        self.assertIs(selected, MemberReadSerializer.select(["fullname", "id"]))
+        self.assertIs(MemberReadSerializer.select(None), MemberReadSerializer)
+        self.assertEqual(
+            selected.from_instance(self.members[0]),
+            {"id": self.members[0].pk, "fullname": "Test Member"},
+        )
+        self.assertNotIn("password", MemberReadSerializer.columns)
+
+
+class FakeHealth(ReplicaHealth):
+    def __init__(self, down=()):
+        super().__init__(check_interval=0, cooldown=60)
+        self.down = set(down)
+
+    def probe(self, alias):
+        return alias not in self.down
+
+
+@override_settings(DATABASE_REPLICAS={"REPLICAS": ["replica1", "replica2"]})
+class ReplicaRoutingTests(SimpleTestCase):
+    def router(self, down=()):
+        router = PrimaryReplicaRouter()
+        router.health = FakeHealth(down)
+        return router
+
+    def read(self, router, state=None):
+        token = current_routing.set(state)
+        try:
+            return router.db_for_read(Member)
+        finally:
+            current_routing.reset(token)
+
+    def test_reads_rotate_over_healthy_replicas(self):
+        router = self.router()
+        reads = [self.read(router) for _ in range(4)]
+        self.assertEqual(reads, ["replica1", "replica2", "replica1", "replica2"])
+        self.assertEqual(router.db_for_write(Member), "default")
+
+    def test_unhealthy_replicas_are_skipped_for_the_cooldown(self):
+        router = self.router(down=["replica1"])
+        self.assertEqual({self.read(router) for _ in range(3)}, {"replica2"})
+        router.health.down.clear()
+        self.assertEqual({self.read(router) for _ in range(3)}, {"replica2"})
+        self.assertEqual(self.read(self.router(["replica1", "replica2"])), "default")
+
+    def test_unsafe_and_pinned_requests_read_from_the_primary(self):
+        router = self.router()
+        self.assertEqual(self.read(router, RoutingState(unsafe=True)), "default")
+        self.assertEqual(self.read(router, RoutingState(client_pinned=True)), "default")
+
+        state = RoutingState(unsafe=True)
+        token = current_routing.set(state)
+        try:
+            mark_read_only()
+        finally:
+            current_routing.reset(token)
+        self.assertEqual(self.read(router, state), "replica1")
+
+    @override_settings(DATABASE_REPLICAS={"REPLICAS": []})
+    def test_without_replicas_everything_uses_the_primary(self):
+        self.assertEqual(self.read(self.router()), "default")
+
+    def write(self, **auth):
+        router = self.router()
+
+        def view(request):
+            router.db_for_write(Member)
+            return HttpResponse()
+
+        return ReplicaPinningMiddleware(view)(RequestFactory().post("/", **auth))
+
+    def pinned(self, request):
+        middleware = ReplicaPinningMiddleware(lambda request: HttpResponse())
+        return middleware.get_state(request).pinned
+
+    def test_a_write_pins_the_client_with_a_cookie(self):
+        response = self.write()
+        request = RequestFactory().get("/")
+        request.COOKIES["db_pin"] = response.cookies["db_pin"].value
+        self.assertTrue(self.pinned(request))
+        self.assertFalse(self.pinned(RequestFactory().get("/")))
+
+    @override_settings(
+        CACHES=SHARED_CACHES,
+        DATABASE_REPLICAS={"REPLICAS": ["replica1"], "PIN_CACHE": "shared"},
+    )
+    def test_a_write_pins_bearer_clients_in_the_shared_cache(self):
+        caches["shared"].clear()
+        auth = {"HTTP_AUTHORIZATION": "Bearer pinned-client"}
+        self.assertFalse(self.pinned(RequestFactory().get("/", **auth)))
+        self.write(**auth)
+        self.assertTrue(self.pinned(RequestFactory().get("/", **auth)))
+        other = {"HTTP_AUTHORIZATION": "Bearer other-client"}
+        self.assertFalse(self.pinned(RequestFactory().get("/", **other)))
+
+    def test_bearer_clients_use_the_primary_without_a_pin_cache(self):
+        auth = {"HTTP_AUTHORIZATION": "Bearer some-client"}
+        self.assertTrue(self.pinned(RequestFactory().get("/", **auth)))
+        self.assertFalse(self.pinned(RequestFactory().get("/")))
+
+
+@override_settings(DATABASE_REPLICAS={"REPLICAS": ["replica1"]})
+class ReplicaTransactionTests(TestCase):
+    def test_reads_in_a_transaction_use_the_primary(self):
+        router = PrimaryReplicaRouter()
+        router.health = FakeHealth()
+        self.assertEqual(router.db_for_read(Member), "default")
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_released_connections_are_reused(self):
+        pool = ConnectionPool(max_size=2)
+        first = pool.acquire(FakeConnection)
+        pool.release(first)
+        self.assertIs(pool.acquire(FakeConnection), first)
+        metrics = pool.metrics()
+        self.assertEqual(metrics["created_total"], 1)
+        self.assertEqual(metrics["acquired_total"], 2)
+        self.assertEqual(metrics["in_use"], 1)
+
+    def test_acquire_times_out_when_the_pool_is_exhausted(self):
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        pool.acquire(FakeConnection)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+        self.assertEqual(pool.metrics()["timeouts_total"], 1)
+
+    def test_a_waiter_gets_the_released_connection(self):
+        pool = ConnectionPool(max_size=1, timeout=5)
+        held = pool.acquire(FakeConnection)
+        acquired = []
+        waiter = threading.Thread(
+            target=lambda: acquired.append(pool.acquire(FakeConnection))
+        )
+        waiter.start()
+        time.sleep(0.05)
+        pool.release(held)
+        waiter.join(5)
+        self.assertEqual(acquired, [held])
+        self.assertEqual(pool.metrics()["waits_total"], 1)
+
+    def test_failed_connect_frees_the_slot(self):
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+
+        def connect():
+            raise OSError("refused")
+
+        with self.assertRaises(OSError):
+            pool.acquire(connect)
+        self.assertIsInstance(pool.acquire(FakeConnection), FakeConnection)
+
+    def test_unusable_connections_are_closed(self):
+        pool = ConnectionPool(reset=lambda connection: False)
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.metrics()["size"], 0)
+
+        pool = ConnectionPool(max_age=0)
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        self.assertTrue(connection.closed)
+
+    def test_idle_connections_are_checked_before_reuse(self):
+        pool = ConnectionPool(check_idle=0, check=lambda connection: False)
+        stale = pool.acquire(FakeConnection)
+        pool.release(stale)
+        fresh = pool.acquire(FakeConnection)
+        self.assertIsNot(fresh, stale)
+        self.assertTrue(stale.closed)
+        metrics = pool.metrics()
+        self.assertEqual(metrics["check_failures_total"], 1)
+        self.assertEqual(metrics["size"], 1)
+
+    def test_pool_metrics_are_prefixed_by_alias(self):
+        self.addCleanup(pools.pop, "pool-test", None)
+        pool = get_pool("pool-test", {"MAX_SIZE": 3})
+        self.assertIs(get_pool("pool-test"), pool)
+        pool.release(pool.acquire(FakeConnection))
+        metrics = pool_metrics()
+        self.assertEqual(metrics["pool-test_max_size"], 3)
+        self.assertEqual(metrics["pool-test_idle"], 1)
+
+
+class RevocationIndexTests(SimpleTestCase):
+    def at(self, seconds):
+        return datetime.datetime.fromtimestamp(seconds, tz=datetime.timezone.utc)
+
+    def test_cutoff_covers_tokens_issued_in_the_same_second(self):
+        index = RevocationIndex()
+        index.add(users=[(1, get_cutoff(self.at(1000.5)))])
+        self.assertTrue(index.is_revoked({"user_id": 1, "iat": 1000}))
+        self.assertFalse(index.is_revoked({"user_id": 1, "iat": 1001}))
+        self.assertTrue(index.is_revoked({"user_id": 1}))
+        self.assertFalse(index.is_revoked({"user_id": 2, "iat": 0}))
+
+        index.add(users=[(2, get_cutoff(self.at(2000)))])
+        self.assertTrue(index.is_revoked({"user_id": 2, "iat": 1999}))
+        self.assertFalse(index.is_revoked({"user_id": 2, "iat": 2000}))
+
+    def test_later_cutoffs_win(self):
+        index = RevocationIndex()
+        index.add(users=[(1, 2000)])
+        index.add(users=[(1, 1000)])
+        self.assertTrue(index.is_revoked({"user_id": 1, "iat": 1500}))
+
+    def test_revoked_jtis(self):
+        index = RevocationIndex()
+        index.add(jtis=[("abc", time.time() + 60)])
+        self.assertTrue(index.is_revoked({"jti": "abc"}))
+        self.assertFalse(index.is_revoked({"jti": "abd"}))
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f"user:{i}")
+        self.assertTrue(all(f"user:{i}" in bloom for i in range(1000)))
+        false_positives = sum(f"jti:{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_a_full_filter_drops_expired_entries(self):
+        index = RevocationIndex({"CAPACITY": 2, "LIFETIME": 60})
+        index.add(users=[(1, time.time() - 120), (2, time.time())])
+        index.add(users=[(3, time.time())])
+        self.assertEqual(sorted(index.users), ["2", "3"])
+        self.assertFalse(index.is_revoked({"user_id": 1, "iat": 0}))
+
+    def test_setting_change_replaces_the_index(self):
+        index = get_revocation_index()
+        with override_settings(TOKEN_REVOCATION={"SYNC_INTERVAL": 1}):
+            replaced = get_revocation_index()
+            self.assertIsNot(replaced, index)
+            self.assertEqual(replaced.sync_interval, 1)
+            self.assertIs(replaced.model, index.model)
+
+
+class RevocationAPITests(MemberAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = create_member("other@example.com")
+        self.refresh = RefreshToken.for_user(self.other)
+        self.access = self.refresh.access_token
+        self.make_moderator()
+
+    def other_client(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access}")
+        return client
+
+    def assert_revoked(self, revoked=True):
+        detail = self.other_client().get(ACCOUNTS + f"user-detail/{self.member.pk}")
+        self.assertEqual(detail.status_code, 401 if revoked else 200)
+        response = self.client.post(
+            ACCOUNTS + "refresh/", {"refresh": str(self.refresh)}, format="json"
+        )
+        self.assertEqual(response.status_code, 422 if revoked else 200)
+
+    def bulk_action(self, action):
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                ACCOUNTS + "user-bulk-action/",
+                {"action": action, "ids": [self.other.pk]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials()
+
+    def test_tokens_work_until_revoked(self):
+        self.assert_revoked(False)
+
+    def test_block_revokes(self):
+        self.bulk_action("block")
+        self.assert_revoked()
+
+    def test_deactivate_revokes(self):
+        self.bulk_action("deactivate")
+        self.assert_revoked()
+
+    def test_bulk_delete_revokes(self):
+        self.bulk_action("delete")
+        self.assert_revoked()
+
+    def test_unblock_keeps_old_tokens_revoked(self):
+        self.bulk_action("block")
+        self.bulk_action("unblock")
+        self.assert_revoked()
+
+    def test_delete_revokes(self):
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(ACCOUNTS + f"user-delete/{self.other.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials()
+        self.assert_revoked()
+
+    def test_revocations_made_elsewhere_are_synced(self):
+        get_revocation_index().sync()
+        TokenRevocation.objects.create(
+            user_id=self.other.pk,
+            revoked_at=timezone.now(),
+            expires_at=timezone.now() + datetime.timedelta(days=14),
+        )
+        self.assert_revoked(False)
+        get_revocation_index().sync()
+        self.assert_revoked()
+
+    def test_logout_revokes_both_tokens(self):
+        client = self.other_client()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                ACCOUNTS + "user-logout/", {"refresh": str(self.refresh)}, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assert_revoked()
+
+        response = self.client.post(
+            ACCOUNTS + "user-logout/", {"refresh": "not-a-token"}, format="json"
+        )
+        self.assertEqual(response.status_code, 422)
+
+
+class BulkActionTests(MemberAPITestCase):
+    url = ACCOUNTS + "user-bulk-action/"
+
+    def setUp(self):
+        super().setUp()
+        self.others = [create_member(f"bulk{i}@example.com") for i in range(3)]
+        self.make_moderator()
+        self.authenticate()
+
+    def act(self, action, **targets):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.url, {"action": action, **targets}, format="json"
+            )
+        return response
+
+    def ids(self):
+        return [member.pk for member in self.others]
+
+    def test_block_and_unblock(self):
+        response = self.act("block", ids=self.ids())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["data"]["affected"], 3)
+        self.assertEqual(Member.objects.filter(is_blocked=True).count(), 3)
+
+        response = self.act("block", ids=self.ids())
+        self.assertEqual(response.data["data"]["affected"], 0)
+        self.assertEqual(response.data["data"]["matched"], 3)
+
+        self.act("unblock", ids=self.ids())
+        self.assertFalse(Member.objects.filter(is_blocked=True).exists())
+
+    def test_deactivate_and_activate(self):
+        self.act("deactivate", ids=self.ids()[:2])
+        self.assertEqual(Member.objects.filter(is_active=False).count(), 2)
+        self.act("activate", ids=self.ids())
+        self.assertFalse(Member.objects.filter(is_active=False).exists())
+
+    def test_delete(self):
+        response = self.act("delete", ids=self.ids())
+        self.assertEqual(response.data["data"]["affected"], 3)
+        self.assertEqual(list(Member.objects.all()), [self.member])
+
+    def test_changes_touch_updated_at(self):
+        before = self.others[0].updated_at
+        self.act("block", ids=self.ids()[:1])
+        self.others[0].refresh_from_db()
+        self.assertGreater(self.others[0].updated_at, before)
+
+    def test_the_caller_is_never_a_target(self):
+        response = self.act("deactivate", ids=[self.member.pk, *self.ids()])
+        self.assertEqual(response.data["data"]["skipped"], [self.member.pk])
+        self.assertEqual(response.data["data"]["affected"], 3)
+        self.member.refresh_from_db()
+        self.assertTrue(self.member.is_active)
+
+    def test_missing_ids_are_reported(self):
+        response = self.act("block", ids=[self.others[0].pk, 999999])
+        self.assertEqual(response.data["data"]["missing"], [999999])
+        self.assertEqual(response.data["data"]["affected"], 1)
+
+    def test_filter_targets(self):
+        create_member("teacher@example.com", role="te")
+        response = self.act("block", filter={"role": "te"})
+        self.assertEqual(response.data["data"]["affected"], 1)
+        blocked = Member.objects.filter(is_blocked=True)
+        self.assertEqual([member.email for member in blocked], ["teacher@example.com"])
+
+    def test_targets_must_be_ids_or_a_known_filter(self):
+        for targets in ({}, {"ids": [1], "filter": {"role": "st"}}):
+            response = self.act("block", **targets)
+            self.assertEqual(response.status_code, 400, targets)
+        response = self.act("block", filter={"password": "x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_empty_filters_are_rejected(self):
+        for value in ("", " ", ",", [], [""], ["st", ""], None):
+            response = self.act("block", filter={"role": value})
+            self.assertEqual(response.status_code, 400, value)
+        response = self.act("delete", filter={"role": "st", "email": ""})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Member.objects.count(), 4)
+        self.assertFalse(Member.objects.filter(is_blocked=True).exists())
+
+    def test_only_moderators_may_act(self):
+        self.member.role = "st"
+        self.member.save()
+        response = self.act("block", ids=self.ids())
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Member.objects.filter(is_blocked=True).exists())
+
+        with override_settings(MEMBER_BULK_ACTION={"MODERATOR_ROLES": ["st"]}):
+            self.assertEqual(self.act("block", ids=self.ids()).status_code, 200)
+
+    @override_settings(MEMBER_BULK_ACTION={"MAX_ROWS": 2, "CHUNK_SIZE": 1})
+    def test_max_rows(self):
+        self.assertEqual(self.act("block", ids=self.ids()).status_code, 422)
+        self.assertEqual(self.act("block", filter={"role": "st"}).status_code, 422)
+        self.assertFalse(Member.objects.filter(is_blocked=True).exists())
+
+        response = self.act("block", ids=self.ids()[:2])
+        self.assertEqual(response.data["data"]["affected"], 2)
+
+    def test_cached_users_are_invalidated(self):
+        target = self.others[0]
+        cache = get_user_cache()
+        cache.get(target.pk, lambda: target)
+        self.act("block", ids=[target.pk])
+
+        loaded = []
+        cache.get(target.pk, lambda: loaded.append(target) or target)
+        self.assertEqual(loaded, [target])
+
+
+class BatchDetailTests(MemberAPITestCase):
+    url = ACCOUNTS + "user-detail/"
+
+    def setUp(self):
+        super().setUp()
+        self.others = [create_member(f"batch{i}@example.com") for i in range(3)]
+        self.authenticate()
+
+    def ids(self):
+        return [member.pk for member in self.others]
+
+    def emails(self, response):
+        return [row["email"] for row in response.json()["data"]["results"]]
+
+    def test_get_keeps_the_requested_order(self):
+        ids = self.ids()[::-1]
+        response = self.client.get(self.url, {"ids": ",".join(map(str, ids))})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.emails(response), [m.email for m in self.others[::-1]])
+        self.assertEqual(response.json()["data"]["missing"], [])
+
+    def test_post_matches_get(self):
+        ids = self.ids()
+        get = self.client.get(self.url, {"ids": ",".join(map(str, ids))})
+        post = self.client.post(self.url, {"ids": ids}, format="json")
+        self.assertEqual(post.status_code, 200)
+        self.assertEqual(post.json(), get.json())
+        self.assertNotIn("ETag", post)
+
+    def test_missing_and_repeated_ids(self):
+        pk = self.others[0].pk
+        response = self.client.post(self.url, {"ids": [pk, 999999, pk]}, format="json")
+        data = response.json()["data"]
+        self.assertEqual(self.emails(response), [self.others[0].email])
+        self.assertEqual(data["missing"], [999999])
+
+    def test_invalid_ids(self):
+        for params in ({}, {"ids": ""}, {"ids": "1,x"}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 422)
+        for body in ({}, {"ids": []}, {"ids": ["x"]}):
+            response = self.client.post(self.url, body, format="json")
+            self.assertEqual(response.status_code, 422)
+
+    @override_settings(MEMBER_BATCH_DETAIL={"MAX_IDS": 2})
+    def test_max_ids(self):
+        response = self.client.post(self.url, {"ids": self.ids()}, format="json")
+        self.assertEqual(response.status_code, 422)
+        response = self.client.get(self.url, {"ids": "1,1,1"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_answers_304_until_a_member_changes(self):
+        params = {"ids": ",".join(map(str, self.ids()))}
+        etag = self.client.get(self.url, params)["ETag"]
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.others[1].fullname = "Renamed Member"
+        self.others[1].save()
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_sparse_fields(self):
+        response = self.client.get(
+            self.url, {"ids": str(self.others[0].pk), "fields": "email"}
+        )
+        self.assertEqual(
+            response.json()["data"]["results"], [{"email": self.others[0].email}]
+        )
+
+
+@override_settings(
+    PAGINATION_MAX_PAGE_SIZE=3,
+    PAGINATION_STREAM_THRESHOLD=2,
+    PAGINATION_STREAM_CHUNK_SIZE=1,
+)
+class PageSizeTests(MemberAPITestCase):
+    url = ACCOUNTS + "user-list/"
+
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            create_member(f"page{i}@example.com")
+        self.authenticate()
+
+    def get(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            return response, json.loads(b"".join(response.streaming_content))
+        return response, response.json()
+
+    def test_small_pages_are_not_streamed(self):
+        response, body = self.get(limit=2)
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(body["data"]["results"]), 2)
+
+    def test_large_pages_are_streamed(self):
+        response, body = self.get(limit=3, page=2)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(body["title"], "User List")
+        data = body["data"]
+        self.assertEqual(data["count"], 6)
+        self.assertIsNone(data["next"])
+        self.assertIn("limit=3", data["previous"])
+        self.assertEqual(len(data["results"]), 3)
+
+        with override_settings(PAGINATION_STREAM_THRESHOLD=None):
+            response, buffered = self.get(limit=3, page=2)
+        self.assertFalse(response.streaming)
+        self.assertEqual(body, buffered)
+
+    async def aget(self, **params):
+        token = RefreshToken.for_user(self.member).access_token
+        response = await self.async_client.get(
+            ACCOUNTS + "async/user-list/",
+            params,
+            headers={"authorization": f"Bearer {token}"},
+        )
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            body = b"".join([chunk async for chunk in response.streaming_content])
+            return response, json.loads(body)
+        return response, response.json()
+
+    async def test_async_route_streams_an_async_iterator(self):
+        response, body = await self.aget(limit=3, page=2)
+        self.assertTrue(response.is_async)
+        data = body["data"]
+        self.assertEqual(data["count"], 6)
+        self.assertIn("limit=3", data["previous"])
+        self.assertEqual(len(data["results"]), 3)
+
+        with override_settings(PAGINATION_STREAM_THRESHOLD=None):
+            response, buffered = await self.aget(limit=3, page=2)
+        self.assertFalse(response.streaming)
+        self.assertEqual(body, buffered)
+
+    def test_limit_is_capped(self):
+        _, body = self.get(limit=50)
+        self.assertEqual(len(body["data"]["results"]), 3)
+        self.assertIn("page=2", body["data"]["next"])
+
+        response, body = self.get(paginate="cursor", limit=50)
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(body["data"]["results"]), 3)
+
+
+class FakeToken:
+    def __init__(self, exp):
+        self.payload = {"exp": exp}
+
+
+class TokenCacheTests(SimpleTestCase):
+    def verifier(self, exp=None):
+        calls = []
+
+        def verify():
+            calls.append(1)
+            return FakeToken(time.time() + 60 if exp is None else exp)
+
+        return verify, calls
+
+    def test_a_hit_skips_verification(self):
+        cache = TokenCache()
+        verify, calls = self.verifier()
+        first = cache.get("raw-token", verify)
+        second = cache.get("raw-token", verify)
+        self.assertEqual(len(calls), 1)
+        self.assertIsNot(first, second)
+        self.assertEqual(second.payload, first.payload)
+        self.assertEqual(cache.metrics(), {"hits": 1, "misses": 1, "size": 1})
+
+        cache.get("other-token", verify)
+        self.assertEqual(len(calls), 2)
+
+    def test_expired_tokens_are_verified_again(self):
+        cache = TokenCache()
+        verify, calls = self.verifier(exp=time.time() - 1)
+        cache.get("raw-token", verify)
+        cache.get("raw-token", verify)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(cache.metrics()["hits"], 0)
+
+    def test_failed_verification_is_not_cached(self):
+        cache = TokenCache()
+
+        def verify():
+            raise InvalidToken("bad token")
+
+        for _ in range(2):
+            with self.assertRaises(InvalidToken):
+                cache.get("raw-token", verify)
+        self.assertEqual(cache.metrics()["size"], 0)
+
+    def test_least_recently_used_tokens_are_evicted(self):
+        cache = TokenCache({"MAX_SIZE": 2})
+        verify, calls = self.verifier()
+        for raw in ("a", "b", "a", "c", "a", "b"):
+            cache.get(raw, verify)
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(cache.metrics()["size"], 2)
+
+    def test_max_size_zero_disables_the_cache(self):
+        cache = TokenCache({"MAX_SIZE": 0})
+        verify, calls = self.verifier()
+        cache.get("raw-token", verify)
+        cache.get("raw-token", verify)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(cache.metrics()["size"], 0)
+
+
+class TokenCacheAPITests(MemberAPITestCase):
+    def test_repeated_requests_verify_the_token_once(self):
+        self.authenticate()
+        url = ACCOUNTS + f"user-detail/{self.member.pk}"
+        with mock.patch.object(
+            CachedJWTAuthentication,
+            "verify_token",
+            autospec=True,
+            side_effect=CachedJWTAuthentication.verify_token,
+        ) as verify:
+            for _ in range(3):
+                self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(verify.call_count, 1)
+
+    def test_a_tampered_token_is_not_served_from_the_cache(self):
+        token = str(RefreshToken.for_user(self.member).access_token)
+        url = ACCOUNTS + f"user-detail/{self.member.pk}"
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token[:-2]}xx")
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+
+class LeanPipelineTests(MemberAPITestCase):
+    def test_admin_keeps_sessions_and_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        response = client.get("/db/admin/login/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+
+        response = client.post(
+            "/db/admin/login/", {"username": "member@example.com", "password": "x"}
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_api_routes_skip_sessions_and_csrf(self):
+        self.client = APIClient(enforce_csrf_checks=True)
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = "stale-session"
+        for prefix in ("", "async/"):
+            with capture_queries() as log:
+                response = self.client.post(
+                    ACCOUNTS + prefix + "user-login/",
+                    {"email": "member@example.com", "password": PASSWORD},
+                    format="json",
+                )
+            self.assertEqual(response.status_code, 200, prefix)
+            self.assertFalse(hasattr(response.wsgi_request, "session"))
+            self.assertFalse(any("django_session" in sql for sql in log.statements))
+            self.assertNotIn(settings.CSRF_COOKIE_NAME, response.cookies)
+            self.assertNotIn("Cookie", response.get("Vary", ""))
+            self.assertEqual(response["X-Frame-Options"], "DENY")
@@ -1,12 +1,27 @@
 from django.urls import path, include
 from accounts.api.viewsets.accounts import (
     UserCreateView,
+    UserBulkCreateView,
+    UserBulkActionView,
     UserListView,
     UserDeleteView,
     UserUpdateView,
     UserDetailView,
+    UserBatchDetailView,
+    UserExportView,
     EmailLoginView,
     CustomTokenRefreshView,
+    UserLogoutView,
+)
+from accounts.api.viewsets.async_accounts import (
+    AsyncUserCreateView,
+    AsyncUserListView,
+    AsyncUserExportView,
+    AsyncUserDeleteView,
+    AsyncUserUpdateView,
+    AsyncUserDetailView,
+    AsyncEmailLoginView,
+    AsyncTokenRefreshView,
 )
 
 from rest_framework import routers
@@ -16,10 +31,31 @@ router = routers.DefaultRouter()
 urlpatterns = [
     path("", include(router.urls)),
     path("user-create/", UserCreateView.as_view()),
+    path("user-bulk-create/", UserBulkCreateView.as_view()),
     path("user-list/", UserListView.as_view()),
+    path("user-export/", UserExportView.as_view()),
+    path("user-detail/", UserBatchDetailView.as_view()),
     path("user-detail/<int:pk>", UserDetailView.as_view()),
     path("user-delete/<int:pk>/", UserDeleteView.as_view()),
     path("user-update/<int:pk>/", UserUpdateView.as_view()),
+    path("user-bulk-action/", UserBulkActionView.as_view()),
     path("user-login/", EmailLoginView.as_view()),
     path("refresh/", CustomTokenRefreshView.as_view()),
+    path("user-logout/", UserLogoutView.as_view()),
+    # ASGI-native equivalents of the routes above.
+    path(
+        "async/",
+        include(
+            [
+                path("user-create/", AsyncUserCreateView.as_view()),
+                path("user-list/", AsyncUserListView.as_view()),
+                path("user-export/", AsyncUserExportView.as_view()),
+                path("user-detail/<int:pk>", AsyncUserDetailView.as_view()),
+                path("user-delete/<int:pk>/", AsyncUserDeleteView.as_view()),
+                path("user-update/<int:pk>/", AsyncUserUpdateView.as_view()),
+                path("user-login/", AsyncEmailLoginView.as_view()),
+                path("refresh/", AsyncTokenRefreshView.as_view()),
+            ]
+        ),
+    ),
 ]
@@ -0,0 +1,357 @@
+"""
+Load benchmark for every route in accounts/urls.py.
+
+Seeds a throwaway database (the configured engine's test database) with
+`--members` rows, then drives each route with `--concurrency` client threads
+through the WSGI handler and records throughput, latency percentiles and
+queries per request (taken from the Server-Timing header). Streamed bodies
+are read to the end, but their queries run after the header is sent, so
+user-export reports none. Results are written as JSON so
+`benchmarks.compare` can check them against a baseline.
+
+The async/ routes are driven the same way, so their rows measure the views'
+own work; `benchmarks.async_views` compares the two stacks under ASGI.
+
+    python -m benchmarks.accounts_api --members 10000 100000 --concurrency 1 8 32 \\
+        --output benchmarks/results/current.json
+    python -m benchmarks.compare benchmarks/results/baseline.json \\
+        benchmarks/results/current.json
+"""
+from benchmarks.harness import (
+    BENCH_PASSWORD,
+    HEADER,
+    access_token,
+    format_row,
+    seed_members,
+    summarize,
+    test_database,
+)
+from asgiref.sync import async_to_sync
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection, connections
+from django.test import Client
+from accounts.models import Member
+import argparse
+import django
+import itertools
+import json
+import platform
+import re
+import subprocess
+import threading
+import time
+
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def consume(response):
+    """Read a streamed body, whether the view streams sync or async chunks."""
+    if not response.is_async:
+        return b"".join(response.streaming_content)
+
+    async def read():
+        return b"".join([chunk async for chunk in response.streaming_content])
+
+    return async_to_sync(read)()
+
+
+def new_member(tag):
+    return {
+        "email": f"{tag}@example.com",
+        "password": BENCH_PASSWORD,
+        "firstname": "Bench",
+        "lastname": "User",
+        "fullname": "Bench User",
+        "date": "2020-01-01",
+        "role": "st",
+    }
+
+
+class Scenarios:
+    """
+    Request factories per route, called with the request's index. Routes
+    that consume rows (create, delete) draw from shared sequences so repeated
+    runs never collide.
+    """
+
+    def __init__(self, member, token, run_id):
+        self.member = member
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+        self.refresh = None
+        self.run_id = run_id
+        self.delete_ids = iter(
+            Member.objects.exclude(pk=member.pk)
+            .order_by("-id")
+            .values_list("id", flat=True)
+        )
+        # Deletes take rows from the top, bulk actions and multi-gets use the
+        # bottom of the table.
+        self.batch_ids = list(
+            Member.objects.exclude(pk=member.pk)
+            .order_by("id")
+            .values_list("id", flat=True)[:200]
+        )
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+
+    def tag(self, route):
+        with self.lock:
+            return f"{route}-{self.run_id}-{next(self.sequence)}"
+
+    def next_delete_id(self):
+        with self.lock:
+            return next(self.delete_ids)
+
+    def batch(self, i, size=20):
+        start = (i * size) % max(1, len(self.batch_ids) - size)
+        return self.batch_ids[start : start + size]
+
+    def build(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        refresh = str(RefreshToken.for_user(self.member))
+        pk = self.member.pk
+        scenarios = {
+            "user-create": lambda i: (
+                "post",
+                "/api/v1/accounts/user-create/",
+                new_member(self.tag("create")),
+                {},
+            ),
+            "user-bulk-create": lambda i: (
+                "post",
+                "/api/v1/accounts/user-bulk-create/",
+                [new_member(self.tag("bulk")) for n in range(10)],
+                self.auth,
+            ),
+            "user-list": lambda i: (
+                "get",
+                "/api/v1/accounts/user-list/?page=%d" % (i % 20 + 1),
+                None,
+                self.auth,
+            ),
+            "user-list-cursor": lambda i: (
+                "get",
+                "/api/v1/accounts/user-list/?paginate=cursor&limit=20",
+                None,
+                self.auth,
+            ),
+            "user-detail": lambda i: (
+                "get",
+                f"/api/v1/accounts/user-detail/{pk}",
+                None,
+                self.auth,
+            ),
+            "user-update": lambda i: (
+                "patch",
+                f"/api/v1/accounts/user-update/{pk}/",
+                {"fullname": f"Bench {i}"},
+                self.auth,
+            ),
+            "user-delete": lambda i: (
+                "delete",
+                f"/api/v1/accounts/user-delete/{self.next_delete_id()}/",
+                None,
+                self.auth,
+            ),
+            "user-login": lambda i: (
+                "post",
+                "/api/v1/accounts/user-login/",
+                {"email": self.member.email, "password": BENCH_PASSWORD},
+                {},
+            ),
+            "refresh": lambda i: (
+                "post",
+                "/api/v1/accounts/refresh/",
+                {"refresh": refresh},
+                {},
+            ),
+            # Each logout revokes its token, so every request gets a new one.
+            "user-logout": lambda i: (
+                "post",
+                "/api/v1/accounts/user-logout/",
+                {"refresh": str(RefreshToken.for_user(self.member))},
+                {},
+            ),
+            "user-export": lambda i: (
+                "get",
+                "/api/v1/accounts/user-export/?output=%s" % ("ndjson", "csv")[i % 2],
+                None,
+                self.auth,
+            ),
+            "user-bulk-action": lambda i: (
+                "post",
+                "/api/v1/accounts/user-bulk-action/",
+                {
+                    "action": ("block", "unblock")[i // 10 % 2],
+                    "ids": self.batch(i // 10),
+                },
+                self.auth,
+            ),
+            "user-batch-detail": lambda i: (
+                "get",
+                "/api/v1/accounts/user-detail/?ids="
+                + ",".join(map(str, self.batch(i))),
+                None,
+                self.auth,
+            ),
+            "user-batch-detail-post": lambda i: (
+                "post",
+                "/api/v1/accounts/user-detail/",
+                {"ids": self.batch(i)},
+                self.auth,
+            ),
+        }
+        # The async/ routes take the same requests as their sync versions.
+        for name in ASYNC_ROUTES:
+            scenarios[f"async-{name}"] = self.async_route(scenarios[name])
+        return scenarios
+
+    def async_route(self, factory):
+        def build(i):
+            method, path, body, headers = factory(i)
+            path = path.replace("/accounts/", "/accounts/async/", 1)
+            return method, path, body, headers
+
+        return build
+
+
+ASYNC_ROUTES = [
+    "user-create",
+    "user-list",
+    "user-export",
+    "user-detail",
+    "user-update",
+    "user-delete",
+    "user-login",
+    "refresh",
+]
+
+
+# Hashing-bound routes and full exports are far slower; run a fraction of
+# the requests.
+SLOW_ROUTES = {
+    "user-create",
+    "user-bulk-create",
+    "user-login",
+    "user-export",
+    "async-user-create",
+    "async-user-export",
+    "async-user-login",
+}
+
+
+def drive(factory, total, concurrency):
+    counter = itertools.count()
+    latencies = []
+    queries = [0]
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker():
+        client = Client()
+        try:
+            while True:
+                i = next(counter)
+                if i >= total:
+                    return
+                method, path, body, headers = factory(i)
+                started = time.perf_counter()
+                try:
+                    if body is None:
+                        response = getattr(client, method)(path, **headers)
+                    else:
+                        response = getattr(client, method)(
+                            path, body, content_type="application/json", **headers
+                        )
+                    if response.streaming:
+                        consume(response)
+                except Exception:
+                    response = None
+                elapsed = time.perf_counter() - started
+                timing = response.get("Server-Timing", "") if response else ""
+                match = QUERIES.search(timing)
+                with lock:
+                    latencies.append(elapsed)
+                    queries[0] += int(match.group(1)) if match else 0
+                    if response is None or response.status_code >= 400:
+                        errors[0] += 1
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    summary = summarize(latencies, time.perf_counter() - started, queries[0])
+    summary["errors"] = errors[0]
+    return summary
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(options):
+    results = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "requests": options.requests,
+        },
+        "results": {},
+    }
+    run_id = int(time.time())
+    for members in sorted(options.members):
+        member = seed_members(members)
+        scenarios = Scenarios(member, access_token(member), run_id).build()
+        print(f"\n{members} members ({connection.vendor})")
+        print(f"{HEADER} {'queries':>8}")
+        for concurrency in options.concurrency:
+            for name, factory in scenarios.items():
+                if options.routes and name not in options.routes:
+                    continue
+                total = options.requests
+                if name in SLOW_ROUTES:
+                    total = max(concurrency, total // 20)
+                drive(factory, min(total, concurrency), concurrency)
+                summary = drive(factory, total, concurrency)
+                key = f"{name}@{members}x{concurrency}"
+                results["results"][key] = summary
+                print(format_row(f"{name} c={concurrency}", summary))
+        # Created rows would change the next size's counts.
+        Member.objects.filter(email__contains=f"-{run_id}-").delete()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--members", type=int, nargs="+", default=[10000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--routes", nargs="*")
+    parser.add_argument(
+        "--keepdb",
+        action="store_true",
+        help="Reuse the seeded test database between runs (useful for 1M rows).",
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    options = parser.parse_args()
+    with test_database(keepdb=options.keepdb):
+        results = run(options)
+    if options.output:
+        with open(options.output, "w") as out:
+            json.dump(results, out, indent=2, sort_keys=True)
+        print(f"\nWrote {options.output}")
@@ -0,0 +1,177 @@
+"""
+Compare the DRF (sync) accounts views with their ASGI-native versions.
+
+Both stacks are driven through Django's ASGI handler with the same number of
+concurrent in-flight requests, so the sync views pay their real thread hop.
+
+    python -m benchmarks.async_views --members 10000 --requests 2000 --concurrency 64
+
+Write scenarios change the table as they go: `create` adds a member per
+request and `delete` removes members seeded for it, so every request does
+the same work.
+"""
+from benchmarks.harness import (
+    BENCH_PASSWORD,
+    HEADER,
+    access_token,
+    format_row,
+    seed_members,
+    summarize,
+    test_database,
+)
+from django.test import AsyncClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from accounts.models import Member
+from common.counts import invalidate_count
+import argparse
+import asyncio
+import datetime
+import itertools
+import time
+
+ROUTES = ["detail", "list", "login", "create", "update", "delete", "refresh"]
+# Password hashing dominates these; fewer iterations keep the run short.
+HASHING_ROUTES = {"login", "create"}
+
+
+def resolve(value):
+    """Scenario paths and bodies may be callables giving per-request values."""
+    return value() if callable(value) else value
+
+
+async def drive(method, prefix, path, total, concurrency, headers=None, body=None):
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            request_path, request_body = prefix + resolve(path), resolve(body)
+            started = time.perf_counter()
+            if method in ("post", "patch"):
+                response = await getattr(client, method)(
+                    request_path,
+                    request_body,
+                    content_type="application/json",
+                    headers=headers,
+                )
+            else:
+                response = await getattr(client, method)(request_path, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies, time.perf_counter() - started, errors
+
+
+def seed_deletable(count):
+    """Members for the delete scenario, one per request, in id order."""
+    Member.objects.bulk_create(
+        Member(
+            email=f"deletable{i}@example.com",
+            firstname="Deletable",
+            lastname=str(i),
+            fullname=f"Deletable {i}",
+            password="!",
+            date=datetime.date(2020, 1, 1),
+            role="st",
+        )
+        for i in range(count)
+    )
+    invalidate_count(Member)
+    return iter(
+        Member.objects.filter(email__startswith="deletable")
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+
+def scenarios(member, token, deletable):
+    auth = {"Authorization": f"Bearer {token}"}
+    login = {"email": member.email, "password": BENCH_PASSWORD}
+    created = itertools.count()
+    refresh = {"refresh": str(RefreshToken.for_user(member))}
+
+    def create_body():
+        n = next(created)
+        return {
+            "firstname": "New",
+            "lastname": str(n),
+            "fullname": f"New {n}",
+            "email": f"created{n}@example.com",
+            "password": BENCH_PASSWORD,
+            "date": "2020-01-01",
+            "role": "st",
+        }
+
+    return {
+        "detail": ("get", f"user-detail/{member.pk}", auth, None),
+        "list": ("get", "user-list/?limit=20", auth, None),
+        "login": ("post", "user-login/", None, login),
+        "create": ("post", "user-create/", None, create_body),
+        "update": (
+            "patch",
+            f"user-update/{member.pk}/",
+            auth,
+            {"fullname": "Updated Member"},
+        ),
+        "delete": (
+            "delete",
+            lambda: f"user-delete/{next(deletable)}/",
+            auth,
+            None,
+        ),
+        "refresh": ("post", "refresh/", None, refresh),
+    }
+
+
+def requests_for(name, options):
+    if name in HASHING_ROUTES:
+        return max(1, options.requests // 10)
+    return options.requests
+
+
+async def run(options, member, token, deletable):
+    print(HEADER)
+    routes = scenarios(member, token, deletable)
+    for name, (method, path, headers, body) in routes.items():
+        if name not in options.routes:
+            continue
+        total = requests_for(name, options)
+        for stack, prefix in (
+            ("sync", "/api/v1/accounts/"),
+            ("async", "/api/v1/accounts/async/"),
+        ):
+            # One warm-up request fills caches and opens the connection.
+            await drive(method, prefix, path, 1, 1, headers, body)
+            latencies, elapsed, errors = await drive(
+                method, prefix, path, total, options.concurrency, headers, body
+            )
+            summary = summarize(latencies, elapsed)
+            summary["errors"] = errors
+            print(format_row(f"{stack} {name}", summary))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--members", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--routes",
+        nargs="+",
+        default=ROUTES,
+        choices=ROUTES,
+    )
+    options = parser.parse_args()
+    with test_database():
+        member = seed_members(options.members)
+        deletable = iter(())
+        if "delete" in options.routes:
+            # A warm-up request and a measured run per stack.
+            deletable = seed_deletable(2 * (requests_for("delete", options) + 1))
+        asyncio.run(run(options, member, access_token(member), deletable))
@@ -0,0 +1,63 @@
+"""
+Micro-benchmark: JWT authentication overhead per request, with and without
+the verified-token cache.
+
+Each round authenticates a request carrying one of `--tokens` access tokens
+(round robin) through CachedJWTAuthentication. The user cache is warm in
+both modes, so the difference is the signature and claim checks the token
+cache skips.
+
+    python -m benchmarks.auth --requests 20000 --tokens 1 100 10000
+"""
+from benchmarks.harness import access_token, seed_members, test_database
+from django.test import RequestFactory
+from accounts.models import Member
+from common.authentication import CachedJWTAuthentication, TokenCache
+import argparse
+import common.authentication
+import time
+
+
+def run_mode(requests, max_size, count):
+    common.authentication._token_cache = TokenCache({"MAX_SIZE": max_size})
+    authentication = CachedJWTAuthentication()
+    # Warm the user cache, and the token cache when it is on.
+    for request in requests:
+        authentication.authenticate(request)
+    started = time.perf_counter()
+    for i in range(count):
+        authentication.authenticate(requests[i % len(requests)])
+    elapsed = time.perf_counter() - started
+    return elapsed / count, common.authentication._token_cache.metrics()
+
+
+def run(options):
+    factory = RequestFactory()
+    members = list(Member.objects.filter(is_blocked=False).order_by("id"))
+    print(
+        f"{'tokens':>7} {'uncached us':>12} {'cached us':>10} "
+        f"{'speedup':>8} {'hits':>8}"
+    )
+    for tokens in options.tokens:
+        requests = [
+            factory.get("/", HTTP_AUTHORIZATION=f"Bearer {access_token(member)}")
+            for member in (members[i % len(members)] for i in range(tokens))
+        ]
+        uncached, _ = run_mode(requests, 0, options.requests)
+        cached, metrics = run_mode(requests, options.max_size, options.requests)
+        print(
+            f"{tokens:>7} {uncached * 1e6:>12.1f} {cached * 1e6:>10.1f} "
+            f"{uncached / cached:>7.1f}x {metrics['hits']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--members", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--tokens", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--max-size", type=int, default=4096)
+    options = parser.parse_args()
+    with test_database():
+        seed_members(options.members)
+        run(options)
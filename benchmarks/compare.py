@@ -0,0 +1,62 @@
+"""
+Compare a benchmark result file against a baseline and fail on regressions.
+
+    python -m benchmarks.compare baseline.json current.json --threshold 0.15
+
+A result regresses when its p95 latency grows, or its throughput drops, by
+more than `--threshold` (a fraction), or when it issues more queries per
+request than the baseline did. The exit status is 1 if anything regressed.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as source:
+        return json.load(source)["results"]
+
+
+def compare(baseline, current, threshold):
+    regressions = []
+    for key in sorted(set(baseline) & set(current)):
+        before, after = baseline[key], current[key]
+        if after["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{key}: p95 {before['p95_ms']:.2f}ms -> {after['p95_ms']:.2f}ms"
+            )
+        if after["throughput"] < before["throughput"] * (1 - threshold):
+            regressions.append(
+                f"{key}: throughput {before['throughput']:.1f} -> "
+                f"{after['throughput']:.1f} req/s"
+            )
+        if after.get("queries_per_request", 0) > before.get("queries_per_request", 0):
+            regressions.append(
+                f"{key}: queries/request {before.get('queries_per_request', 0):.1f} -> "
+                f"{after['queries_per_request']:.1f}"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    options = parser.parse_args(argv)
+
+    baseline, current = load(options.baseline), load(options.current)
+    for key in sorted(set(baseline) - set(current)):
+        print(f"missing from current run: {key}")
+    regressions = compare(baseline, current, options.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print(f"No regressions across {len(set(baseline) & set(current))} results.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Shared helpers for the benchmark scripts in this package.
+
+The scripts run against a throwaway test database created from the
+configured DATABASES (SQLite or a local PostgreSQL), never the real one.
+SQLite runs every scenario, but it serializes writers: with concurrency
+above 1, transactions that read before writing (user-bulk-action) can fail
+with "database is locked" and count as errors. Use PostgreSQL for numbers
+that matter.
+"""
+from contextlib import contextmanager
+import os
+import statistics
+import tempfile
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "eduzeit_lms.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+from accounts.models import Member  # noqa: E402
+from common.counts import invalidate_count  # noqa: E402
+import datetime  # noqa: E402
+
+BENCH_PASSWORD = "bench-password-1"
+
+
+@contextmanager
+def test_database(keepdb=False):
+    setup_test_environment()
+    if connection.vendor == "sqlite":
+        # Shared-cache in-memory SQLite fails concurrent writers with "table
+        # is locked"; a file database with a busy timeout queues them.
+        test_settings = connection.settings_dict.setdefault("TEST", {})
+        if not test_settings.get("NAME"):
+            test_settings["NAME"] = os.path.join(
+                tempfile.gettempdir(), "eduzeit_benchmark.sqlite3"
+            )
+        connection.settings_dict.setdefault("OPTIONS", {}).setdefault("timeout", 30)
+    # Benchmarks measure the app, not the debug query log.
+    settings.DEBUG = False
+    # One benchmark client stands in for many users, so per-client rate
+    # limits would only measure 429s. Concurrency limits stay on.
+    settings.ADMISSION_CONTROL = {
+        **getattr(settings, "ADMISSION_CONTROL", {}),
+        "RATE_LIMITS": {},
+    }
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False, keepdb=keepdb
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+
+def seed_members(count, batch_size=5000):
+    """
+    Insert `count` members sharing one password hash, so seeding is fast,
+    and return an unblocked moderator, whom every route accepts.
+    """
+    existing = Member.objects.count()
+    password = make_password(BENCH_PASSWORD)
+    roles = ["st", "te", "ad"]
+    for start in range(existing, count, batch_size):
+        Member.objects.bulk_create(
+            [
+                Member(
+                    email=f"bench{i}@example.com",
+                    firstname=f"First{i}",
+                    lastname=f"Last{i}",
+                    fullname=f"First{i} Last{i}",
+                    password=password,
+                    date=datetime.date(2020, 1, 1) + datetime.timedelta(days=i % 1000),
+                    role=roles[i % len(roles)],
+                    is_blocked=i % 50 == 0,
+                )
+                for i in range(start, min(start + batch_size, count))
+            ]
+        )
+    invalidate_count(Member)
+    return Member.objects.filter(is_blocked=False, role="ad").order_by("id").first()
+
+
+def access_token(member):
+    return str(RefreshToken.for_user(member).access_token)
+
+
+def percentile(ordered, q):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed, queries=None):
+    ordered = sorted(latencies)
+    summary = {
+        "requests": len(ordered),
+        "throughput": len(ordered) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+    }
+    if queries is not None:
+        summary["queries_per_request"] = queries / len(ordered) if ordered else 0.0
+    return summary
+
+
+def format_row(name, summary):
+    line = (
+        f"{name:<40} {summary['requests']:>7} {summary['throughput']:>10.1f} "
+        f"{summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} {summary['p99_ms']:>9.2f}"
+    )
+    if "queries_per_request" in summary:
+        line += f" {summary['queries_per_request']:>8.1f}"
+    if summary.get("errors"):
+        line += f"  ({summary['errors']} errors)"
+    return line
+
+
+HEADER = (
+    f"{'route':<40} {'reqs':>7} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+)
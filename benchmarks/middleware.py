@@ -0,0 +1,61 @@
+"""
+Micro-benchmark: per-request cost of the middleware stack on the JWT API,
+with the browser-only middleware running (LEAN_MIDDLEWARE_PREFIXES empty)
+and skipped.
+
+Requests go through the test client's handler with warm caches, so the
+view itself costs the same in both modes and the difference is the
+middleware.
+
+    python -m benchmarks.middleware --requests 5000
+"""
+from benchmarks.harness import access_token, seed_members, test_database
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+import argparse
+import statistics
+import time
+
+
+def measure(path, headers, count, repeat):
+    client = Client()
+    client.get(path, **headers)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(count):
+            client.get(path, **headers)
+        timings.append((time.perf_counter() - started) / count)
+    with CaptureQueriesContext(connection) as queries:
+        client.get(path, **headers)
+    return statistics.median(timings), len(queries)
+
+
+def run(options):
+    member = seed_members(options.members)
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {access_token(member)}"}
+    routes = {
+        "user-detail": f"/api/v1/accounts/user-detail/{member.pk}",
+        "user-list": "/api/v1/accounts/user-list/?limit=5",
+    }
+    print(f"{'route':<12} {'full us':>9} {'lean us':>9} {'saved us':>9} {'queries':>9}")
+    count, repeat = options.requests, options.repeat
+    for name, path in routes.items():
+        with override_settings(LEAN_MIDDLEWARE_PREFIXES=[]):
+            full, full_queries = measure(path, headers, count, repeat)
+        lean, lean_queries = measure(path, headers, count, repeat)
+        print(
+            f"{name:<12} {full * 1e6:>9.1f} {lean * 1e6:>9.1f} "
+            f"{(full - lean) * 1e6:>9.1f} {full_queries:>4} {lean_queries:>4}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--members", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+    with test_database():
+        run(options)
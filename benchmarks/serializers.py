@@ -0,0 +1,72 @@
+"""
+Micro-benchmark: MemberSerializer against the compiled MemberReadSerializer.
+
+Rows are fetched once up front, so only serialization is timed. The
+compiled output is checked against MemberSerializer (minus the password)
+before anything is measured.
+
+    python -m benchmarks.serializers --members 5000 --rows 20 500 5000
+"""
+from benchmarks.harness import seed_members, test_database
+from accounts.api.serializers.accounts import MemberReadSerializer, MemberSerializer
+from accounts.models import Member
+import argparse
+import statistics
+import time
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def check_output(instances, rows):
+    expected = [
+        {key: value for key, value in data.items() if key != "password"}
+        for data in MemberSerializer(instances, many=True).data
+    ]
+    actual = MemberReadSerializer.to_dicts(rows)
+    if actual != expected:
+        raise SystemExit("MemberReadSerializer output differs from MemberSerializer")
+    for instance, data in zip(instances, expected):
+        if MemberReadSerializer.from_instance(instance) != data:
+            raise SystemExit("from_instance output differs from MemberSerializer")
+
+
+def run(options):
+    print(
+        f"{'rows':>7} {'drf ms':>10} {'compiled ms':>12} "
+        f"{'instance ms':>12} {'speedup':>8}"
+    )
+    for count in options.rows:
+        queryset = Member.objects.order_by("id")[:count]
+        instances = list(queryset)
+        rows = list(queryset.values(*MemberReadSerializer.columns))
+        check_output(instances, rows)
+        drf = measure(
+            lambda: MemberSerializer(instances, many=True).data, options.repeat
+        )
+        compiled = measure(lambda: MemberReadSerializer.to_dicts(rows), options.repeat)
+        per_instance = measure(
+            lambda: [MemberReadSerializer.from_instance(i) for i in instances],
+            options.repeat,
+        )
+        print(
+            f"{len(rows):>7} {drf * 1000:>10.2f} {compiled * 1000:>12.2f} "
+            f"{per_instance * 1000:>12.2f} {drf / compiled:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--rows", type=int, nargs="+", default=[20, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    options = parser.parse_args()
+    with test_database():
+        seed_members(options.members)
+        run(options)
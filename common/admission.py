@@ -0,0 +1,330 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from collections import OrderedDict
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import JsonResponse
+import math
+import re
+import threading
+import time
+
+
+DEFAULTS = {
+    "ENABLED": True,
+    # Route classes, tried in order; a path matching none is not limited.
+    # LIMIT requests of a class run at once, QUEUE more wait up to TIMEOUT
+    # seconds for a slot and the rest get a 503 at once. A waiting sync
+    # request holds its worker thread, so sync requests may only take the
+    # first SYNC_QUEUE (0 by default) places in the queue.
+    "CLASSES": {},
+    # Per-client token buckets: RATE (> 0) requests per second, BURST at
+    # once. To shut a route off, give it a class with LIMIT 0 instead.
+    "RATE_LIMITS": {},
+    # Header holding the client address when behind a trusted proxy, e.g.
+    # "X-Forwarded-For" (its last address, the one the proxy added, is
+    # used); REMOTE_ADDR otherwise.
+    "CLIENT_IP_HEADER": None,
+    "MAX_CLIENTS": 10000,
+    "RETRY_AFTER": 1,
+}
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, "ADMISSION_CONTROL", {})}
+
+
+def compile_routes(routes):
+    return re.compile("|".join(f"(?:{route})" for route in routes))
+
+
+class ConcurrencyLimiter:
+    """
+    At most `limit` holders at once, with a bounded queue of waiters.
+    `acquire` callers that block a request worker pass `sync_queue` as the
+    queue bound instead.
+    """
+
+    def __init__(self, limit, queue=0, timeout=0.0, sync_queue=0):
+        self.limit = limit
+        self.queue = queue
+        self.sync_queue = sync_queue
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.stats = {
+            "admitted_total": 0,
+            "queued_total": 0,
+            "rejected_total": 0,
+            "timed_out_total": 0,
+        }
+
+    def try_acquire(self):
+        """Take a free slot; None when the caller would have to queue."""
+        with self._condition:
+            if self.active < self.limit:
+                self.active += 1
+                self.stats["admitted_total"] += 1
+                return True
+            if self.waiting >= self.queue:
+                self.stats["rejected_total"] += 1
+                return False
+            return None
+
+    def acquire(self, queue=None):
+        """
+        Take a slot, waiting up to `timeout` seconds if fewer than `queue`
+        (by default the limiter's) callers are already waiting.
+        """
+        if queue is None:
+            queue = self.queue
+        with self._condition:
+            if self.active < self.limit:
+                self.active += 1
+                self.stats["admitted_total"] += 1
+                return True
+            if self.waiting >= queue:
+                self.stats["rejected_total"] += 1
+                return False
+            self.waiting += 1
+            self.stats["queued_total"] += 1
+            deadline = time.monotonic() + self.timeout
+            try:
+                while self.active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats["timed_out_total"] += 1
+                        return False
+                    self._condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            self.stats["admitted_total"] += 1
+            return True
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def metrics(self):
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "active": self.active,
+                "waiting": self.waiting,
+                **self.stats,
+            }
+
+
+class TokenBucketLimiter:
+    """
+    Per-client token buckets holding up to `burst` tokens, refilled at
+    `rate` per second. Only the `max_clients` most recent clients are kept;
+    a forgotten client starts again with a full bucket.
+    """
+
+    def __init__(self, rate, burst, max_clients=10000):
+        if not rate > 0 or not burst >= 1:
+            raise ImproperlyConfigured(
+                "Rate limits need RATE > 0 and BURST >= 1; use a route class "
+                "with LIMIT 0 to reject every request to a route."
+            )
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"allowed_total": 0, "limited_total": 0}
+
+    def take(self, client):
+        """0 if the request may go ahead, else the seconds until it may."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+                self.stats["allowed_total"] += 1
+            else:
+                wait = (1 - tokens) / self.rate
+                self.stats["limited_total"] += 1
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def metrics(self):
+        with self._lock:
+            return {"clients": len(self._buckets), **self.stats}
+
+
+class AdmissionController:
+    """The route classes and rate limits of ADMISSION_CONTROL, shared by the process."""
+
+    def __init__(self, options=None):
+        options = {**DEFAULTS, **(options or {})}
+        self.enabled = options["ENABLED"]
+        self.client_ip_header = options["CLIENT_IP_HEADER"]
+        self.retry_after = options["RETRY_AFTER"]
+        self.classes = [
+            (
+                name,
+                compile_routes(config["ROUTES"]),
+                ConcurrencyLimiter(
+                    config["LIMIT"],
+                    config.get("QUEUE", 0),
+                    config.get("TIMEOUT", 0.0),
+                    config.get("SYNC_QUEUE", 0),
+                ),
+            )
+            for name, config in options["CLASSES"].items()
+        ]
+        self.rate_limits = [
+            (
+                name,
+                compile_routes(config["ROUTES"]),
+                TokenBucketLimiter(
+                    config["RATE"], config["BURST"], options["MAX_CLIENTS"]
+                ),
+            )
+            for name, config in options["RATE_LIMITS"].items()
+        ]
+
+    def get_client(self, request):
+        if self.client_ip_header:
+            value = request.headers.get(self.client_ip_header)
+            if value:
+                # Earlier entries are whatever the client sent; the last one
+                # was added by our proxy.
+                return value.split(",")[-1].strip()
+        return request.META.get("REMOTE_ADDR", "")
+
+    def get_limiter(self, request):
+        for _, routes, limiter in self.classes:
+            if routes.search(request.path_info):
+                return limiter
+        return None
+
+    def rate_limit_wait(self, request):
+        """Seconds the client must wait before this route, 0 if none."""
+        client = None
+        for _, routes, limiter in self.rate_limits:
+            if routes.search(request.path_info):
+                if client is None:
+                    client = self.get_client(request)
+                wait = limiter.take(client)
+                if wait:
+                    return wait
+        return 0
+
+    def metrics(self):
+        values = {}
+        for kind, limiters in (("class", self.classes), ("rate", self.rate_limits)):
+            for name, _, limiter in limiters:
+                for key, value in limiter.metrics().items():
+                    values[f"{kind}_{name}_{key}"] = value
+        return values
+
+
+_admission_controller = None
+_admission_controller_lock = threading.Lock()
+
+
+def get_admission_controller():
+    global _admission_controller
+    if _admission_controller is None:
+        with _admission_controller_lock:
+            if _admission_controller is None:
+                _admission_controller = AdmissionController(get_options())
+    return _admission_controller
+
+
+@receiver(setting_changed)
+def reset_admission_controller(setting, **kwargs):
+    global _admission_controller
+    if setting == "ADMISSION_CONTROL":
+        _admission_controller = None
+
+
+class AdmissionControlMiddleware:
+    """
+    Keeps expensive routes from starving cheap ones. Each request is first
+    checked against the per-client rate limits of its route (429 when the
+    bucket is empty), then admitted into its route class (503 when the
+    class is at its limit and its queue is full or the wait times out).
+    Both answers carry Retry-After.
+
+    Limits are per process; place it right after InstrumentationMiddleware
+    so rejected requests are still measured.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    @property
+    def controller(self):
+        return get_admission_controller()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.controller.enabled:
+            return self.get_response(request)
+        wait = self.controller.rate_limit_wait(request)
+        if wait:
+            return self.too_many_requests(wait)
+        limiter = self.controller.get_limiter(request)
+        if limiter is None:
+            return self.get_response(request)
+        if not limiter.acquire(limiter.sync_queue):
+            return self.busy()
+        try:
+            return self.get_response(request)
+        finally:
+            limiter.release()
+
+    async def __acall__(self, request):
+        if not self.controller.enabled:
+            return await self.get_response(request)
+        wait = self.controller.rate_limit_wait(request)
+        if wait:
+            return self.too_many_requests(wait)
+        limiter = self.controller.get_limiter(request)
+        if limiter is None:
+            return await self.get_response(request)
+        admitted = limiter.try_acquire()
+        if admitted is None:
+            # Queue in a worker thread rather than blocking the event loop.
+            admitted = await sync_to_async(limiter.acquire, thread_sensitive=False)()
+        if not admitted:
+            return self.busy()
+        try:
+            return await self.get_response(request)
+        finally:
+            limiter.release()
+
+    def too_many_requests(self, wait):
+        return self.reject(429, "Too many requests, please slow down.", math.ceil(wait))
+
+    def busy(self):
+        return self.reject(
+            503,
+            "Server is busy, please try again shortly.",
+            self.controller.retry_after,
+        )
+
+    def reject(self, status, message, retry_after):
+        response = JsonResponse(
+            {"title": "Admission control", "message": message}, status=status
+        )
+        response["Retry-After"] = str(retry_after)
+        return response
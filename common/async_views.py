@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.http import JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from common.authentication import CachedJWTAuthentication
+import json
+
+
+class AsyncAPIView(View):
+    """
+    Minimal ASGI-native counterpart of DRF's APIView.
+
+    DRF 3.14 views are synchronous, so under ASGI each request is moved to a
+    worker thread. Subclasses of this view define `async def get/post/...`
+    handlers that run on the event loop; they authenticate with
+    `CachedJWTAuthentication`, parse JSON bodies into `request.data`, and
+    turn DRF exceptions into the same JSON bodies DRF would send.
+    """
+
+    authentication_class = CachedJWTAuthentication
+    permission_required = True
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token-authenticated like DRF's APIView, so no CSRF check.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        handler = None
+        if method in self.http_method_names and method != "options":
+            handler = getattr(self, method, None)
+        if handler is None:
+            return self.respond(
+                {"detail": f'Method "{request.method}" not allowed.'},
+                status=status.HTTP_405_METHOD_NOT_ALLOWED,
+            )
+        try:
+            await self.authenticate(request)
+            request.data = self.parse(request)
+            return await handler(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+
+    async def authenticate(self, request):
+        authenticator = self.authentication_class()
+        result = await authenticator.aauthenticate(request)
+        if result is not None:
+            request.user, request.auth = result
+        elif self.permission_required:
+            raise exceptions.NotAuthenticated()
+
+    def parse(self, request):
+        if request.method not in ("POST", "PUT", "PATCH"):
+            return {}
+        if not request.body:
+            return {}
+        if request.content_type != "application/json":
+            return request.POST
+        try:
+            return json.loads(request.body.decode(settings.DEFAULT_CHARSET))
+        except ValueError as exc:
+            raise exceptions.ParseError(f"JSON parse error - {exc}")
+
+    def respond(self, data, status=status.HTTP_200_OK, headers=None):
+        return JsonResponse(data, status=status, headers=headers, safe=False)
+
+    def handle_exception(self, exc):
+        headers = {}
+        if isinstance(
+            exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)
+        ):
+            exc.status_code = status.HTTP_401_UNAUTHORIZED
+            headers[
+                "WWW-Authenticate"
+            ] = self.authentication_class().authenticate_header(None)
+        if getattr(exc, "wait", None):
+            headers["Retry-After"] = "%d" % exc.wait
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {"detail": exc.detail}
+        return self.respond(data, status=exc.status_code, headers=headers)
@@ -0,0 +1,356 @@
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from common.instrumentation import timed
+from common.revocation import get_options as get_revocation_options
+from common.revocation import get_revocation_index
+from common.routers import get_options as get_routing_options
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+import copy
+import hashlib
+import threading
+import time
+
+
+DEFAULTS = {
+    "MAX_SIZE": 1024,
+    "TTL": 300,
+    "BACKEND": None,
+}
+
+
+class UserCache:
+    """
+    Per-process LRU of authenticated users with a TTL.
+
+    When `BACKEND` names a Django cache alias, users are also shared through
+    that cache and every entry is tagged with a per-user version kept there.
+    Invalidating bumps the version, so other processes drop their local copy
+    on the next request instead of waiting for the TTL.
+
+    Without one, invalidations only reach this process, so entries live at
+    most the revocation SYNC_INTERVAL. Callers pass the user's revocation
+    cutoff as `stale_before`, dropping entries cached before a block or
+    delete made in another process.
+    """
+
+    def __init__(self, options=None):
+        options = {**DEFAULTS, **(options or {})}
+        self.max_size = options["MAX_SIZE"]
+        self.backend = caches[options["BACKEND"]] if options["BACKEND"] else None
+        self.ttl = options["TTL"]
+        if self.backend is None:
+            self.ttl = min(self.ttl, get_revocation_options()["SYNC_INTERVAL"])
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def user_key(self, pk):
+        return f"auth-user:{pk}"
+
+    def version_key(self, pk):
+        return f"auth-user-version:{pk}"
+
+    def current_version(self, pk):
+        if self.backend is None:
+            return None
+        return self.backend.get(self.version_key(pk), 0)
+
+    def lookup(self, pk, version, stale_before=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(pk)
+            if entry is not None:
+                user, expires, cached_version, cached_at = entry
+                if (
+                    expires > now
+                    and cached_version == version
+                    and (stale_before is None or cached_at >= stale_before)
+                ):
+                    self._entries.move_to_end(pk)
+                    self.hits += 1
+                    return copy.copy(user)
+                del self._entries[pk]
+            self.misses += 1
+        return None
+
+    def remember(self, pk, user, version):
+        with self._lock:
+            self._entries[pk] = (
+                user,
+                time.monotonic() + self.ttl,
+                version,
+                time.time(),
+            )
+            self._entries.move_to_end(pk)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, pk, loader, stale_before=None):
+        pk = str(pk)
+        version = self.current_version(pk)
+        user = self.lookup(pk, version, stale_before)
+        if user is not None:
+            return user
+
+        if self.backend is not None:
+            shared = self.backend.get(self.user_key(pk))
+            if shared is not None and shared[0] == version:
+                user = shared[1]
+        if user is None:
+            user = loader()
+            if self.backend is not None:
+                self.backend.set(self.user_key(pk), (version, user), self.ttl)
+
+        self.remember(pk, user, version)
+        return copy.copy(user)
+
+    async def aget(self, pk, loader, stale_before=None):
+        """`get` for async callers; `loader` is a coroutine function."""
+        pk = str(pk)
+        version = None
+        if self.backend is not None:
+            version = await self.backend.aget(self.version_key(pk), 0)
+        user = self.lookup(pk, version, stale_before)
+        if user is not None:
+            return user
+
+        if self.backend is not None:
+            shared = await self.backend.aget(self.user_key(pk))
+            if shared is not None and shared[0] == version:
+                user = shared[1]
+        if user is None:
+            user = await loader()
+            if self.backend is not None:
+                await self.backend.aset(self.user_key(pk), (version, user), self.ttl)
+
+        self.remember(pk, user, version)
+        return copy.copy(user)
+
+    def invalidate(self, pk):
+        pk = str(pk)
+        with self._lock:
+            self._entries.pop(pk, None)
+        if self.backend is not None:
+            self.backend.set(self.version_key(pk), time.time_ns(), None)
+            self.backend.delete(self.user_key(pk))
+
+    def invalidate_many(self, pks):
+        for pk in pks:
+            self.invalidate(pk)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def on_change(self, sender, instance, using=None, **kwargs):
+        pk = instance.pk
+        # Drop now so this process stops serving the old row, and again
+        # after commit in case a concurrent request re-cached it meanwhile.
+        self.invalidate(pk)
+        transaction.on_commit(lambda: self.invalidate(pk), using=using)
+
+    def connect(self, model):
+        uid = f"user-cache:{model._meta.label_lower}"
+        post_save.connect(self.on_change, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(self.on_change, sender=model, weak=False, dispatch_uid=uid)
+
+    def metrics(self):
+        with self._lock:
+            size = len(self._entries)
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache():
+    global _user_cache
+    if _user_cache is None:
+        with _user_cache_lock:
+            if _user_cache is None:
+                _user_cache = UserCache(getattr(settings, "AUTH_USER_CACHE", None))
+    return _user_cache
+
+
+TOKEN_CACHE_DEFAULTS = {
+    "MAX_SIZE": 4096,
+}
+
+
+class TokenCache:
+    """
+    Per-process LRU of verified access tokens, keyed on the SHA-256 digest
+    of the raw token, so a client re-sending the same token skips the
+    signature and claim checks. An entry is dropped at the token's `exp`;
+    revocation is checked separately on every request (see
+    common.revocation).
+    """
+
+    def __init__(self, options=None):
+        options = {**TOKEN_CACHE_DEFAULTS, **(options or {})}
+        self.max_size = options["MAX_SIZE"]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def digest(self, raw_token):
+        if isinstance(raw_token, str):
+            raw_token = raw_token.encode("utf-8")
+        return hashlib.sha256(raw_token).digest()
+
+    def lookup(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                token, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.copy(token)
+                del self._entries[key]
+            self.misses += 1
+        return None
+
+    def remember(self, key, token):
+        expires = token.payload.get("exp")
+        if self.max_size <= 0 or expires is None:
+            return
+        with self._lock:
+            self._entries[key] = (token, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, raw_token, validate):
+        """The verified token for `raw_token`; `validate()` verifies a miss."""
+        key = self.digest(raw_token)
+        token = self.lookup(key)
+        if token is None:
+            token = validate()
+            self.remember(key, token)
+            token = copy.copy(token)
+        return token
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self):
+        with self._lock:
+            size = len(self._entries)
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                _token_cache = TokenCache(getattr(settings, "AUTH_TOKEN_CACHE", None))
+    return _token_cache
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    simplejwt authentication that serves `request.user` from `UserCache`
+    instead of querying the user table on every request, and skips
+    re-verifying tokens found in `TokenCache`. Blocked users are rejected
+    like inactive ones, tokens in the RevocationIndex like invalid ones.
+    """
+
+    def get_validated_token(self, raw_token):
+        with timed("jwt"):
+            token = get_token_cache().get(
+                raw_token, lambda: self.verify_token(raw_token)
+            )
+            if get_revocation_index().is_revoked(token.payload):
+                raise InvalidToken(_("Token is revoked"))
+        return token
+
+    def verify_token(self, raw_token):
+        return super().get_validated_token(raw_token)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def check_user(self, user):
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if getattr(user, "is_blocked", False):
+            raise AuthenticationFailed(_("User is blocked"), code="user_blocked")
+        return user
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        try:
+            user = get_user_cache().get(
+                user_id,
+                lambda: self.load_user(user_id),
+                get_revocation_index().user_cutoff(user_id),
+            )
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        return self.check_user(user)
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        try:
+            user = await get_user_cache().aget(
+                user_id,
+                lambda: self.aload_user(user_id),
+                get_revocation_index().user_cutoff(user_id),
+            )
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        return self.check_user(user)
+
+    async def aauthenticate(self, request):
+        """`authenticate` for async views, taking a plain Django request."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    # Cached users are read from the primary so replica lag (a user blocked
+    # a moment ago) is never cached for a whole TTL.
+    def get_user_queryset(self):
+        return self.user_model.objects.using(get_routing_options()["PRIMARY"])
+
+    def load_user(self, user_id):
+        return self.get_user_queryset().get(**{api_settings.USER_ID_FIELD: user_id})
+
+    async def aload_user(self, user_id):
+        return await self.get_user_queryset().aget(
+            **{api_settings.USER_ID_FIELD: user_id}
+        )
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Document CachedJWTAuthentication as the same bearer scheme."""
+
+    target_class = "common.authentication.CachedJWTAuthentication"
@@ -0,0 +1,47 @@
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+import hashlib
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for DRF read views.
+
+    A view works out its validators from cheap metadata (a row's
+    `updated_at`, or the latest `updated_at` and tracked total for a list)
+    and calls
+    `get_not_modified_response`; when the client's copy is current a 304 is
+    returned before any serialization happens. The validators are then
+    added to whatever response the view produces.
+    """
+
+    conditional_etag = None
+    conditional_last_modified = None
+
+    def make_etag(self, request, *parts):
+        # The query string is part of the representation (page, limit, ...).
+        key = "|".join([request.get_full_path(), *map(str, parts)])
+        return quote_etag(hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def get_not_modified_response(self, request, etag=None, last_modified=None):
+        self.conditional_etag = etag
+        self.conditional_last_modified = last_modified
+        return get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(last_modified.timestamp()) if last_modified else None,
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if response.status_code in (200, 304):
+            if self.conditional_etag:
+                response["ETag"] = self.conditional_etag
+            if self.conditional_last_modified:
+                response["Last-Modified"] = http_date(
+                    self.conditional_last_modified.timestamp()
+                )
+            if self.conditional_etag or self.conditional_last_modified:
+                response["Cache-Control"] = "private, no-cache"
+                patch_vary_headers(response, ["Authorization"])
+        return response
@@ -0,0 +1,166 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save
+from common.routers import get_options as get_routing_options
+import json
+
+
+tracked_counts = {}
+
+
+def get_count_cache():
+    """The PAGINATION_COUNT_CACHE alias, or None when counts are not tracked."""
+    alias = getattr(settings, "PAGINATION_COUNT_CACHE", None)
+    return caches[alias] if alias else None
+
+
+class TrackedCount:
+    """
+    Row count for a model kept in the PAGINATION_COUNT_CACHE cache and
+    adjusted by post_save/post_delete signals, so listing the whole table
+    never needs a COUNT(*). Bulk operations bypass signals and must call
+    `invalidate`.
+
+    The count is only exact if every worker adjusts the same counter, so the
+    alias must name a shared cache (Redis, Memcached, database). Without one
+    `get` returns None and callers count instead.
+    """
+
+    def __init__(self, model, timeout=None):
+        self.model = model
+        self.key = f"count:{model._meta.label_lower}"
+        if timeout is None:
+            timeout = getattr(settings, "PAGINATION_COUNT_CACHE_TIMEOUT", 3600)
+        self.timeout = timeout
+
+    def get(self):
+        cache = get_count_cache()
+        if cache is None:
+            return None
+        value = cache.get(self.key)
+        if value is None:
+            # Counted on the primary: the total is cached for a long time and
+            # then only adjusted, so it must not start from a lagging replica.
+            primary = get_routing_options()["PRIMARY"]
+            value = self.model._default_manager.using(primary).order_by().count()
+            cache.add(self.key, value, self.timeout)
+        return value
+
+    def invalidate(self):
+        cache = get_count_cache()
+        if cache is not None:
+            cache.delete(self.key)
+
+    def adjust(self, delta):
+        cache = get_count_cache()
+        if cache is None:
+            return
+        try:
+            cache.incr(self.key, delta)
+        except ValueError:
+            # Not cached yet; the next `get` recounts.
+            pass
+
+    def saved(self, sender, instance, created, raw=False, using=None, **kwargs):
+        if created and not raw:
+            transaction.on_commit(lambda: self.adjust(1), using=using)
+
+    def deleted(self, sender, instance, using=None, **kwargs):
+        transaction.on_commit(lambda: self.adjust(-1), using=using)
+
+    def connect(self):
+        uid = f"tracked-count:{self.model._meta.label_lower}"
+        post_save.connect(self.saved, sender=self.model, weak=False, dispatch_uid=uid)
+        post_delete.connect(
+            self.deleted, sender=self.model, weak=False, dispatch_uid=uid
+        )
+
+
+def track_count(model, timeout=None):
+    if model not in tracked_counts:
+        tracked = TrackedCount(model, timeout=timeout)
+        tracked.connect()
+        tracked_counts[model] = tracked
+    return tracked_counts[model]
+
+
+def get_tracked_count(model):
+    """The model's tracked total, or None when it is not tracked."""
+    tracked = tracked_counts.get(model)
+    return None if tracked is None else tracked.get()
+
+
+def invalidate_count(model):
+    tracked = tracked_counts.get(model)
+    if tracked is not None:
+        tracked.invalidate()
+
+
+def estimate_count(queryset):
+    """
+    Ask the query planner for its row estimate. Only PostgreSQL exposes a
+    useful one; other backends return None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # reltuples is -1 until the table has been vacuumed/analyzed.
+            if row is None or row[0] < 0:
+                return None
+            return int(row[0])
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class CountProvider:
+    """
+    Returns `(count, exact)` for a queryset.
+
+    Unfiltered querysets of a tracked model use the signal-maintained
+    counter when PAGINATION_COUNT_CACHE is set. Otherwise the planner
+    estimate is used once it passes `PAGINATION_COUNT_ESTIMATE_THRESHOLD`;
+    below that a real COUNT(*) is cheap enough.
+    """
+
+    def __init__(self, estimate_threshold=None):
+        if estimate_threshold is None:
+            estimate_threshold = getattr(
+                settings, "PAGINATION_COUNT_ESTIMATE_THRESHOLD", 100000
+            )
+        self.estimate_threshold = estimate_threshold
+
+    def is_unfiltered(self, queryset):
+        query = queryset.query
+        return (
+            not query.where
+            and not query.distinct
+            and not query.is_sliced
+            and query.combinator is None
+        )
+
+    def count(self, queryset):
+        if not hasattr(queryset, "query"):
+            return len(queryset), True
+        queryset = queryset.order_by()
+        tracked = tracked_counts.get(queryset.model)
+        if tracked is not None and self.is_unfiltered(queryset):
+            count = tracked.get()
+            if count is not None:
+                return count, True
+        if self.estimate_threshold is not None:
+            estimate = estimate_count(queryset)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate, False
+        return queryset.count(), True
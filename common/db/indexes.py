@@ -0,0 +1,17 @@
+from django.contrib.postgres.indexes import OpClass
+
+
+class PatternOps(OpClass):
+    """
+    `expression text_pattern_ops` on PostgreSQL, so LIKE 'prefix%' can use
+    the index under any collation. Other databases have no operator
+    classes and index the bare expression.
+    """
+
+    def __init__(self, expression):
+        super().__init__(expression, name="text_pattern_ops")
+
+    def as_sql(self, compiler, connection, **extra_context):
+        if connection.vendor != "postgresql":
+            return compiler.compile(self.get_source_expressions()[0])
+        return super().as_sql(compiler, connection, **extra_context)
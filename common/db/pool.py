@@ -0,0 +1,199 @@
+import threading
+import time
+
+
+DEFAULTS = {
+    "MAX_SIZE": 10,
+    "TIMEOUT": 5.0,
+    "MAX_AGE": 1800,
+    "CHECK_IDLE": 30,
+}
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections, shared by every thread of the
+    process (so by all requests of an ASGI worker).
+
+    At most `max_size` connections exist at once; `acquire` waits up to
+    `timeout` seconds for one to be released before raising PoolTimeout.
+    Connections older than `max_age` seconds are replaced, and `check` is
+    run on one that sat idle for more than `check_idle` seconds before it
+    is handed out again. `reset` runs on release and returns False when the
+    connection cannot be reused.
+    """
+
+    def __init__(
+        self,
+        max_size=10,
+        timeout=5.0,
+        max_age=None,
+        check_idle=None,
+        check=None,
+        reset=None,
+    ):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.check_idle = check_idle
+        self.check = check
+        self.reset = reset
+        self._condition = threading.Condition()
+        # (connection, created, released) for connections ready for reuse.
+        self._idle = []
+        self._created = {}
+        self.size = 0
+        self.stats = {
+            "acquired_total": 0,
+            "created_total": 0,
+            "closed_total": 0,
+            "waits_total": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "timeouts_total": 0,
+            "check_failures_total": 0,
+        }
+
+    def acquire(self, connect):
+        """Return an idle connection, or open one with `connect()`."""
+        started = time.monotonic()
+        waited = False
+        with self._condition:
+            while True:
+                connection = self._take_idle()
+                if connection is not None:
+                    self._record_acquire(started, waited)
+                    return connection
+                if self.size < self.max_size:
+                    self.size += 1
+                    self._record_acquire(started, waited)
+                    break
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.stats["timeouts_total"] += 1
+                    raise PoolTimeout(
+                        f"No database connection free after {self.timeout}s "
+                        f"({self.max_size} in use)"
+                    )
+                waited = True
+                self._condition.wait(remaining)
+        try:
+            connection = connect()
+        except BaseException:
+            with self._condition:
+                self.size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._created[id(connection)] = time.monotonic()
+            self.stats["created_total"] += 1
+        return connection
+
+    def release(self, connection):
+        reusable = self.reset is None or self._safely(self.reset, connection)
+        with self._condition:
+            created = self._created.get(id(connection), time.monotonic())
+            if reusable and not self._expired(created):
+                self._idle.append((connection, created, time.monotonic()))
+                self._condition.notify()
+                return
+        self.discard(connection)
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._created.pop(id(connection), None)
+            self.size -= 1
+            self.stats["closed_total"] += 1
+            self._condition.notify()
+
+    def close_all(self):
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for connection, _, _ in idle:
+            self.discard(connection)
+
+    def metrics(self):
+        with self._condition:
+            return {
+                "max_size": self.max_size,
+                "size": self.size,
+                "idle": len(self._idle),
+                "in_use": self.size - len(self._idle),
+                **self.stats,
+            }
+
+    def _take_idle(self):
+        # Called with the lock held. Most recently released first, so spare
+        # connections age out under low load. Only connections idle for
+        # CHECK_IDLE are checked, which happens when the pool is quiet.
+        while self._idle:
+            connection, created, released = self._idle.pop()
+            now = time.monotonic()
+            healthy = not self._expired(created)
+            if healthy and self.check and self.check_idle is not None:
+                if now - released > self.check_idle:
+                    healthy = self._safely(self.check, connection)
+                    if not healthy:
+                        self.stats["check_failures_total"] += 1
+            if healthy:
+                return connection
+            self._created.pop(id(connection), None)
+            self.size -= 1
+            self.stats["closed_total"] += 1
+            try:
+                connection.close()
+            except Exception:
+                pass
+        return None
+
+    def _expired(self, created):
+        return self.max_age is not None and time.monotonic() - created > self.max_age
+
+    def _record_acquire(self, started, waited):
+        self.stats["acquired_total"] += 1
+        if waited:
+            wait = time.monotonic() - started
+            self.stats["waits_total"] += 1
+            self.stats["wait_seconds_total"] += wait
+            self.stats["wait_seconds_max"] = max(self.stats["wait_seconds_max"], wait)
+
+    def _safely(self, function, connection):
+        try:
+            return bool(function(connection))
+        except Exception:
+            return False
+
+
+pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, options=None, **kwargs):
+    """The process-wide pool for a DATABASES alias, created on first use."""
+    with _pools_lock:
+        if alias not in pools:
+            options = {**DEFAULTS, **(options or {})}
+            pools[alias] = ConnectionPool(
+                max_size=options["MAX_SIZE"],
+                timeout=options["TIMEOUT"],
+                max_age=options["MAX_AGE"],
+                check_idle=options["CHECK_IDLE"],
+                **kwargs,
+            )
+        return pools[alias]
+
+
+def pool_metrics():
+    return {
+        f"{alias}_{key}": value
+        for alias, pool in sorted(pools.items())
+        for key, value in pool.metrics().items()
+    }
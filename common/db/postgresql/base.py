@@ -0,0 +1,69 @@
+"""
+PostgreSQL backend whose connections come from a process-wide pool.
+
+Use it as the ENGINE with CONN_MAX_AGE = 0: Django then "closes" the
+connection at the end of every request, which hands it back to the pool
+instead of tearing it down. Pool limits are read from the alias' "POOL"
+settings (see common.db.pool.DEFAULTS).
+"""
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from common.db.pool import PoolTimeout, get_pool
+from common.instrumentation import timed
+
+# libpq transaction states, the same numbers in psycopg2 and psycopg 3.
+TRANSACTION_IDLE = 0
+TRANSACTION_UNKNOWN = 4
+
+
+def check_connection(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    if not connection.autocommit:
+        connection.rollback()
+    return True
+
+
+def reset_connection(connection):
+    """Roll back whatever the last user left open; False if it is broken."""
+    if connection.closed:
+        return False
+    status = connection.info.transaction_status
+    if status == TRANSACTION_UNKNOWN:
+        return False
+    if status != TRANSACTION_IDLE:
+        connection.rollback()
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_pool(self):
+        return get_pool(
+            self.alias,
+            self.settings_dict.get("POOL"),
+            check=check_connection,
+            reset=reset_connection,
+        )
+
+    def get_new_connection(self, conn_params):
+        def connect():
+            return super(DatabaseWrapper, self).get_new_connection(conn_params)
+
+        with timed("connect"):
+            try:
+                connection = self.get_pool().acquire(connect)
+            except PoolTimeout as exc:
+                # Surfaces as django.db.OperationalError, like a refused connect.
+                raise self.Database.OperationalError(str(exc)) from exc
+        # Set by the parent on fresh connections only.
+        self.isolation_level = IsolationLevel(
+            self.settings_dict["OPTIONS"].get(
+                "isolation_level", IsolationLevel.READ_COMMITTED
+            )
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.get_pool().release(self.connection)
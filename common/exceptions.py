@@ -33,3 +33,19 @@ class UnprocessableEntityException(exceptions.APIException):
         Eg. {"name": [{"message": "This field is required.", "code": "required"}]}
         """
         return exceptions._get_full_details(self.detail)
+
+
+class ServiceUnavailableException(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Service temporarily unavailable, try again later."
+    default_code = "service_unavailable"
+
+    def __init__(self, detail=None, code=None, wait=None):
+        if detail is None:
+            detail = self.default_detail
+        if code is None:
+            code = self.default_code
+        # DRF's exception handler turns `wait` into a Retry-After header.
+        self.wait = wait
+
+        self.detail = exceptions._get_error_details(detail, code)
@@ -0,0 +1,111 @@
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from common.exceptions import UnprocessableEntityException
+
+
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        OpenApiTypes.STR,
+        description="Comma separated fields to return, e.g. `id,fullname`.",
+    ),
+    OpenApiParameter(
+        "exclude",
+        OpenApiTypes.STR,
+        description="Comma separated fields to leave out.",
+    ),
+]
+
+
+class SparseFieldsetMixin:
+    """
+    `?fields=a,b` / `?exclude=c` for read views. The selection trims the
+    serializer and is pushed down to the SELECT with `.only()`. Fields in
+    `sparse_forbidden_fields` can never be requested and are dropped
+    whenever a selection is made.
+
+    Views that set `read_serializer` (a CompiledReadSerializer) render from
+    `queryset.values(*self.get_read_columns())` rows with
+    `self.get_read_serializer()` instead.
+    """
+
+    fields_query_param = "fields"
+    exclude_query_param = "exclude"
+    sparse_forbidden_fields = ("password",)
+    # Columns the view itself reads from each instance (ordering keys,
+    # validators) and so must not be deferred.
+    sparse_extra_columns = ()
+    read_serializer = None
+
+    def parse_field_list(self, param):
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        return [name.strip() for name in value.split(",") if name.strip()]
+
+    def get_sparse_fields(self):
+        if hasattr(self, "_sparse_fields"):
+            return self._sparse_fields
+        requested = self.parse_field_list(self.fields_query_param)
+        excluded = self.parse_field_list(self.exclude_query_param)
+        if requested is None and excluded is None:
+            self._sparse_fields = None
+            return None
+
+        serializer_class = self.get_serializer_class()
+        available = [
+            name
+            for name, field in serializer_class().fields.items()
+            if not field.write_only and name not in self.sparse_forbidden_fields
+        ]
+        unknown = [
+            name
+            for name in (requested or []) + (excluded or [])
+            if name not in available
+        ]
+        if unknown:
+            raise UnprocessableEntityException(
+                {
+                    "title": "Field selection",
+                    "message": "Unknown or forbidden field(s): " + ", ".join(unknown),
+                },
+                code=422,
+            )
+
+        fields = requested if requested else available
+        if excluded:
+            fields = [name for name in fields if name not in excluded]
+        self._sparse_fields = fields
+        return fields
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        serializer_fields = self.get_serializer_class()().fields
+        model_fields = {field.name for field in queryset.model._meta.concrete_fields}
+        columns = {
+            serializer_fields[name].source
+            for name in fields
+            if serializer_fields[name].source in model_fields
+        }
+        columns.update(self.sparse_extra_columns)
+        return queryset.only(*columns)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            target = getattr(serializer, "child", serializer)
+            for name in set(target.fields) - set(fields):
+                target.fields.pop(name)
+        return serializer
+
+    def get_read_serializer(self):
+        return self.read_serializer.select(self.get_sparse_fields())
+
+    def get_read_columns(self):
+        columns = list(self.get_read_serializer().columns)
+        columns += [name for name in self.sparse_extra_columns if name not in columns]
+        return columns
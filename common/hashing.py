@@ -0,0 +1,296 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from common.exceptions import ServiceUnavailableException
+from common.instrumentation import timed
+import asyncio
+import collections
+import multiprocessing
+import os
+import threading
+import time
+
+
+DEFAULTS = {
+    "ENABLED": True,
+    "WORKERS": os.cpu_count() or 1,
+    "MAX_PENDING": 32,
+    "TIMEOUT": 5.0,
+    "BATCH_CHUNK_SIZE": 4,
+    # None: half the workers, so interactive checks always find one free.
+    "BATCH_MAX_PENDING": None,
+}
+
+
+def _init_worker(settings_module):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+
+    django.setup()
+
+
+def get_mp_context():
+    # The pool is started lazily from a threaded server process; a forked
+    # child would inherit its held locks and open database sockets, so
+    # start workers from a clean process instead.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _make_password(password):
+    return hashers.make_password(password)
+
+
+def _make_passwords(passwords):
+    return [hashers.make_password(password) for password in passwords]
+
+
+def _check_password(password, encoded):
+    return hashers.check_password(password, encoded)
+
+
+class PasswordHasherPool:
+    """
+    Runs PBKDF2 (or whichever hasher is configured) in a process pool so
+    hashing neither holds the GIL nor ties up a request worker's CPU.
+
+    Submissions beyond `MAX_PENDING` are rejected straight away and a result
+    that takes longer than `TIMEOUT` seconds is abandoned; both surface as a
+    503 with Retry-After so callers back off instead of piling up.
+    """
+
+    def __init__(self, options=None):
+        options = {**DEFAULTS, **(options or {})}
+        self.enabled = options["ENABLED"]
+        self.workers = options["WORKERS"]
+        self.max_pending = options["MAX_PENDING"]
+        self.timeout = options["TIMEOUT"]
+        self.batch_chunk_size = max(1, options["BATCH_CHUNK_SIZE"])
+        self.batch_max_pending = options["BATCH_MAX_PENDING"] or max(
+            1, self.workers // 2
+        )
+        self.mp_context = get_mp_context()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "failed": 0,
+            "in_flight": 0,
+            "busy_seconds": 0.0,
+        }
+
+    def get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=self.mp_context,
+                    initializer=_init_worker,
+                    initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", ""),),
+                )
+            return self._executor
+
+    def reset(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self._stats[key] += value
+
+    def _done(self, started):
+        def callback(future):
+            self._slots.release()
+            with self._lock:
+                self._stats["in_flight"] -= 1
+                self._stats["busy_seconds"] += time.perf_counter() - started
+                if future.cancelled() or future.exception() is not None:
+                    self._stats["failed"] += 1
+                else:
+                    self._stats["completed"] += 1
+
+        return callback
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            raise ServiceUnavailableException(
+                {
+                    "title": "Password hashing",
+                    "message": "Server is busy, please try again shortly.",
+                },
+                wait=1,
+            )
+        try:
+            future = self.get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            self.reset()
+            try:
+                future = self.get_executor().submit(fn, *args)
+            except Exception:
+                self._slots.release()
+                raise
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["in_flight"] += 1
+        future.add_done_callback(self._done(time.perf_counter()))
+        return future
+
+    def run(self, fn, *args):
+        with timed("hash"):
+            if not self.enabled:
+                return fn(*args)
+            future = self.submit(fn, *args)
+            return self.wait(future)
+
+    def wait(self, future):
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self._count("timed_out")
+            raise ServiceUnavailableException(
+                {
+                    "title": "Password hashing",
+                    "message": "Password check timed out, please try again.",
+                },
+                wait=1,
+            )
+
+    async def arun(self, fn, *args):
+        """Await a hashing job without blocking the event loop."""
+        with timed("hash"):
+            if not self.enabled:
+                return await sync_to_async(fn, thread_sensitive=False)(*args)
+            future = self.submit(fn, *args)
+            return await self.await_result(future)
+
+    async def await_result(self, future):
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            self._count("timed_out")
+            raise ServiceUnavailableException(
+                {
+                    "title": "Password hashing",
+                    "message": "Password check timed out, please try again.",
+                },
+                wait=1,
+            )
+
+    def make_passwords(self, passwords):
+        """
+        Hash a batch as jobs of BATCH_CHUNK_SIZE passwords. Each job takes a
+        pending slot and has TIMEOUT seconds, and a batch keeps at most
+        BATCH_MAX_PENDING jobs queued, so logins submitted meanwhile wait
+        behind a few chunks rather than the whole batch.
+        """
+        with timed("hash"):
+            passwords = list(passwords)
+            if not self.enabled or not passwords:
+                return _make_passwords(passwords)
+            size = self.batch_chunk_size
+            chunks = [passwords[i : i + size] for i in range(0, len(passwords), size)]
+            results = []
+            queued = collections.deque()
+            try:
+                for chunk in chunks:
+                    if len(queued) >= self.batch_max_pending:
+                        results += self.wait(queued.popleft())
+                    queued.append(self.submit(_make_passwords, chunk))
+                while queued:
+                    results += self.wait(queued.popleft())
+            finally:
+                for future in queued:
+                    future.cancel()
+            return results
+
+    def make_password(self, password):
+        if not isinstance(password, str):
+            # None/unusable passwords do not hash anything.
+            return hashers.make_password(password)
+        return self.run(_make_password, password)
+
+    def check_password(self, password, encoded):
+        if password is None or not hashers.is_password_usable(encoded):
+            return False
+        return self.run(_check_password, password, encoded)
+
+    async def amake_password(self, password):
+        if not isinstance(password, str):
+            return hashers.make_password(password)
+        return await self.arun(_make_password, password)
+
+    async def acheck_password(self, password, encoded):
+        if password is None or not hashers.is_password_usable(encoded):
+            return False
+        return await self.arun(_check_password, password, encoded)
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update(
+            workers=self.workers,
+            max_pending=self.max_pending,
+            timeout=self.timeout,
+        )
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hasher_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PasswordHasherPool(getattr(settings, "PASSWORD_HASHING", None))
+    return _pool
+
+
+@receiver(setting_changed)
+def reset_hasher_pool(setting, **kwargs):
+    global _pool
+    if setting == "PASSWORD_HASHING":
+        with _pool_lock:
+            pool, _pool = _pool, None
+        if pool is not None:
+            pool.reset()
+
+
+def make_password(password):
+    return get_hasher_pool().make_password(password)
+
+
+def make_passwords(passwords):
+    return get_hasher_pool().make_passwords(passwords)
+
+
+def check_password(password, encoded):
+    return get_hasher_pool().check_password(password, encoded)
+
+
+async def amake_password(password):
+    return await get_hasher_pool().amake_password(password)
+
+
+async def acheck_password(password, encoded):
+    return await get_hasher_pool().acheck_password(password, encoded)
@@ -0,0 +1,285 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+import threading
+import time
+
+
+current_timings = ContextVar("current_timings", default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+PHASES = ("sql", "connect", "serialize", "hash", "jwt", "render")
+
+
+class RequestTimings:
+    """Time spent per phase (seconds) and query count for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self._active = set()
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+@contextmanager
+def timed(phase):
+    """
+    Add the duration of the block to `phase` for the current request.
+    Nested blocks of the same phase are only counted once.
+    """
+    timings = current_timings.get()
+    if timings is None or phase in timings._active:
+        yield
+        return
+    timings._active.add(phase)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings._active.discard(phase)
+        timings.add(phase, time.perf_counter() - started)
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.add("sql", time.perf_counter() - started)
+
+
+@contextmanager
+def sql_timing():
+    """
+    Report the queries this thread runs inside the block to the current
+    request. The wrapper sits on the connection handles, not the database
+    connections, so it also covers connections opened inside the block, and
+    it is popped in stack order with any other `execute_wrapper()`.
+    """
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(sql_wrapper))
+        yield
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Per-process, per-route request metrics in Prometheus text format."""
+
+    prefix = "eduzeit"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations = {}
+        self.queries = {}
+        self.phases = {}
+        self.requests = {}
+
+    def observe(self, method, route, status, timings, duration):
+        key = (method, route)
+        with self._lock:
+            if key not in self.durations:
+                self.durations[key] = Histogram(DURATION_BUCKETS)
+                self.queries[key] = Histogram(QUERY_BUCKETS)
+                self.phases[key] = dict.fromkeys(PHASES, 0.0)
+            self.durations[key].observe(duration)
+            self.queries[key].observe(timings.queries)
+            for phase, seconds in timings.phases.items():
+                self.phases[key][phase] = self.phases[key].get(phase, 0.0) + seconds
+            status_key = (method, route, str(status))
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+
+    def labels(self, **values):
+        return (
+            "{"
+            + ",".join(
+                f'{name}="{escape_label(value)}"' for name, value in values.items()
+            )
+            + "}"
+        )
+
+    def render_histogram(self, lines, name, help_text, histograms):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for (method, route), histogram in sorted(histograms.items()):
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                labels = self.labels(method=method, route=route, le=bound)
+                lines.append(f"{name}_bucket{labels} {count}")
+            labels = self.labels(method=method, route=route, le="+Inf")
+            lines.append(f"{name}_bucket{labels} {histogram.count}")
+            labels = self.labels(method=method, route=route)
+            lines.append(f"{name}_sum{labels} {histogram.sum}")
+            lines.append(f"{name}_count{labels} {histogram.count}")
+
+    def render_gauges(self, lines, name, values):
+        for key, value in sorted(values.items()):
+            if isinstance(value, (int, float)):
+                lines.append(f"{self.prefix}_{name}_{key} {value}")
+
+    def render(self, extra=None):
+        lines = []
+        with self._lock:
+            self.render_histogram(
+                lines,
+                f"{self.prefix}_request_duration_seconds",
+                "Request latency.",
+                self.durations,
+            )
+            self.render_histogram(
+                lines,
+                f"{self.prefix}_request_queries",
+                "Database queries per request.",
+                self.queries,
+            )
+            name = f"{self.prefix}_request_phase_seconds_total"
+            lines.append(f"# HELP {name} Time spent per request phase.")
+            lines.append(f"# TYPE {name} counter")
+            for (method, route), phases in sorted(self.phases.items()):
+                for phase, seconds in phases.items():
+                    labels = self.labels(method=method, route=route, phase=phase)
+                    lines.append(f"{name}{labels} {seconds}")
+            name = f"{self.prefix}_requests_total"
+            lines.append(f"# HELP {name} Requests by response status.")
+            lines.append(f"# TYPE {name} counter")
+            for (method, route, status), count in sorted(self.requests.items()):
+                labels = self.labels(method=method, route=route, status=status)
+                lines.append(f"{name}{labels} {count}")
+        for name, values in (extra or {}).items():
+            self.render_gauges(lines, name, values)
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def get_route(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return "/" + match.route
+
+
+class InstrumentationMiddleware:
+    """
+    Collects SQL, connection wait, serializer, hashing, JWT and render time
+    for each request, reports them in a `Server-Timing` header and feeds
+    `registry`.
+    Place it first in MIDDLEWARE so the total covers the whole stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, "SERVER_TIMING_HEADER", True)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            with sql_timing():
+                response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        # The async ORM runs every query of a request in the same
+        # thread-sensitive thread; wrap the connection handles there.
+        stack = ExitStack()
+        await sync_to_async(stack.enter_context)(sql_timing())
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns.
+        timings = current_timings.get()
+        if timings is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                timings.add("render", time.perf_counter() - started)
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, timings):
+        duration = time.perf_counter() - timings.started
+        registry.observe(
+            request.method, get_route(request), response.status_code, timings, duration
+        )
+        if self.server_timing:
+            sql = timings.phases["sql"] * 1000
+            entries = [f'sql;dur={sql:.2f};desc="{timings.queries} queries"']
+            entries += [
+                f"{phase};dur={timings.phases[phase] * 1000:.2f}"
+                for phase in PHASES
+                if phase != "sql" and timings.phases[phase]
+            ]
+            entries.append(f"total;dur={duration * 1000:.2f}")
+            response["Server-Timing"] = ", ".join(entries)
+        return response
+
+
+def metrics_view(request):
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponseForbidden()
+
+    from common.admission import get_admission_controller
+    from common.authentication import get_token_cache, get_user_cache
+    from common.db.pool import pool_metrics
+    from common.hashing import get_hasher_pool
+    from common.revocation import get_revocation_index
+
+    body = registry.render(
+        {
+            "password_hashing": get_hasher_pool().metrics(),
+            "auth_user_cache": get_user_cache().metrics(),
+            "auth_token_cache": get_token_cache().metrics(),
+            "token_revocation": get_revocation_index().metrics(),
+            "db_pool": pool_metrics(),
+            "admission": get_admission_controller().metrics(),
+        }
+    )
+    return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,4 +1,6 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from django.conf import settings
+from django.core.paginator import InvalidPage
 from rest_framework.response import Response
 from typing import OrderedDict
 from rest_framework.renderers import JSONRenderer
@@ -7,10 +9,315 @@ from rest_framework.compat import (
     LONG_SEPARATORS,
     SHORT_SEPARATORS,
 )
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from django.core.paginator import Paginator as DjangoPaginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.functional import cached_property
+from common.counts import CountProvider
+from django.db.models import Q
+import base64
+import binascii
 import json
 
 
+def get_max_page_size():
+    return getattr(settings, "PAGINATION_MAX_PAGE_SIZE", 10000)
+
+
+def get_stream_chunk_size():
+    return getattr(settings, "PAGINATION_STREAM_CHUNK_SIZE", 1000)
+
+
+class CountedPaginator(DjangoPaginator):
+    """
+    Django paginator whose total comes from a `CountProvider`, which may
+    answer from a cached counter or a planner estimate instead of COUNT(*).
+    """
+
+    count_provider = CountProvider()
+    count_exact = True
+
+    @cached_property
+    def count(self):
+        count, self.count_exact = self.count_provider.count(self.object_list)
+        return count
+
+
 class CustomPagination(PageNumberPagination):
+    """
+    Page-number pagination with `?limit=` capped at PAGINATION_MAX_PAGE_SIZE.
+
+    Pages larger than PAGINATION_STREAM_THRESHOLD rows are not loaded:
+    `paginate_queryset` then returns a lazy `QuerySet.iterator()` over the
+    page, fetching PAGINATION_STREAM_CHUNK_SIZE rows at a time, and sets
+    `streaming` so the view can write the response incrementally (see
+    `common.renderers.StreamingJSONRenderer`). Under ASGI, Django reads a
+    sync iterator into memory before sending it, so memory only stays flat
+    under WSGI; the async list view streams an `aiterator()` instead.
+    """
+
+    django_paginator_class = CountedPaginator
     page_size = 5
     page_query_param = "page"
     page_size_query_param = "limit"
+    streaming = False
+
+    @property
+    def max_page_size(self):
+        return get_max_page_size()
+
+    def should_stream(self, page_size):
+        threshold = getattr(settings, "PAGINATION_STREAM_THRESHOLD", 1000)
+        return threshold is not None and page_size > threshold
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        self.streaming = bool(page_size) and self.should_stream(page_size)
+        if not self.streaming:
+            return super().paginate_queryset(queryset, request, view)
+
+        # PageNumberPagination.paginate_queryset without the final
+        # list(self.page), which would load every row of the page.
+        self.request = request
+        paginator = self.django_paginator_class(queryset, page_size)
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+        rows = self.page.object_list
+        # Rows are read after the view returns, when the request's replica
+        # pinning no longer applies, so pick the database now.
+        return rows.using(rows.db).iterator(chunk_size=get_stream_chunk_size())
+
+    def get_paginated_data(self, data):
+        paginator = self.page.paginator
+        return OrderedDict(
+            [
+                ("count", paginator.count),
+                ("count_exact", paginator.count_exact),
+                ("next", self.get_next_link()),
+                ("previous", self.get_previous_link()),
+                ("results", data),
+            ]
+        )
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_exact"] = {"type": "boolean"}
+        return response_schema
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a fixed column tuple.
+
+    Pages are addressed by an opaque cursor holding the key of the last (or
+    first) row seen, so every page is a `WHERE key > cursor ORDER BY key
+    LIMIT n` index range scan instead of COUNT(*) + OFFSET. The next link
+    needs the last row before the body can start, so pages are never
+    streamed; `?limit=` is capped at PAGINATION_MAX_PAGE_SIZE.
+    """
+
+    page_size = 5
+    page_size_query_param = "limit"
+    cursor_query_param = "cursor"
+    ordering_query_param = "order_by"
+    count_query_param = "count"
+    orderings = {
+        "id": ("id",),
+        "date": ("date", "id"),
+    }
+    default_ordering = "id"
+    invalid_cursor_message = "Invalid cursor"
+    count_provider = CountProvider()
+    streaming = False
+
+    @property
+    def max_page_size(self):
+        return get_max_page_size()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering_name, self.ordering = self.get_ordering(request)
+        self.count = None
+        self.count_exact = True
+        if self.wants_count(request):
+            self.count, self.count_exact = self.count_provider.count(queryset)
+
+        cursor = self.decode_cursor(request)
+        reverse = False
+        if cursor is not None:
+            if cursor.get("o") != self.ordering_name:
+                raise NotFound(self.invalid_cursor_message)
+            reverse = bool(cursor.get("r"))
+            queryset = queryset.filter(
+                self.keyset_filter(queryset.model, cursor["k"], reverse)
+            )
+
+        order_by = [("-" if reverse else "") + field for field in self.ordering]
+        rows = list(queryset.order_by(*order_by)[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next = cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        fields = [
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+        ]
+        if self.count is not None:
+            fields[:0] = [("count", self.count), ("count_exact", self.count_exact)]
+        fields.append(("results", data))
+        return Response(OrderedDict(fields))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "count": {"type": "integer", "example": 123},
+                "count_exact": {"type": "boolean"},
+                "next": {"type": "string", "nullable": True},
+                "previous": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        if self.max_page_size:
+            return min(page_size, self.max_page_size)
+        return page_size
+
+    def get_ordering(self, request):
+        name = request.query_params.get(
+            self.ordering_query_param, self.default_ordering
+        )
+        if name not in self.orderings:
+            name = self.default_ordering
+        return name, self.orderings[name]
+
+    def wants_count(self, request):
+        value = request.query_params.get(self.count_query_param, "")
+        return value.lower() in ("1", "true", "yes")
+
+    def keyset_filter(self, model, values, reverse):
+        """
+        Build `(a, b) > (x, y)` as `a > x OR (a = x AND b > y)` so it works
+        on every backend and can use a composite index on the key columns.
+        """
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            values = [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+        lookup = "lt" if reverse else "gt"
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            equal = {self.ordering[j]: values[j] for j in range(i)}
+            condition |= Q(**equal, **{f"{field}__{lookup}": values[i]})
+        return condition
+
+    def get_key(self, instance):
+        if isinstance(instance, dict):
+            return [instance[field] for field in self.ordering]
+        return [getattr(instance, field) for field in self.ordering]
+
+    def encode_cursor(self, key, reverse):
+        payload = {"o": self.ordering_name, "k": key}
+        if reverse:
+            payload["r"] = 1
+        raw = json.dumps(payload, cls=DjangoJSONEncoder, separators=SHORT_SEPARATORS)
+        encoded = base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode("ascii"))
+            cursor = json.loads(raw.decode("utf-8"))
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(cursor, dict) or not isinstance(cursor.get("k"), list):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.get_key(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.get_key(self.page[0]), reverse=True)
+
+
+class PaginationModeMixin:
+    """
+    Lets a list view pick its paginator per request.
+
+    `?paginate=cursor` (or simply sending a `cursor`) switches to keyset
+    paging; anything else keeps the page-number behaviour existing clients
+    rely on.
+    """
+
+    pagination_mode_query_param = "paginate"
+    pagination_classes = {
+        "page": CustomPagination,
+        "cursor": KeysetPagination,
+    }
+
+    def get_pagination_mode(self):
+        params = self.request.query_params
+        mode = params.get(self.pagination_mode_query_param)
+        if mode in self.pagination_classes:
+            return mode
+        if params.get(KeysetPagination.cursor_query_param):
+            return "cursor"
+        return "page"
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if getattr(self, "request", None) is None:
+                self._paginator = self.pagination_class()
+            else:
+                self._paginator = self.pagination_classes[self.get_pagination_mode()]()
+        return self._paginator
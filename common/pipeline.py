@@ -0,0 +1,53 @@
+"""
+Browser-only middleware that steps aside for the JWT API.
+
+Routes under LEAN_MIDDLEWARE_PREFIXES authenticate with
+CachedJWTAuthentication alone, so sessions, CSRF cookies, `request.user`
+and message storage are pure overhead there. The classes below subclass
+Django's so the admin's system checks still find them; for any other path
+(such as db/admin/) they behave exactly like the originals.
+"""
+from django.conf import settings
+from django.contrib.auth import middleware as auth
+from django.contrib.messages import middleware as messages
+from django.contrib.sessions import middleware as sessions
+from django.middleware import csrf
+
+
+def get_lean_prefixes():
+    return tuple(getattr(settings, "LEAN_MIDDLEWARE_PREFIXES", ()))
+
+
+class WebOnlyMixin:
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.lean_prefixes = get_lean_prefixes()
+
+    def is_lean(self, request):
+        return request.path_info.startswith(self.lean_prefixes)
+
+    def __call__(self, request):
+        if self.is_lean(request):
+            # In async mode this hands back the coroutine for the caller to
+            # await, as MiddlewareMixin.__call__ does.
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionMiddleware(WebOnlyMixin, sessions.SessionMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(WebOnlyMixin, csrf.CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if self.is_lean(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class AuthenticationMiddleware(WebOnlyMixin, auth.AuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(WebOnlyMixin, messages.MessageMiddleware):
+    pass
@@ -0,0 +1,170 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.db import connections
+from django.urls import URLPattern, URLResolver, get_resolver
+import logging
+import re
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ENABLED": False,
+    "RAISE": False,
+    "DEFAULT": None,
+    "REPEAT_THRESHOLD": 3,
+}
+
+# Transaction control is issued differently per backend; it is not a query
+# a view "spends".
+IGNORED = re.compile(r"^\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE SAVEPOINT)\b", re.I)
+IN_LIST = re.compile(r"\(\s*%s(\s*,\s*%s)*\s*\)")
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, "QUERY_BUDGET", {})}
+
+
+def query_budget(max_queries, allow_repeats=False):
+    """
+    Declare the most queries a view may run per request. `None` means
+    unbounded; `allow_repeats` turns off N+1 detection for views that batch
+    on purpose.
+    """
+
+    def decorator(view):
+        view.query_budget = max_queries
+        view.query_budget_allow_repeats = allow_repeats
+        return view
+
+    return decorator
+
+
+def get_view_budget(view):
+    """Budget declared on a view function or class, or the default."""
+    for target in (view, getattr(view, "cls", None), getattr(view, "view_class", None)):
+        if target is not None and hasattr(target, "query_budget"):
+            return target.query_budget, target.query_budget_allow_repeats
+    return get_options()["DEFAULT"], False
+
+
+def query_shape(sql):
+    """SQL with literals and IN-list lengths erased, for spotting N+1s."""
+    return LITERAL.sub("?", IN_LIST.sub("(...)", sql)).strip()
+
+
+class QueryLog:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not IGNORED.match(sql):
+            self.statements.append(sql)
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.statements)
+
+    def repeated(self, threshold):
+        counts = Counter(query_shape(sql) for sql in self.statements)
+        return {shape: count for shape, count in counts.items() if count >= threshold}
+
+
+@contextmanager
+def capture_queries(using=None):
+    """Record every statement run on `using` (default: all databases)."""
+    log = QueryLog()
+    aliases = [using] if using else list(connections)
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(log))
+        yield log
+
+
+def budget_problems(log, budget, allow_repeats=False, repeat_threshold=None):
+    if repeat_threshold is None:
+        repeat_threshold = get_options()["REPEAT_THRESHOLD"]
+    problems = []
+    if budget is not None and len(log) > budget:
+        problems.append(f"ran {len(log)} queries, budget is {budget}")
+    if not allow_repeats and repeat_threshold:
+        for shape, count in log.repeated(repeat_threshold).items():
+            problems.append(f"probable N+1: {count}x {shape[:200]}")
+    return problems
+
+
+@contextmanager
+def assert_query_budget(view, label=None):
+    """
+    Test helper: fail if the block runs more queries than `view` declares,
+    or repeats one query shape often enough to look like an N+1.
+
+        with assert_query_budget(UserListView):
+            client.get("/api/v1/accounts/user-list/")
+    """
+    budget, allow_repeats = get_view_budget(view)
+    with capture_queries() as log:
+        yield log
+    problems = budget_problems(log, budget, allow_repeats)
+    if problems:
+        name = label or getattr(view, "__name__", repr(view))
+        raise QueryBudgetExceeded(f"{name}: " + "; ".join(problems))
+
+
+def iter_route_budgets(urlconf=None):
+    """Yield `(route, view, budget)` for every URL pattern, for coverage checks."""
+
+    def walk(resolver, prefix):
+        for pattern in resolver.url_patterns:
+            route = prefix + str(pattern.pattern)
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern, route)
+            elif isinstance(pattern, URLPattern):
+                yield route, pattern.callback, get_view_budget(pattern.callback)[0]
+
+    yield from walk(get_resolver(urlconf), "")
+
+
+class QueryBudgetMiddleware:
+    """
+    Development check that logs (or, with RAISE, fails) requests whose view
+    exceeds its query budget or repeats a query shape. Enable it through
+    QUERY_BUDGET["ENABLED"]; async requests pass through untouched.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.options = get_options()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+        if not self.options["ENABLED"]:
+            return self.get_response(request)
+        with capture_queries() as log:
+            response = self.get_response(request)
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return response
+        budget, allow_repeats = get_view_budget(match.func)
+        problems = budget_problems(
+            log, budget, allow_repeats, self.options["REPEAT_THRESHOLD"]
+        )
+        if problems:
+            message = f"{request.method} {request.path}: " + "; ".join(problems)
+            if self.options["RAISE"]:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,105 @@
+from collections.abc import AsyncIterator, Iterator
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.renderers import JSONRenderer
+
+
+class StreamingJSONRenderer(JSONRenderer):
+    """
+    Renders the same JSON as `JSONRenderer`, but as a stream of byte chunks
+    for a StreamingHttpResponse.
+
+    Dicts and lists are written as usual; an iterator anywhere in `data`
+    (such as a page of rows read with `QuerySet.iterator()`) is written as
+    a JSON array while it is consumed, `batch_size` items per chunk, so the
+    whole body never has to exist in memory at once. `aiter_render` does the
+    same as an async generator, and also accepts async iterators, for
+    StreamingHttpResponses served under ASGI.
+    """
+
+    batch_size = 100
+
+    def get_encoder(self):
+        return self.encoder_class(
+            ensure_ascii=self.ensure_ascii,
+            allow_nan=not self.strict,
+            separators=SHORT_SEPARATORS if self.compact else LONG_SEPARATORS,
+        )
+
+    def iter_render(self, data):
+        encoder = self.get_encoder()
+        pending = []
+        for part in self.iter_parts(data, encoder):
+            if part is None:
+                yield self.finish_chunk(pending)
+                pending = []
+            else:
+                pending.append(part)
+        if pending:
+            yield self.finish_chunk(pending)
+
+    async def aiter_render(self, data):
+        encoder = self.get_encoder()
+        pending = []
+        async for part in self.aiter_parts(data, encoder):
+            if part is None:
+                yield self.finish_chunk(pending)
+                pending = []
+            else:
+                pending.append(part)
+        if pending:
+            yield self.finish_chunk(pending)
+
+    def finish_chunk(self, parts):
+        # As in JSONRenderer.render: keep the output a strict JavaScript subset.
+        chunk = "".join(parts).replace("\u2028", "\\u2028")
+        return chunk.replace("\u2029", "\\u2029").encode()
+
+    def iter_parts(self, value, encoder):
+        """Yield string fragments of `value`, and None where a chunk may end."""
+        item_separator, key_separator = encoder.item_separator, encoder.key_separator
+        if isinstance(value, dict):
+            yield "{"
+            for index, (key, item) in enumerate(value.items()):
+                if index:
+                    yield item_separator
+                yield encoder.encode(str(key)) + key_separator
+                yield from self.iter_parts(item, encoder)
+            yield "}"
+        elif isinstance(value, Iterator):
+            yield "["
+            for index, item in enumerate(value):
+                if index:
+                    yield item_separator
+                    if index % self.batch_size == 0:
+                        yield None
+                yield encoder.encode(item)
+            yield "]"
+        else:
+            yield encoder.encode(value)
+
+    async def aiter_parts(self, value, encoder):
+        """`iter_parts`, reading async iterators with `async for`."""
+        item_separator, key_separator = encoder.item_separator, encoder.key_separator
+        if isinstance(value, dict):
+            yield "{"
+            for index, (key, item) in enumerate(value.items()):
+                if index:
+                    yield item_separator
+                yield encoder.encode(str(key)) + key_separator
+                async for part in self.aiter_parts(item, encoder):
+                    yield part
+            yield "}"
+        elif isinstance(value, AsyncIterator):
+            yield "["
+            index = 0
+            async for item in value:
+                if index:
+                    yield item_separator
+                    if index % self.batch_size == 0:
+                        yield None
+                yield encoder.encode(item)
+                index += 1
+            yield "]"
+        else:
+            for part in self.iter_parts(value, encoder):
+                yield part
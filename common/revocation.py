@@ -0,0 +1,312 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from common.routers import get_options as get_routing_options
+from rest_framework_simplejwt.settings import api_settings
+import datetime
+import hashlib
+import math
+import threading
+import time
+
+
+DEFAULTS = {
+    "SYNC_INTERVAL": 5,
+    # Longest lifetime of any token we issue (login hands out 14-day
+    # refresh tokens); a revoked member is remembered for that long.
+    "LIFETIME": 14 * 24 * 3600,
+    "CAPACITY": 100000,
+    "ERROR_RATE": 0.01,
+}
+
+# Rows written by transactions that committed after the last sync can carry
+# an older `revoked_at`; re-reading this much history picks them up.
+SYNC_OVERLAP = datetime.timedelta(seconds=60)
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, "TOKEN_REVOCATION", {})}
+
+
+def get_cutoff(revoked_at):
+    """
+    Whole-second cutoff for a revocation at `revoked_at`. `iat` claims are
+    truncated to the second, so a token issued in the same second cannot be
+    ordered against the revocation; rounding up revokes it too.
+    """
+    return math.ceil(revoked_at.timestamp())
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter: no false negatives, about `error_rate` false
+    positives while it holds at most `capacity` keys.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(1, capacity)
+        bits = -self.capacity * math.log(error_rate) / math.log(2) ** 2
+        self.size = max(8, math.ceil(bits))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, key):
+        # Double hashing: k positions from the two halves of one digest.
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self.positions(key)
+        )
+
+
+class RevocationIndex:
+    """
+    In-memory view of the revoked members and tokens stored as
+    `TokenRevocation` rows.
+
+    A Bloom filter answers the usual "not revoked" in a few bit tests; its
+    positives are confirmed against exact maps of user id to cutoff and of
+    jti to expiry. Each process loads the unexpired rows once, adds its own
+    revocations as they commit and re-reads recent rows every
+    SYNC_INTERVAL seconds (see RevocationSyncMiddleware), so revocations
+    made elsewhere apply within that interval.
+    """
+
+    def __init__(self, options=None):
+        options = {**DEFAULTS, **(options or {})}
+        self.sync_interval = options["SYNC_INTERVAL"]
+        self.lifetime = options["LIFETIME"]
+        self.capacity = options["CAPACITY"]
+        self.error_rate = options["ERROR_RATE"]
+        self.model = None
+        self.users = {}
+        self.jtis = {}
+        self.bloom = BloomFilter(self.capacity, self.error_rate)
+        self.loaded = False
+        self.synced_at = None
+        self.synced = float("-inf")
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self.revoked_total = 0
+
+    def connect(self, model):
+        self.model = model
+
+    def user_key(self, user_id):
+        return f"user:{user_id}"
+
+    def jti_key(self, jti):
+        return f"jti:{jti}"
+
+    def user_cutoff(self, user_id):
+        """Epoch second before which `user_id`'s tokens are revoked, or None."""
+        if self.user_key(user_id) not in self.bloom:
+            return None
+        return self.users.get(str(user_id))
+
+    def is_revoked(self, payload):
+        """Whether the token with these claims was revoked."""
+        user_id = payload.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None:
+            cutoff = self.user_cutoff(user_id)
+            issued = payload.get("iat")
+            if cutoff is not None and (issued is None or issued < cutoff):
+                return True
+        jti = payload.get(api_settings.JTI_CLAIM)
+        if jti is not None and self.jti_key(jti) in self.bloom:
+            return jti in self.jtis
+        return False
+
+    def add(self, users=(), jtis=()):
+        """Add (user_id, cutoff) and (jti, exp) pairs, in whole epoch seconds."""
+        with self._lock:
+            for user_id, cutoff in users:
+                user_id = str(user_id)
+                if user_id not in self.users:
+                    self.bloom.add(self.user_key(user_id))
+                elif self.users[user_id] >= cutoff:
+                    continue
+                self.users[user_id] = cutoff
+            for jti, expires in jtis:
+                if jti not in self.jtis:
+                    self.bloom.add(self.jti_key(jti))
+                self.jtis[jti] = expires
+            if self.bloom.count > self.bloom.capacity:
+                self.rebuild()
+
+    def rebuild(self):
+        # Called with the lock held once the filter is full. Bloom filters
+        # cannot forget a key, so drop expired entries into a fresh one.
+        now = time.time()
+        self.users = {
+            user_id: cutoff
+            for user_id, cutoff in self.users.items()
+            if cutoff + self.lifetime > now
+        }
+        self.jtis = {
+            jti: expires for jti, expires in self.jtis.items() if expires > now
+        }
+        size = len(self.users) + len(self.jtis)
+        bloom = BloomFilter(max(self.capacity, size * 2), self.error_rate)
+        for user_id in self.users:
+            bloom.add(self.user_key(user_id))
+        for jti in self.jtis:
+            bloom.add(self.jti_key(jti))
+        self.bloom = bloom
+
+    @property
+    def primary(self):
+        return get_routing_options()["PRIMARY"]
+
+    def get_queryset(self):
+        # The primary, so a replica that lags never hides a revocation.
+        return self.model.objects.using(self.primary)
+
+    def sync_due(self):
+        if self.model is None:
+            return False
+        if not self.loaded:
+            return True
+        return time.monotonic() - self.synced >= self.sync_interval
+
+    def sync(self):
+        """Load unexpired rows, or only the recent ones after the first load."""
+        # The first load blocks so no request is let through unchecked;
+        # later syncs are skipped while another thread is running one.
+        if not self._sync_lock.acquire(blocking=not self.loaded):
+            return
+        try:
+            now = timezone.now()
+            queryset = self.get_queryset().filter(expires_at__gt=now)
+            if self.synced_at is not None:
+                since = self.synced_at - SYNC_OVERLAP
+                queryset = queryset.filter(revoked_at__gte=since)
+            users, jtis = [], []
+            for user_id, jti, revoked_at, expires_at in queryset.values_list(
+                "user_id", "jti", "revoked_at", "expires_at"
+            ):
+                if user_id is not None:
+                    users.append((user_id, get_cutoff(revoked_at)))
+                if jti is not None:
+                    jtis.append((jti, expires_at.timestamp()))
+            self.add(users, jtis)
+            self.synced_at = now
+            self.synced = time.monotonic()
+            self.loaded = True
+        finally:
+            self._sync_lock.release()
+
+    def revoke_users(self, user_ids, batch_size=500):
+        """
+        Revoke every token issued so far to `user_ids`. Rows are written in
+        the current transaction and reach memory once it commits.
+        """
+        now = timezone.now()
+        expires_at = now + datetime.timedelta(seconds=self.lifetime)
+        self.get_queryset().bulk_create(
+            [
+                self.model(user_id=user_id, revoked_at=now, expires_at=expires_at)
+                for user_id in user_ids
+            ],
+            batch_size=batch_size,
+        )
+        cutoff = get_cutoff(now)
+        users = [(user_id, cutoff) for user_id in user_ids]
+        self.revoked_total += len(users)
+        transaction.on_commit(lambda: self.add(users=users), using=self.primary)
+
+    def revoke_token(self, token):
+        """
+        Revoke one token (anything with a jti and exp claim) until it
+        expires, as UserLogoutView does with refresh tokens.
+        """
+        jti = token[api_settings.JTI_CLAIM]
+        expires = token["exp"]
+        self.get_queryset().create(
+            jti=jti,
+            revoked_at=timezone.now(),
+            expires_at=datetime.datetime.fromtimestamp(
+                expires, tz=datetime.timezone.utc
+            ),
+        )
+        self.revoked_total += 1
+        transaction.on_commit(
+            lambda: self.add(jtis=[(jti, expires)]), using=self.primary
+        )
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "users": len(self.users),
+                "jtis": len(self.jtis),
+                "bloom_keys": self.bloom.count,
+                "bloom_bytes": len(self.bloom.bits),
+                "revoked_total": self.revoked_total,
+            }
+
+
+_revocation_index = None
+_revocation_index_lock = threading.Lock()
+
+
+def get_revocation_index():
+    global _revocation_index
+    if _revocation_index is None:
+        with _revocation_index_lock:
+            if _revocation_index is None:
+                _revocation_index = RevocationIndex(get_options())
+    return _revocation_index
+
+
+@receiver(setting_changed)
+def reset_revocation_index(setting, **kwargs):
+    global _revocation_index
+    if setting == "TOKEN_REVOCATION":
+        with _revocation_index_lock:
+            index, _revocation_index = _revocation_index, None
+        if index is not None:
+            get_revocation_index().connect(index.model)
+
+
+class RevocationSyncMiddleware:
+    """
+    Loads the RevocationIndex on the first request and refreshes it every
+    SYNC_INTERVAL seconds. List it before QueryBudgetMiddleware: the sync
+    query belongs to no view's budget.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        index = get_revocation_index()
+        if index.sync_due():
+            index.sync()
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        index = get_revocation_index()
+        if index.sync_due():
+            await sync_to_async(index.sync)()
+        return await self.get_response(request)
@@ -0,0 +1,252 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+import hashlib
+import itertools
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "PRIMARY": "default",
+    "REPLICAS": [],
+    "PIN_SECONDS": 5,
+    "PIN_COOKIE": "db_pin",
+    "PIN_CACHE": None,
+    "CHECK_INTERVAL": 10,
+    "COOLDOWN": 30,
+    "MAX_LAG": None,
+}
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, "DATABASE_REPLICAS", {})}
+
+
+class RoutingState:
+    """Per-request routing flags, shared by reference with sync_to_async threads."""
+
+    def __init__(self, client_pinned=False, unsafe=False):
+        self.client_pinned = client_pinned
+        self.unsafe = unsafe
+        self.wrote = False
+
+    @property
+    def pinned(self):
+        return self.client_pinned or self.unsafe
+
+
+current_routing = ContextVar("current_routing", default=None)
+
+
+def mark_read_only():
+    """
+    Let the current unsafe-method request (a POST that only reads, such as
+    a batch lookup) read from replicas. Clients pinned by a recent write
+    stay on the primary.
+    """
+    state = current_routing.get()
+    if state is not None:
+        state.unsafe = False
+
+
+class ReplicaHealth:
+    """
+    Remembers which replicas answered their last probe. A replica is probed
+    at most once per CHECK_INTERVAL; one that cannot be reached (or lags by
+    more than MAX_LAG seconds) is skipped for COOLDOWN seconds.
+    """
+
+    def __init__(self, check_interval, cooldown, max_lag=None):
+        self.check_interval = check_interval
+        self.cooldown = cooldown
+        self.max_lag = max_lag
+        self._lock = threading.Lock()
+        self.checked = {}
+        self.down_until = {}
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            if self.down_until.get(alias, 0) > now:
+                return False
+            if now - self.checked.get(alias, float("-inf")) < self.check_interval:
+                return True
+            self.checked[alias] = now
+        healthy = self.probe(alias)
+        if not healthy:
+            self.mark_down(alias)
+        return healthy
+
+    def mark_down(self, alias):
+        with self._lock:
+            self.down_until[alias] = time.monotonic() + self.cooldown
+        logger.warning(
+            "Replica %s is unavailable, skipping it for %ss", alias, self.cooldown
+        )
+
+    def probe(self, alias):
+        connection = connections[alias]
+        try:
+            connection.ensure_connection()
+            if self.max_lag is None or connection.vendor != "postgresql":
+                return True
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT COALESCE(EXTRACT(EPOCH FROM "
+                    "now() - pg_last_xact_replay_timestamp()), 0)"
+                )
+                return cursor.fetchone()[0] <= self.max_lag
+        except DatabaseError:
+            return False
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes go to the primary, reads to a healthy replica in turn.
+
+    Reads stay on the primary while it is in a transaction, for unsafe
+    requests, and for clients that wrote in the last PIN_SECONDS (see
+    ReplicaPinningMiddleware). With no replicas configured every query
+    uses the primary.
+    """
+
+    def __init__(self):
+        options = get_options()
+        self.primary = options["PRIMARY"]
+        self.replicas = list(options["REPLICAS"])
+        self.health = ReplicaHealth(
+            options["CHECK_INTERVAL"], options["COOLDOWN"], options["MAX_LAG"]
+        )
+        self._turns = itertools.cycle(range(len(self.replicas) or 1))
+
+    def get_replica(self):
+        for _ in range(len(self.replicas)):
+            alias = self.replicas[next(self._turns) % len(self.replicas)]
+            if self.health.is_healthy(alias):
+                return alias
+        return self.primary
+
+    def db_for_read(self, model, **hints):
+        if not self.replicas:
+            return self.primary
+        state = current_routing.get()
+        if state is not None and state.pinned:
+            return self.primary
+        if connections[self.primary].in_atomic_block:
+            return self.primary
+        return self.get_replica()
+
+    def db_for_write(self, model, **hints):
+        state = current_routing.get()
+        if state is not None:
+            state.wrote = True
+        return self.primary
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {self.primary, *self.replicas}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+def get_client_key(request):
+    authorization = request.headers.get("Authorization")
+    if not authorization:
+        return None
+    digest = hashlib.sha256(authorization.encode("utf-8")).hexdigest()
+    return f"db-pin:{digest}"
+
+
+class ReplicaPinningMiddleware:
+    """
+    Read-your-writes for PrimaryReplicaRouter. Unsafe requests read from
+    the primary throughout; a request that wrote pins its client to the
+    primary for PIN_SECONDS, both with a cookie and, for bearer-token
+    clients that drop cookies, with an entry keyed on the Authorization
+    header in the PIN_CACHE cache.
+
+    The client's next request may reach any worker, so PIN_CACHE must name
+    a shared cache (Redis, Memcached, database). Without one, bearer-token
+    clients always read from the primary.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.options = get_options()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.get_state(request)
+        token = current_routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        state = self.get_state(request)
+        token = current_routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        return self.finish(request, response, state)
+
+    def get_state(self, request):
+        return RoutingState(
+            client_pinned=self.is_client_pinned(request),
+            unsafe=request.method not in SAFE_METHODS,
+        )
+
+    def is_client_pinned(self, request):
+        if not self.options["REPLICAS"]:
+            return False
+        try:
+            if float(request.COOKIES.get(self.options["PIN_COOKIE"], 0)) > time.time():
+                return True
+        except ValueError:
+            pass
+        key = get_client_key(request)
+        if key is None:
+            return False
+        cache = self.get_pin_cache()
+        if cache is None:
+            # Another worker may have taken this client's write.
+            return True
+        return cache.get(key) is not None
+
+    def get_pin_cache(self):
+        alias = self.options["PIN_CACHE"]
+        return caches[alias] if alias else None
+
+    def finish(self, request, response, state):
+        if not state.wrote or not self.options["REPLICAS"]:
+            return response
+        seconds = self.options["PIN_SECONDS"]
+        response.set_cookie(
+            self.options["PIN_COOKIE"],
+            str(time.time() + seconds),
+            max_age=seconds,
+            httponly=True,
+            samesite="Lax",
+        )
+        key = get_client_key(request)
+        cache = self.get_pin_cache()
+        if key is not None and cache is not None:
+            cache.set(key, 1, seconds)
+        return response
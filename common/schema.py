@@ -0,0 +1,145 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.views import View
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from pathlib import Path
+import gzip
+import hashlib
+import threading
+
+
+SCHEMA_FORMATS = {
+    "yaml": (OpenApiYamlRenderer, "application/vnd.oai.openapi"),
+    "json": (OpenApiJsonRenderer, "application/vnd.oai.openapi+json"),
+}
+
+
+class SchemaDocument:
+    """One rendered schema format with its gzip body and strong ETags."""
+
+    def __init__(self, schema_format, body):
+        self.format = schema_format
+        self.content_type = SCHEMA_FORMATS[schema_format][1]
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = f'"{digest}-{schema_format}"'
+        self.gzip_etag = f'"{digest}-{schema_format}-gz"'
+
+
+class SchemaStore:
+    """
+    Generates the OpenAPI schema once per process and keeps every format
+    rendered and gzipped in memory. `build_schema` also writes the files to
+    SCHEMA_CACHE_DIR, which non-DEBUG processes load instead of walking the
+    views again.
+    """
+
+    def __init__(self):
+        self._documents = None
+        self._lock = threading.Lock()
+
+    def get_directory(self):
+        directory = getattr(settings, "SCHEMA_CACHE_DIR", None)
+        return Path(directory) if directory else None
+
+    def generate(self):
+        generator = spectacular_settings.DEFAULT_GENERATOR_CLASS(
+            urlconf=spectacular_settings.SERVE_URLCONF
+        )
+        schema = generator.get_schema(
+            request=None, public=spectacular_settings.SERVE_PUBLIC
+        )
+        return {
+            schema_format: SchemaDocument(
+                schema_format, renderer().render(schema, renderer_context={})
+            )
+            for schema_format, (renderer, _) in SCHEMA_FORMATS.items()
+        }
+
+    def load(self):
+        directory = self.get_directory()
+        if directory is None or settings.DEBUG:
+            return None
+        try:
+            return {
+                schema_format: SchemaDocument(
+                    schema_format,
+                    (directory / f"schema.{schema_format}").read_bytes(),
+                )
+                for schema_format in SCHEMA_FORMATS
+            }
+        except OSError:
+            return None
+
+    def write(self, documents):
+        directory = self.get_directory()
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for document in documents.values():
+            path = directory / f"schema.{document.format}"
+            path.write_bytes(document.body)
+            gz_path = directory / f"schema.{document.format}.gz"
+            gz_path.write_bytes(document.gzipped)
+            paths += [path, gz_path]
+        return paths
+
+    def rebuild(self):
+        documents = self.generate()
+        with self._lock:
+            self._documents = documents
+        return documents
+
+    def get(self, schema_format):
+        if self._documents is None:
+            with self._lock:
+                if self._documents is None:
+                    self._documents = self.load() or self.generate()
+        return self._documents[schema_format]
+
+
+schema_store = SchemaStore()
+
+
+class PrecomputedSchemaView(View):
+    """
+    Serves the cached schema. Supports `If-None-Match` (304) and hands out
+    the pre-gzipped body to clients that accept gzip. The format follows
+    `?format=json|yaml`, then the Accept header, defaulting to YAML like
+    `SpectacularAPIView`.
+    """
+
+    store = schema_store
+
+    def get_format(self, request):
+        requested = request.GET.get("format")
+        if requested in SCHEMA_FORMATS:
+            return requested
+        if "json" in request.headers.get("Accept", ""):
+            return "json"
+        return "yaml"
+
+    def get(self, request, *args, **kwargs):
+        document = self.store.get(self.get_format(request))
+        use_gzip = "gzip" in request.headers.get("Accept-Encoding", "")
+        etag = document.gzip_etag if use_gzip else document.etag
+
+        if_none_match = request.headers.get("If-None-Match", "")
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        if "*" in candidates or etag in candidates:
+            response = HttpResponseNotModified()
+        elif use_gzip:
+            response = HttpResponse(
+                document.gzipped, content_type=document.content_type
+            )
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(document.body, content_type=document.content_type)
+        response["ETag"] = etag
+        response["Cache-Control"] = "public, no-cache"
+        filename = f"{spectacular_settings.TITLE or 'schema'}.{document.format}"
+        response["Content-Disposition"] = f'inline; filename="{filename}"'
+        patch_vary_headers(response, ["Accept", "Accept-Encoding"])
+        return response
@@ -1,4 +1,16 @@
 from rest_framework import serializers
+from rest_framework import ISO_8601
+from rest_framework.settings import api_settings
+from django.utils import timezone
+from common.instrumentation import timed
+
+
+class TimedSerializerMixin:
+    """Reports to_representation time as the request's `serialize` phase."""
+
+    def to_representation(self, instance):
+        with timed("serialize"):
+            return super().to_representation(instance)
 
 
 class OperationError(serializers.Serializer):
@@ -7,4 +19,91 @@ class OperationError(serializers.Serializer):
 
 
 class OperationSuccess(OperationError):
-    data = serializers.JSONField(default={})
\ No newline at end of file
+    data = serializers.JSONField(default={})
+
+
+def _iso_date(value):
+    return value.isoformat()
+
+
+def _iso_datetime(field):
+    # Same steps as DateTimeField.to_representation with the ISO format.
+    def convert(value):
+        field_timezone = getattr(field, "timezone", None) or field.default_timezone()
+        if field_timezone is not None and timezone.is_aware(value):
+            value = value.astimezone(field_timezone)
+        value = value.isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    return convert
+
+
+class CompiledReadSerializer:
+    """
+    Read-only twin of a ModelSerializer for hot list/detail paths.
+
+    The field list and a converter per field are worked out once, up front;
+    rows from `QuerySet.values()` (or model instances) are then turned into
+    plain dicts with one function call per column instead of DRF's
+    per-field `get_attribute`/`to_representation` machinery. Output matches
+    the source serializer for the fields it keeps.
+    """
+
+    def __init__(self, serializer_class, exclude=(), fields=None):
+        self.serializer_class = serializer_class
+        self.exclude = tuple(exclude)
+        self.plan = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only or name in self.exclude:
+                continue
+            if fields is not None and name not in fields:
+                continue
+            self.plan.append((name, field.source, self.get_converter(field)))
+        self.columns = [source for _, source, _ in self.plan]
+        self._selections = {}
+
+    def get_converter(self, field):
+        if isinstance(field, serializers.DateTimeField):
+            if getattr(field, "format", api_settings.DATETIME_FORMAT) == ISO_8601:
+                return _iso_datetime(field)
+        elif isinstance(field, serializers.DateField):
+            if getattr(field, "format", api_settings.DATE_FORMAT) == ISO_8601:
+                return _iso_date
+        elif isinstance(field, serializers.BooleanField):
+            return bool
+        elif isinstance(field, serializers.IntegerField):
+            return int
+        elif isinstance(field, serializers.CharField):
+            return str
+        return field.to_representation
+
+    def select(self, fields=None):
+        """The same serializer narrowed to `fields` (None keeps all)."""
+        if fields is None:
+            return self
+        key = tuple(fields)
+        if key not in self._selections:
+            self._selections[key] = type(self)(
+                self.serializer_class, exclude=self.exclude, fields=key
+            )
+        return self._selections[key]
+
+    def to_dict(self, row):
+        return {
+            name: None if row[source] is None else convert(row[source])
+            for name, source, convert in self.plan
+        }
+
+    def to_dicts(self, rows):
+        with timed("serialize"):
+            return [self.to_dict(row) for row in rows]
+
+    def from_instance(self, instance):
+        with timed("serialize"):
+            data = {}
+            for name, source, convert in self.plan:
+                value = getattr(instance, source)
+                data[name] = None if value is None else convert(value)
+            return data
@@ -44,15 +44,31 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "common.instrumentation.InstrumentationMiddleware",
+    "common.admission.AdmissionControlMiddleware",
+    "common.revocation.RevocationSyncMiddleware",
+    "common.query_budget.QueryBudgetMiddleware",
+    "common.routers.ReplicaPinningMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "common.pipeline.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
+    "common.pipeline.CsrfViewMiddleware",
+    "common.pipeline.AuthenticationMiddleware",
+    "common.pipeline.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# The common.pipeline middleware (session, CSRF, auth, messages) are skipped
+# for these JWT-only API paths; db/admin/ and everything else get the full
+# stack.
+LEAN_MIDDLEWARE_PREFIXES = ["/api/v1/accounts/"]
+
+# security.W003 looks for Django's CsrfViewMiddleware by its exact path and
+# misses the common.pipeline subclass. auth.E003 wants Member.email itself
+# unique; the case-insensitive member_email_lower_uniq constraint is stricter
+# and UserManager.get_by_natural_key looks emails up through it.
+SILENCED_SYSTEM_CHECKS = ["security.W003", "auth.E003"]
+
 ROOT_URLCONF = "eduzeit_lms.urls"
 
 
@@ -84,9 +100,57 @@ DATABASES = {
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD", "highspeed12"),
         "PORT": os.environ.get("POSTGRES_PORT", "5432"),
         "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
+        # Keep each worker thread's connection open between requests and
+        # check it is still alive before reusing it.
+        "CONN_MAX_AGE": int(os.environ.get("POSTGRES_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+        # Used by the pooled backend only (see below).
+        "POOL": {
+            "MAX_SIZE": int(os.environ.get("POSTGRES_POOL_MAX_SIZE", 10)),
+            "TIMEOUT": 5.0,
+            "MAX_AGE": 1800,
+            "CHECK_IDLE": 30,
+        },
     }
 }
 
+# POSTGRES_POOL=1 switches to a connection pool shared by all threads of a
+# process, which suits ASGI workers where per-thread persistent connections
+# do not work. At most POOL["MAX_SIZE"] connections are open; a request waits
+# up to POOL["TIMEOUT"] seconds for a free one. Idle connections are checked
+# after CHECK_IDLE seconds and replaced after MAX_AGE seconds.
+if os.environ.get("POSTGRES_POOL"):
+    DATABASES["default"].update(ENGINE="common.db.postgresql", CONN_MAX_AGE=0)
+
+# Read replicas, e.g. POSTGRES_REPLICA_HOSTS="replica-a,replica-b". Tests
+# mirror them onto the default database.
+for index, host in enumerate(
+    filter(None, os.environ.get("POSTGRES_REPLICA_HOSTS", "").split(","))
+):
+    DATABASES[f"replica{index + 1}"] = {
+        **DATABASES["default"],
+        "HOST": host.strip(),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["common.routers.PrimaryReplicaRouter"]
+
+# Reads go to a healthy replica, writes to PRIMARY. A client that wrote reads
+# from the primary for PIN_SECONDS. Replicas are probed every CHECK_INTERVAL
+# seconds and skipped for COOLDOWN seconds when unreachable or (PostgreSQL)
+# more than MAX_LAG seconds behind. Bearer-token clients are pinned through
+# the PIN_CACHE alias, which every worker must share (Redis, Memcached,
+# database); with None they always read from the primary.
+DATABASE_REPLICAS = {
+    "PRIMARY": "default",
+    "REPLICAS": [alias for alias in DATABASES if alias != "default"],
+    "PIN_SECONDS": 5,
+    "PIN_CACHE": None,
+    "CHECK_INTERVAL": 10,
+    "COOLDOWN": 30,
+    "MAX_LAG": None,
+}
+
 
 WSGI_APPLICATION = "eduzeit_lms.wsgi.application"
 
@@ -96,11 +160,59 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 100,
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "common.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.AllowAny",),
 }
 
+# Paginated listings report a planner estimate instead of COUNT(*) once the
+# estimated row count reaches this size (None always counts exactly).
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = 100000
+# Unfiltered totals are kept in the PAGINATION_COUNT_CACHE alias and adjusted
+# on every insert/delete instead of counted. Every worker must adjust the same
+# counter, so only name a shared cache here (Redis, Memcached, database);
+# with None the total is counted (or estimated) per request, and user-list
+# ETags come from one COUNT/MAX(updated_at) query over the filtered rows.
+PAGINATION_COUNT_CACHE = None
+PAGINATION_COUNT_CACHE_TIMEOUT = 3600
+
+# ?limit= is capped at PAGINATION_MAX_PAGE_SIZE. Pages of more than
+# PAGINATION_STREAM_THRESHOLD rows are streamed to the client, reading
+# PAGINATION_STREAM_CHUNK_SIZE rows per round trip, instead of being built
+# in memory (None never streams). Under ASGI only the async/ routes stream
+# without buffering; Django reads the sync routes' iterators into memory.
+PAGINATION_MAX_PAGE_SIZE = 10000
+PAGINATION_STREAM_THRESHOLD = 1000
+PAGINATION_STREAM_CHUNK_SIZE = 1000
+
+# Users resolved from JWTs are cached per process (MAX_SIZE entries, TTL in
+# seconds). Set BACKEND to a CACHES alias shared by every worker (Redis,
+# Memcached, database) so saves and deletes reach them all; with None, a
+# save only clears this process's copy, so entries live at most the
+# TOKEN_REVOCATION SYNC_INTERVAL and blocks and deletes apply in that time.
+AUTH_USER_CACHE = {
+    "MAX_SIZE": 1024,
+    "TTL": 300,
+    "BACKEND": None,
+}
+
+# Verified access tokens are cached per process (MAX_SIZE entries, 0 turns
+# it off) until they expire. Revocation is checked on every hit.
+AUTH_TOKEN_CACHE = {
+    "MAX_SIZE": 4096,
+}
+
+# Tokens of blocked and deleted members, and single revoked tokens, are
+# refused from an in-memory index of accounts.TokenRevocation that every
+# process re-reads every SYNC_INTERVAL seconds. LIFETIME is the longest
+# token lifetime we issue; CAPACITY and ERROR_RATE size its Bloom filter.
+TOKEN_REVOCATION = {
+    "SYNC_INTERVAL": 5,
+    "LIFETIME": 14 * 24 * 3600,
+    "CAPACITY": 100000,
+    "ERROR_RATE": 0.01,
+}
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Eduzeit API",
     "DESCRIPTION": "Eduzeit All Apis",
@@ -109,6 +221,10 @@ SPECTACULAR_SETTINGS = {
     # OTHER SETTINGS
 }
 
+# `manage.py build_schema` writes the rendered OpenAPI schema here; outside
+# DEBUG the schema view serves these files instead of regenerating.
+SCHEMA_CACHE_DIR = BASE_DIR / "schema"
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -135,6 +251,102 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Per-request phase timings go out in a Server-Timing header; set
+# METRICS_TOKEN to require "Authorization: Bearer <token>" on metrics/.
+SERVER_TIMING_HEADER = True
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+# Views declare their query budget with common.query_budget.query_budget.
+# When ENABLED, requests over budget, or repeating one query shape
+# REPEAT_THRESHOLD times (a probable N+1), are logged, or raised with RAISE.
+QUERY_BUDGET = {
+    "ENABLED": DEBUG,
+    "RAISE": False,
+    "DEFAULT": None,
+    "REPEAT_THRESHOLD": 3,
+}
+
+# Password hashing runs in a process pool (common.hashing) so PBKDF2 does
+# not block request workers. TIMEOUT is in seconds. Bulk creates hash in
+# jobs of BATCH_CHUNK_SIZE passwords with at most BATCH_MAX_PENDING of them
+# queued (None: half the workers), so logins are not stuck behind a batch.
+PASSWORD_HASHING = {
+    "ENABLED": True,
+    "WORKERS": os.cpu_count() or 1,
+    "MAX_PENDING": 32,
+    "TIMEOUT": 5.0,
+    "BATCH_CHUNK_SIZE": 4,
+    "BATCH_MAX_PENDING": None,
+}
+
+# Per-process admission control (common.admission). At most LIMIT requests
+# of a class run at once; the rest get a 503 with Retry-After. Sync requests
+# never queue (SYNC_QUEUE defaults to 0), since a waiting request holds its
+# worker thread: password-hashing routes tie up at most LIMIT threads, and
+# reads still find a free one as long as each process runs more threads
+# than that. On the async/ routes the QUEUE next requests wait up to
+# TIMEOUT seconds, each in a thread of the event loop's default executor
+# (min(32, cpu_count + 4) threads), so the hashing QUEUE stays below that
+# size. Logins and refreshes are also rate limited per client IP
+# (RATE per second, bursts of BURST) with 429s. Behind a proxy or load
+# balancer every client shares REMOTE_ADDR: set ADMISSION_CLIENT_IP_HEADER
+# (e.g. "X-Forwarded-For") there, or the limits apply to the whole site.
+ADMISSION_CONTROL = {
+    "ENABLED": True,
+    "CLASSES": {
+        "hashing": {
+            "ROUTES": [
+                r"/accounts/(async/)?(user-login|user-create)/$",
+                r"/accounts/user-bulk-create/$",
+            ],
+            "LIMIT": os.cpu_count() or 1,
+            "QUEUE": os.cpu_count() or 1,
+            "TIMEOUT": 2.0,
+        },
+        "read": {
+            "ROUTES": [r"/accounts/(async/)?(user-list|user-detail|user-export)/"],
+            "LIMIT": 64,
+            "QUEUE": 128,
+            "TIMEOUT": 1.0,
+        },
+    },
+    "RATE_LIMITS": {
+        "login": {
+            "ROUTES": [r"/accounts/(async/)?(user-login|refresh)/$"],
+            "RATE": 10.0,
+            "BURST": 100,
+        },
+    },
+    "CLIENT_IP_HEADER": os.environ.get("ADMISSION_CLIENT_IP_HEADER"),
+    "RETRY_AFTER": 1,
+}
+
+# user-bulk-create/ inserts in BATCH_SIZE chunks and accepts at most
+# MAX_ROWS members per request. Every row is a password hash, so MAX_ROWS
+# bounds how long one request keeps the hashing pool busy.
+MEMBER_BULK_CREATE = {
+    "BATCH_SIZE": 500,
+    "MAX_ROWS": 100,
+}
+
+# user-detail/?ids=... returns at most MAX_IDS members per request.
+MEMBER_BATCH_DETAIL = {
+    "MAX_IDS": 100,
+}
+
+# user-bulk-action/ updates or deletes CHUNK_SIZE rows per statement, in one
+# transaction, and touches at most MAX_ROWS members per request. Only members
+# whose role is in MODERATOR_ROLES may call it.
+MEMBER_BULK_ACTION = {
+    "CHUNK_SIZE": 500,
+    "MAX_ROWS": 10000,
+    "MODERATOR_ROLES": ["ad"],
+}
+
+# Rows fetched per round trip when streaming user-export/ and export_members.
+MEMBER_EXPORT_CHUNK_SIZE = 2000
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
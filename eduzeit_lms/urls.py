@@ -2,20 +2,22 @@ from django.contrib import admin
 from django.urls import path, include
 
 
+from common.instrumentation import metrics_view
+from common.schema import PrecomputedSchemaView
 from drf_spectacular.views import (
-    SpectacularAPIView,
     SpectacularRedocView,
     SpectacularSwaggerView,
 )
 
 urlpatterns = [
     path("db/admin/", admin.site.urls),
+    path("metrics/", metrics_view, name="metrics"),
     path(
         "api/v1/",
         include(
             [
                 # Api Documentation
-                path("doc/schema/", SpectacularAPIView.as_view(), name="schema"),
+                path("doc/schema/", PrecomputedSchemaView.as_view(), name="schema"),
                 path(
                     "doc/",
                     SpectacularSwaggerView.as_view(url_name="schema"),